@@ -0,0 +1,46 @@
+"""Production server settings: gunicorn master with uvicorn workers.
+
+    gunicorn -c backend/gunicorn_conf.py backend.main:app
+
+The app is imported once in the master (preload_app) and when_ready loads MODEL_CACHE_WARMUP
+there before any worker is forked, so every worker starts with the models already in memory and
+shares their pages. when_ready also starts the job runner process, the only process running
+training jobs; workers just queue them. Workers are recycled gracefully after SERVER_MAX_REQUESTS requests (with
+jitter, so they do not all restart at once): in-flight requests get SERVER_GRACEFUL_TIMEOUT
+seconds to finish, and replacement workers are forked from the warm master.
+"""
+import os
+from config import (SERVER_BIND, SERVER_WORKERS, SERVER_MAX_REQUESTS, SERVER_MAX_REQUESTS_JITTER,
+                    SERVER_GRACEFUL_TIMEOUT, SERVER_TIMEOUT)
+
+bind = SERVER_BIND
+workers = SERVER_WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+max_requests = SERVER_MAX_REQUESTS
+max_requests_jitter = SERVER_MAX_REQUESTS_JITTER
+graceful_timeout = SERVER_GRACEFUL_TIMEOUT
+timeout = SERVER_TIMEOUT
+# keep worker heartbeat files off disk-backed /tmp where available
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+# stops the job runner process started by when_ready
+stop_job_runner = None
+
+
+def when_ready(server):
+    # runs in the master after the app is loaded and before workers are forked
+    global stop_job_runner
+    from backend.main import preload
+    from modules.training_jobs import start_runner_process
+    preload()
+    server.log.info("Models preloaded in the master, forking workers")
+    # training jobs run in this one process, with MAX_CONCURRENT_TRAININGS at a time, whatever the
+    # number of workers; workers only queue them and survive being recycled mid-training
+    stop_job_runner = start_runner_process()
+
+
+def on_exit(server):
+    if stop_job_runner is not None:
+        stop_job_runner(timeout=SERVER_GRACEFUL_TIMEOUT)
@@ -0,0 +1,103 @@
+import inspect
+import os
+import re
+import threading
+import time
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+from config import PROFILING_ENABLED, PROFILE_PATH
+from modules.instrumentation import registry, start_request_profile, end_request_profile, profiled
+from modules.utils import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_HEADER = b'x-profile'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute whose sync endpoints are profiled in their threadpool thread when the request asks for it."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+def _route_label(scope):
+    """Path template of the matched route, so /jobs/{job_id} is one series rather than one per job."""
+    endpoint = scope.get('endpoint')
+    app = scope.get('app')
+    if endpoint is not None and app is not None:
+        for route in app.routes:
+            if getattr(route, 'endpoint', None) is endpoint:
+                return route.path
+    return 'unmatched'
+
+class MetricsMiddleware:
+    """Records per-route latency histograms and, when PROFILING_ENABLED, writes a cProfile dump for
+    requests sending an X-Profile header (its file name comes back in X-Profile-File).
+
+    Only one request at a time profiles the event loop thread, and that profile also sees other
+    requests served concurrently; sync endpoints are profiled in their own worker thread.
+    """
+
+    def __init__(self, app, profiling=PROFILING_ENABLED, profile_path=PROFILE_PATH):
+        self.app = app
+        self.profiling = profiling
+        self.profile_path = profile_path
+        self._loop_profiler_lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+        profile = token = loop_profiler = None
+        if self.profiling and any(name == PROFILE_HEADER for name, _ in scope.get('headers', [])):
+            profile, token = start_request_profile()
+            if self._loop_profiler_lock.acquire(blocking=False):
+                loop_profiler = profile.new_profiler()
+                loop_profiler.enable()
+
+        def finish_profile():
+            nonlocal loop_profiler
+            if loop_profiler is not None:
+                loop_profiler.disable()
+                loop_profiler = None
+                self._loop_profiler_lock.release()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if profile is not None:
+                    finish_profile()
+                    filename = self._dump(profile, scope)
+                    message = {**message, 'headers': list(message.get('headers', [])) +
+                               [(b'x-profile-file', filename.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profile is not None:
+                finish_profile()
+                end_request_profile(token)
+            registry.observe('automl_http_request_seconds', time.perf_counter() - start, method=scope['method'],
+                             route=_route_label(scope), status=str(status))
+
+    def _dump(self, profile, scope):
+        os.makedirs(self.profile_path, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', _route_label(scope)).strip('_') or 'root'
+        filename = f"{time.time_ns()}-{scope['method'].lower()}-{slug}.prof"
+        profile.dump(os.path.join(self.profile_path, filename))
+        logger.info(f"Wrote request profile {filename}")
+        return filename
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage and route metrics of this process in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,13 +1,64 @@
+import asyncio
+import gc
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from backend.routers import data_router, model_router
+from backend.instrumentation import MetricsMiddleware, router as metrics_router
+from modules.data_ingestion import close_connections
+from modules.model_deployment import model_cache
+from modules.training_jobs import (init_job_db, requeue_interrupted_jobs, requeue_stale_jobs, start_job_runner,
+                                   stop_job_runner)
+from modules import upload_processing
+from config import MODEL_CACHE_WARMUP
 from modules.utils import setup_logging
 import uvicorn
 
 # configure logging before app creation
 setup_logging()
 
-app = FastAPI(title="Auto ML Suite API", version="1.0.0")
+
+# set by preload() in a pre-fork server master; forked workers inherit the loaded models, and
+# training jobs run in the master's dedicated runner process instead of the workers
+preloaded = False
+
+def preload():
+    """Warm the model cache and requeue interrupted training jobs once, before workers are forked.
+
+    Workers then share the loaded models' memory: copy-on-write pages, or the same file pages for
+    memory-mapped artifacts. Called from the gunicorn when_ready hook (backend/gunicorn_conf.py).
+    """
+    global preloaded
+    model_cache.warm_up(MODEL_CACHE_WARMUP)
+    requeue_interrupted_jobs()
+    preloaded = True
+    # keep the garbage collector from touching (and so copying) the preloaded objects in every worker
+    gc.freeze()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    warmup = None
+    if not preloaded:
+        # load frequently used models in the background; /ready answers 503 until they are in memory
+        warmup = asyncio.create_task(asyncio.to_thread(model_cache.warm_up, MODEL_CACHE_WARMUP))
+    # training jobs left running by a job runner that died go back to the queue
+    init_job_db()
+    requeue_stale_jobs()
+    if not preloaded:
+        # no dedicated runner process (see backend/gunicorn_conf.py): training jobs run in this one
+        start_job_runner()
+    yield
+    if warmup is not None:
+        await warmup
+    # release pooled database connections
+    close_connections()
+    stop_job_runner()
+    upload_processing.shutdown_executor()
+
+
+app = FastAPI(title="Auto ML Suite API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,6 +68,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# per-route latency histograms and opt-in request profiles, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
+app.include_router(metrics_router, tags=["metrics"])
 app.include_router(data_router.router, prefix="/api/data", tags=["data"])
 app.include_router(model_router.router, prefix="/api/model", tags=["model"])
 
@@ -26,6 +81,14 @@ async def read_root():
     return {"message": "Welcome to Auto ML Suite API"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the configured models are loaded, 503 while warm-up is running."""
+    warmup = model_cache.warmup
+    body = {"ready": warmup['state'] == 'done', "preloaded": preloaded, **warmup}
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
 if __name__ == "__main__":
-    # For local development only. In production, prefer: uvicorn backend.main:app --host 0.0.0.0 --port 8000
+    # For local development only. In production: gunicorn -c backend/gunicorn_conf.py backend.main:app
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
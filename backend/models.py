@@ -1,42 +1,144 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
+
+class DatasetProfile(BaseModel):
+    rows: int
+    sampled_rows: Optional[int] = None  # rows the quantiles and top values come from; None when all rows were used
+    columns: List[Dict[str, Any]]  # per column: dtype, null rate, distinct count, min/max, quantiles, top values, flags
 
 class UploadResponse(BaseModel):
     message: str
+    dataset_id: str
+    columns: List[str]
+    shape: tuple
+    preview: List[Dict[str, Any]]
+    memory_report: List[Dict[str, Any]] = []  # per column: dtype change and bytes saved by the dtype optimization
+    profile: Optional[DatasetProfile] = None
+
+class DatasetInfo(BaseModel):
+    dataset_id: str
     columns: List[str]
     shape: tuple
     preview: List[Dict[str, Any]]
-    data: List[Dict[str, Any]]
 
 class DBLoadRequest(BaseModel):
     source: str  # 'mongo' or 'postgres'
     collection_or_query: str
     db_name: Optional[str] = "auto_ml_db"
+    projection: Optional[List[str]] = None  # mongo only: fields to fetch
+    limit: Optional[int] = None  # maximum number of rows to read
+    sample: Optional[float] = None  # fraction of rows to keep, between 0 and 1
 
 class PreprocessRequest(BaseModel):
-    data: List[Dict[str, Any]]
+    dataset_id: Optional[str] = None  # id returned by /upload or /load_db
+    data: Optional[List[Dict[str, Any]]] = None  # inline rows, used when no dataset_id is given
     features: List[str]
     target: str
     missing_strategy_num: Optional[str] = "mean"
     missing_strategy_cat: Optional[str] = "most_frequent"
     encoding: Optional[str] = "onehot"
     scaling: Optional[str] = "standard"
+    sparse: Optional[bool] = False  # keep one-hot output as a sparse matrix end to end
+    max_categories: Optional[int] = None  # cap on one-hot columns per feature, rarer values share one column
+    min_frequency: Optional[Union[int, float]] = None  # count (or fraction) below which a category counts as infrequent
+    high_cardinality_encoding: Optional[str] = None  # 'onehot', 'hashing' or 'target' for columns above the threshold
+    cardinality_threshold: Optional[int] = None  # distinct values; defaults to CATEGORICAL_CARDINALITY_THRESHOLD
+    return_data: Optional[bool] = False  # also return X/y inline
 
 class PreprocessResponse(BaseModel):
-    X: List[Dict[str, Any]]
-    y: List[Any]
+    dataset_id: str  # preprocessed X plus the target column
+    target: str
+    preprocessor_filename: str  # fitted preprocessing pipeline, pass it on to /train
+    columns: List[str]
+    shape: tuple
+    preview: List[Dict[str, Any]]
+    X: Optional[List[Dict[str, Any]]] = None
+    y: Optional[List[Any]] = None
+
+class FeatureSelectionOptions(BaseModel):
+    variance_threshold: Optional[float] = 0.0  # on columns rescaled to [0, 1]; 0.01 drops dummies set in < ~1% of rows
+    correlation_threshold: Optional[float] = None  # drop the later column of each pair correlated above this
+    method: Optional[str] = None  # 'mutual_info' or 'l1': keep the k columns most related to the target
+    k: Optional[int] = None
+    svd_components: Optional[int] = None  # project the kept columns onto this many TruncatedSVD components
 
 class TrainRequest(BaseModel):
-    X: List[Dict[str, Any]]
-    y: List[Any]
+    dataset_id: Optional[str] = None  # id returned by /preprocess
+    target: Optional[str] = None
+    preprocessor_filename: Optional[str] = None  # saved with the model so /predict accepts raw rows
+    search: Optional[str] = "grid"  # 'grid' or 'halving' (successive halving)
+    time_budget: Optional[float] = None  # wall-clock seconds; unfinished candidates are skipped
+    mode: Optional[str] = "batch"  # 'batch' or 'incremental' (out-of-core partial_fit training)
+    source: Optional[DBLoadRequest] = None  # incremental only: stream the rows straight from a database
+    feature_selection: Optional[FeatureSelectionOptions] = None  # batch only: prune columns before the model search
+    X: Optional[List[Dict[str, Any]]] = None
+    y: Optional[List[Any]] = None
 
-class TrainResponse(BaseModel):
-    model_filename: str
-    metrics: Dict[str, Any]
+class TrainJobResponse(BaseModel):
+    job_id: str
+    status: str
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str  # queued, running, cancelling, completed, failed or cancelled
+    completed: int  # candidate evaluations finished
+    total: int  # candidate evaluations planned
+    last_candidate: Optional[Dict[str, Any]] = None
+    model_filename: Optional[str] = None
+    metrics: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
 
 class PredictRequest(BaseModel):
     model_filename: str
-    data: List[Dict[str, Any]]
+    data: Optional[List[Dict[str, Any]]] = None  # omitted when the rows are sent as Arrow IPC or .npy
 
 class PredictResponse(BaseModel):
-    predictions: List[Any]
\ No newline at end of file
+    predictions: List[Any]
+
+class ScoreRequest(BaseModel):
+    model_filename: str
+    input_path: Optional[str] = None  # CSV or Parquet file, relative to BATCH_SCORING_PATH
+    dataset_id: Optional[str] = None
+    query: Optional[str] = None  # PostgreSQL query, streamed through a server-side cursor
+    output_path: Optional[str] = None  # relative to BATCH_SCORING_PATH; omitted: predictions stream back as CSV
+    output_format: Optional[str] = None  # 'csv' or 'parquet', default from the output_path suffix
+    id_columns: List[str] = []  # input columns copied next to the predictions
+    chunk_size: Optional[int] = None
+    workers: Optional[int] = None  # processes scoring chunks in parallel
+
+class ScoreResponse(BaseModel):
+    output_path: str
+    format: str
+    rows: int
+    chunks: int
+    seconds: float
+    rows_per_second: float
+
+class ModelCacheStats(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    entries: int
+    bytes: int
+    max_bytes: int
+
+class BatcherStats(BaseModel):
+    queue_depth: Dict[str, int]  # requests waiting per model
+    requests: int
+    batches: int
+    fallbacks: int  # batches re-run request by request after a failure
+    batch_size_histogram: Dict[str, int]  # rows per batch, power-of-two buckets
+    latency_ms: Dict[str, float]  # p50/p90/p99 over recent requests
+    max_batch_size: int
+    max_wait_ms: float
+
+class ResultCacheStats(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+    max_bytes: int
@@ -0,0 +1,75 @@
+import typing
+import pandas as pd
+from fastapi import Request, HTTPException
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pydantic import ValidationError
+from modules.wire_format import JSON, NPY, BINARY_FORMATS, media_type, negotiate, decode_frame, encode_frame, encode_array
+
+def _is_list_field(field):
+    annotation = field.annotation
+    if typing.get_origin(annotation) is typing.Union:
+        annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+    return typing.get_origin(annotation) is list
+
+def body_parser(model_cls):
+    """Dependency that accepts either a JSON body for model_cls or a binary table.
+
+    With an Arrow IPC or .npy body the table is returned as a DataFrame and the remaining
+    request fields come from the query string (repeat a parameter for list fields; `columns`
+    names the columns of a 2-D .npy array). Returns (request, frame), frame being None for JSON.
+    """
+    async def parse(request: Request):
+        content_type = media_type(request.headers.get('content-type'))
+        body = await request.body()
+        try:
+            if content_type in BINARY_FORMATS:
+                params = {}
+                for key in request.query_params.keys():
+                    field = model_cls.model_fields.get(key)
+                    values = request.query_params.getlist(key)
+                    params[key] = values if field is not None and _is_list_field(field) else values[-1]
+                columns = params.pop('columns', None)
+                try:
+                    frame = decode_frame(body, content_type, columns.split(',') if columns else None)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                return model_cls.model_validate(params), frame
+            if content_type != JSON:
+                raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+            return model_cls.model_validate_json(body), None
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+    return parse
+
+def request_body_docs(model_cls):
+    """openapi_extra documenting the JSON schema and the binary alternatives of a body_parser endpoint."""
+    binary = {'schema': {'type': 'string', 'format': 'binary'}}
+    return {'requestBody': {'required': True, 'content': {
+        JSON: {'schema': model_cls.model_json_schema()},
+        **{content_type: binary for content_type in BINARY_FORMATS},
+    }}}
+
+def wants_binary(request: Request):
+    """The binary format named in the Accept header, or None when the client should get JSON."""
+    content_type = negotiate(request.headers.get('accept'))
+    return content_type if content_type in BINARY_FORMATS else None
+
+def json_records(df):
+    """Rows of a frame as JSON-safe records: missing values become None, as NaN is not valid JSON."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def frame_response(df, content_type, headers=None):
+    try:
+        return Response(content=encode_frame(df, content_type), media_type=content_type, headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
+def array_response(values, content_type, name):
+    """A 1-D result: a plain .npy vector, or an Arrow stream with a single column."""
+    if content_type == NPY:
+        try:
+            return Response(content=encode_array(values), media_type=content_type)
+        except ValueError as e:
+            raise HTTPException(status_code=406, detail=str(e))
+    return frame_response(pd.DataFrame({name: values}), content_type)
@@ -1,167 +1,219 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from models import UploadResponse, DBLoadRequest, PreprocessRequest, PreprocessResponse
-from modules.data_ingestion import load_csv, load_excel, load_from_mongo, load_from_postgres
-from modules.data_preprocessing import select_features_target, handle_missing, encode_categorical, scale_numerical
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from backend.models import (UploadResponse, DatasetInfo, DatasetProfile, DBLoadRequest, PreprocessRequest,
+                            PreprocessResponse)
+from backend.instrumentation import InstrumentedRoute
+from backend.negotiation import body_parser, request_body_docs, wants_binary, frame_response, json_records
+from backend.uploads import receive_upload
+from modules.data_ingestion import load_from_mongo, load_from_postgres, optimize_dtypes
+from modules.data_profiling import dataset_profile
+from modules.model_training import save_model, get_model_path
+from modules.dataset_store import save_dataset, load_dataset, dataset_info, compute_dataset_id
+from modules.result_cache import result_cache, make_key
+from modules.upload_processing import process_upload, UploadError
 import pandas as pd
-import io
-import csv
+import os
 from modules.utils import get_logger
+from config import DATASET_JSON_MAX_ROWS
 
 logger = get_logger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
-def detect_delimiter(content_bytes, encoding='utf-8'):
-    """Detect the delimiter used in a CSV file"""
-    try:
-        text = content_bytes.decode(encoding)
-        first_lines = '\n'.join(text.split('\n')[:3])
-        sniffer = csv.Sniffer()
-        delimiter = sniffer.sniff(first_lines).delimiter
-        logger.info(f"Detected delimiter: {repr(delimiter)}")
-        return delimiter
-    except Exception as e:
-        logger.warning(f"Could not detect delimiter: {e}, using comma as default")
-        return ','
+UPLOAD_BODY_DOCS = {'requestBody': {'required': True, 'content': {'multipart/form-data': {'schema': {
+    'type': 'object', 'required': ['file'], 'properties': {'file': {'type': 'string', 'format': 'binary'}}}}}}}
+
+@router.post("/upload", response_model=UploadResponse, openapi_extra=UPLOAD_BODY_DOCS)
+async def upload_file(request: Request):
+    """Upload a CSV or Excel file as the 'file' field of a multipart form.
 
-@router.post("/upload", response_model=UploadResponse)
-async def upload_file(file: UploadFile = File(...)):
-    logger.info(f"Received file upload: {file.filename}, size: {file.size} bytes")
+    The file is streamed to disk (413 beyond MAX_FILE_SIZE) and parsed in the upload worker pool,
+    so the event loop keeps serving other requests, /predict included, while it is processed.
+    """
+    filename, path, size = await receive_upload(request)
+    logger.info(f"Received file upload: {filename}, size: {size} bytes")
     try:
-        # Read file contents
-        contents = await file.read()
-        logger.info(f"Read {len(contents)} bytes from file")
-        
-        # Check if file is empty
-        if not contents:
+        if not size:
             raise HTTPException(status_code=400, detail="The uploaded file is empty.")
-        
-        # Validate file extension
-        if not any(file.filename.endswith(ext) for ext in ['.csv', '.xlsx', '.xls']):
-            raise HTTPException(status_code=400, detail="Unsupported file type. Please upload CSV or Excel files.")
-        
-        # Reset file pointer and parse based on extension
-        df = None
         try:
-            if file.filename.endswith('.csv'):
-                # Try to read CSV with multiple encoding options and delimiter detection
-                encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252', 'utf-16']
-                df = None
-                last_error = None
-                
-                for encoding in encodings:
-                    try:
-                        logger.info(f"Attempting to parse CSV with encoding: {encoding}")
-                        
-                        # Detect delimiter
-                        delimiter = detect_delimiter(contents, encoding)
-                        
-                        # Read CSV with detected delimiter
-                        df = pd.read_csv(
-                            io.BytesIO(contents), 
-                            encoding=encoding,
-                            sep=delimiter,
-                            on_bad_lines='skip',
-                            engine='python',
-                            skipinitialspace=True
-                        )
-                        
-                        if not df.empty and len(df.columns) > 0:
-                            logger.info(f"Successfully parsed CSV with {len(df.columns)} columns and {len(df)} rows")
-                            break
-                    except UnicodeDecodeError:
-                        logger.warning(f"UnicodeDecodeError with encoding {encoding}")
-                        continue
-                    except Exception as e:
-                        logger.warning(f"Error parsing CSV with encoding {encoding}: {e}")
-                        last_error = e
-                        continue
-                
-                if df is None or df.empty or len(df.columns) == 0:
-                    error_detail = f"Unable to parse CSV file. Last error: {str(last_error) if last_error else 'Unknown error'}"
-                    logger.error(error_detail)
-                    raise HTTPException(status_code=400, detail=error_detail)
-                    
-            elif file.filename.endswith(('.xlsx', '.xls')):
-                try:
-                    df = pd.read_excel(io.BytesIO(contents))
-                except Exception as e:
-                    logger.error(f"Error reading Excel file: {e}")
-                    raise HTTPException(status_code=400, detail=f"Unable to read Excel file: {str(e)}")
-            else:
-                raise HTTPException(status_code=400, detail="Unsupported file type. Please upload CSV or Excel files.")
+            result = await process_upload(path, filename)
         except pd.errors.EmptyDataError as e:
-            logger.error(f"EmptyDataError for file {file.filename}: {e}")
+            logger.error(f"EmptyDataError for file {filename}: {e}")
             raise HTTPException(status_code=400, detail="The uploaded file is empty or contains no data. Please ensure the file has headers and data rows.")
         except pd.errors.ParserError as e:
-            logger.error(f"ParserError for file {file.filename}: {e}")
+            logger.error(f"ParserError for file {filename}: {e}")
             raise HTTPException(status_code=400, detail="Unable to parse file. Please check the file format and try again.")
-        except HTTPException:
-            raise
+        except UploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except BrokenProcessPool:
+            raise HTTPException(status_code=500, detail="The file could not be processed: the parsing worker stopped.")
         except Exception as e:
-            logger.error(f"Unexpected parsing error for file {file.filename}: {type(e).__name__}: {e}")
+            logger.error(f"Unexpected parsing error for file {filename}: {type(e).__name__}: {e}")
+            if filename.endswith(('.xlsx', '.xls')):
+                raise HTTPException(status_code=400, detail=f"Unable to read Excel file: {str(e)}")
             raise HTTPException(status_code=400, detail=f"Failed to parse file: {type(e).__name__}: {str(e)}")
-        
-        # Final validation - ensure we have a dataframe
-        if df is None:
-            raise HTTPException(status_code=400, detail="Failed to parse file - no data was extracted.")
-        
-        # Validate dataframe
-        if df.empty:
-            raise HTTPException(status_code=400, detail="The uploaded file contains no data rows.")
-        
-        if len(df.columns) == 0:
-            raise HTTPException(status_code=400, detail="The uploaded file contains no columns.")
-        
-        preview = df.head(5).to_dict('records')
-        return UploadResponse(
-            message="File uploaded successfully",
-            columns=list(df.columns),
-            shape=df.shape,
-            preview=preview,
-            data=df.to_dict('records')
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Upload error for file {file.filename}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
+        return UploadResponse(message="File uploaded successfully", **result)
+    finally:
+        os.remove(path)
 
 @router.post("/load_db", response_model=UploadResponse)
 def load_db(request: DBLoadRequest):
     try:
+        if request.sample is not None and not 0 < request.sample <= 1:
+            raise HTTPException(status_code=400, detail="sample must be a fraction between 0 and 1")
+        if request.limit is not None and request.limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be a positive number of rows")
         if request.source == 'mongo':
-            df = load_from_mongo(request.collection_or_query, db_name=request.db_name)
+            df = load_from_mongo(request.collection_or_query, db_name=request.db_name, projection=request.projection,
+                                 limit=request.limit, sample=request.sample)
         elif request.source == 'postgres':
-            df = load_from_postgres(request.collection_or_query)
+            df = load_from_postgres(request.collection_or_query, limit=request.limit, sample=request.sample)
         else:
             raise HTTPException(status_code=400, detail="Invalid source")
         
+        df, memory_report = optimize_dtypes(df)
+        dataset_id = save_dataset(df)
         preview = df.head(5).to_dict('records')
         return UploadResponse(
             message="Data loaded from DB",
-            columns=list(df.columns),
+            dataset_id=dataset_id,
+            columns=[str(c) for c in df.columns],
             shape=df.shape,
             preview=preview,
-            data=df.to_dict('records')
+            memory_report=memory_report,
+            profile=dataset_profile(dataset_id, df)
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"DB load error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/preprocess", response_model=PreprocessResponse)
-def preprocess_data(request: PreprocessRequest):
+@router.get("/datasets/{dataset_id}", response_model=DatasetInfo)
+def get_dataset(dataset_id: str):
     try:
-        df = pd.DataFrame(request.data)
-        X, y = select_features_target(df, request.features, request.target)
-        X = handle_missing(X, request.missing_strategy_num, request.missing_strategy_cat)
-        X = encode_categorical(X, request.encoding)
-        X = scale_numerical(X, request.scaling)
-        
+        info = dataset_info(dataset_id)
+        preview = load_dataset(dataset_id).head(5).to_dict('records')
+        return DatasetInfo(preview=preview, **info)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/datasets/{dataset_id}/profile", response_model=DatasetProfile)
+def get_dataset_profile(dataset_id: str):
+    try:
+        return DatasetProfile(**dataset_profile(dataset_id))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/datasets/{dataset_id}/data")
+def download_dataset(dataset_id: str, http_request: Request, response: Response, offset: int = Query(0, ge=0),
+                     limit: int = Query(DATASET_JSON_MAX_ROWS, ge=1, le=DATASET_JSON_MAX_ROWS)):
+    """Contents of a stored dataset: all of it as an Arrow IPC stream or a .npy array, or a page of
+    JSON records (rows offset to offset + limit, the total in the X-Total-Rows header)."""
+    try:
+        df = load_dataset(dataset_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    content_type = wants_binary(http_request)
+    if content_type:
+        return frame_response(df, content_type)
+    response.headers['X-Total-Rows'] = str(len(df))
+    return json_records(df.iloc[offset:offset + limit])
+
+def _cached_preprocessing(key, preprocessor_filename):
+    """(processed dataset id, processed frame) of an earlier identical /preprocess, or (None, None)."""
+    cached = result_cache.get(key)
+    if cached is None:
+        return None, None
+    try:
+        processed = load_dataset(cached['dataset_id'])
+    except FileNotFoundError:
+        # the processed dataset was evicted from the store: recompute
+        return None, None
+    if not os.path.exists(get_model_path(preprocessor_filename)):
+        save_model(cached['preprocessor'], preprocessor_filename)
+    logger.info(f"Reusing cached preprocessing {key}")
+    return cached['dataset_id'], processed
+
+@router.post("/preprocess", response_model=PreprocessResponse, openapi_extra=request_body_docs(PreprocessRequest))
+def preprocess_data(http_request: Request, parsed=Depends(body_parser(PreprocessRequest))):
+    """Fit the preprocessing pipeline on a stored dataset, inline rows or an Arrow IPC/.npy table.
+
+    When the Accept header names a binary format the response body is the processed X plus the
+    target column in that format, and the JSON fields are returned as X-Dataset-Id,
+    X-Preprocessor-Filename and X-Target headers.
+    """
+    request, frame = parsed
+    try:
+        df = None
+        if request.dataset_id:
+            columns = list(dict.fromkeys(request.features + [request.target]))
+            available = set(dataset_info(request.dataset_id)['columns'])
+            missing = [c for c in columns if c not in available]
+            if missing:
+                raise HTTPException(status_code=400, detail=f"Columns not found in dataset: {missing}")
+            source_id = request.dataset_id
+        elif frame is not None or request.data is not None:
+            df = frame if frame is not None else pd.DataFrame(request.data)
+            source_id = compute_dataset_id(df)
+        else:
+            raise HTTPException(status_code=400, detail="Either dataset_id or data must be provided.")
+        options = {'sparse': bool(request.sparse), 'max_categories': request.max_categories,
+                   'min_frequency': request.min_frequency,
+                   'high_cardinality_encoding': request.high_cardinality_encoding}
+        if request.cardinality_threshold is not None:
+            options['cardinality_threshold'] = request.cardinality_threshold
+        # identical data and options give the same preprocessor file, so /train can recognise repeats too
+        key = make_key('preprocess', source_id, request.features, request.target, request.missing_strategy_num,
+                       request.missing_strategy_cat, request.encoding, request.scaling, options)
+        preprocessor_filename = f"preprocessor-{key.split('-', 1)[1]}.pkl"
+        dataset_id, processed = _cached_preprocessing(key, preprocessor_filename)
+        if processed is None:
+            # scikit-learn is loaded by the first preprocessing request, not at startup
+            from modules.data_preprocessing import select_features_target, fit_preprocessor, to_frame
+            if df is None:
+                df = load_dataset(request.dataset_id, columns=columns)
+            X, y = select_features_target(df, request.features, request.target)
+            preprocessor, X = fit_preprocessor(X, request.missing_strategy_num, request.missing_strategy_cat,
+                                               request.encoding, request.scaling, y=y, **options)
+            X = to_frame(preprocessor, X)
+            save_model(preprocessor, preprocessor_filename)
+
+            processed = X.copy()
+            processed[request.target] = y.values
+            dataset_id = save_dataset(processed)
+            result_cache.put(key, {'preprocessor': preprocessor, 'dataset_id': dataset_id})
+        X = processed.drop(columns=[request.target])
+        y = processed[request.target]
+        content_type = wants_binary(http_request)
+        if content_type:
+            return frame_response(processed, content_type, headers={
+                'X-Dataset-Id': dataset_id,
+                'X-Preprocessor-Filename': preprocessor_filename,
+                'X-Target': request.target,
+            })
         return PreprocessResponse(
-            X=X.to_dict('records'),
-            y=y.tolist()
+            dataset_id=dataset_id,
+            target=request.target,
+            preprocessor_filename=preprocessor_filename,
+            columns=[str(c) for c in X.columns],
+            shape=X.shape,
+            preview=X.head(5).to_dict('records'),
+            X=X.to_dict('records') if request.return_data else None,
+            y=y.tolist() if request.return_data else None
         )
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Preprocess error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,34 +1,229 @@
-from fastapi import APIRouter, HTTPException
-from models import TrainRequest, TrainResponse, PredictRequest, PredictResponse
-from modules.model_training import train_and_select_best, save_model
-from modules.model_deployment import predict
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from backend.models import (TrainRequest, TrainJobResponse, JobStatus, PredictRequest, PredictResponse, ModelCacheStats,
+                            BatcherStats, ResultCacheStats, ScoreRequest, ScoreResponse)
+from backend.instrumentation import InstrumentedRoute
+from backend.negotiation import body_parser, request_body_docs, wants_binary, array_response
+from modules.model_training import get_model_path, load_manifest, SEARCH_MODES
+from modules.model_deployment import model_cache, predict_compiled
+from modules.inference_batcher import batcher
+from modules.batch_scoring import (open_chunks, iter_scored_chunks, iter_csv_bytes, score_to_file, resolve_scoring_path,
+                                   output_format_for)
+from modules.result_cache import result_cache
+from modules.dataset_store import save_dataset, dataset_info
+from modules.training_jobs import submit_training_job, get_job, cancel_training_job, TRAINING_MODES
+import asyncio
+import itertools
 import pandas as pd
+import os
 from modules.utils import get_logger
-import uuid
+from config import SCORING_WORKERS
 
 logger = get_logger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
-@router.post("/train", response_model=TrainResponse)
-def train_model(request: TrainRequest):
+@router.post("/train", response_model=TrainJobResponse, status_code=202, openapi_extra=request_body_docs(TrainRequest))
+def train_model(parsed=Depends(body_parser(TrainRequest))):
+    """Queue a training job; poll GET /jobs/{job_id} for progress and the resulting model.
+
+    The training rows can also be sent as an Arrow IPC or .npy table holding the features and
+    the `target` column, with the other fields as query parameters.
+    """
+    request, frame = parsed
     try:
-        X = pd.DataFrame(request.X)
-        y = pd.Series(request.y)
-        model, metrics = train_and_select_best(X, y)
-        model_filename = f"{uuid.uuid4()}.pkl"
-        save_model(model, model_filename)
-        return TrainResponse(model_filename=model_filename, metrics=metrics)
+        if request.search not in SEARCH_MODES:
+            raise HTTPException(status_code=400, detail=f"search must be one of {list(SEARCH_MODES)}")
+        if request.time_budget is not None and request.time_budget <= 0:
+            raise HTTPException(status_code=400, detail="time_budget must be a positive number of seconds")
+        if request.mode not in TRAINING_MODES:
+            raise HTTPException(status_code=400, detail=f"mode must be one of {list(TRAINING_MODES)}")
+        incremental = request.mode == 'incremental'
+        if incremental and request.preprocessor_filename:
+            raise HTTPException(status_code=400, detail="Incremental training fits its own streaming preprocessing; "
+                                                        "train on the raw dataset without a preprocessor_filename.")
+        feature_selection = request.feature_selection.model_dump() if request.feature_selection else None
+        if feature_selection is not None:
+            if incremental:
+                raise HTTPException(status_code=400, detail="feature_selection is only supported in batch mode.")
+            from modules.feature_selection import check_selection_options
+            try:
+                check_selection_options(feature_selection)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        if request.source is not None:
+            if not incremental:
+                raise HTTPException(status_code=400, detail="Streaming from a database source requires mode='incremental'.")
+            if request.source.source not in ('mongo', 'postgres'):
+                raise HTTPException(status_code=400, detail="Invalid source")
+            if not request.target:
+                raise HTTPException(status_code=400, detail="target is required when training from a source.")
+            dataset_id, target = None, request.target
+        elif request.dataset_id:
+            if not request.target:
+                raise HTTPException(status_code=400, detail="target is required when training from a dataset_id.")
+            dataset_id, target = request.dataset_id, request.target
+            try:
+                columns = dataset_info(dataset_id)['columns']
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if target not in columns:
+                raise HTTPException(status_code=400, detail=f"Target column '{target}' not found in dataset")
+        elif frame is not None:
+            if not request.target or request.target not in frame.columns:
+                raise HTTPException(status_code=400, detail="target must name a column of the uploaded table.")
+            dataset_id, target = save_dataset(frame), request.target
+        elif request.X is not None and request.y is not None:
+            # inline rows are stored like any other dataset so the worker can load them
+            target = request.target or '__target__'
+            df = pd.DataFrame(request.X)
+            df[target] = pd.Series(request.y).values
+            dataset_id = save_dataset(df)
+        else:
+            raise HTTPException(status_code=400, detail="Either dataset_id or X and y must be provided.")
+        if request.preprocessor_filename:
+            try:
+                if not os.path.exists(get_model_path(request.preprocessor_filename)):
+                    raise HTTPException(status_code=404, detail=f"Preprocessor '{request.preprocessor_filename}' not found")
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        job_id = submit_training_job({
+            'dataset_id': dataset_id,
+            'target': target,
+            'preprocessor_filename': request.preprocessor_filename,
+            'search': request.search,
+            'time_budget': request.time_budget,
+            'mode': request.mode,
+            'source': request.source.model_dump() if request.source else None,
+            'feature_selection': feature_selection,
+        })
+        # an identical earlier job may already be running or done
+        return TrainJobResponse(job_id=job_id, status=get_job(job_id)['status'])
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Train error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/predict", response_model=PredictResponse)
-def make_prediction(request: PredictRequest):
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+def get_training_job(job_id: str):
+    try:
+        return JobStatus(**get_job(job_id))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+@router.delete("/jobs/{job_id}", response_model=JobStatus)
+def cancel_training(job_id: str):
     try:
-        data = pd.DataFrame(request.data)
-        predictions = predict(request.model_filename, data)
+        return JobStatus(**cancel_training_job(job_id))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+@router.post("/predict", response_model=PredictResponse, openapi_extra=request_body_docs(PredictRequest))
+async def make_prediction(http_request: Request, parsed=Depends(body_parser(PredictRequest))):
+    """Concurrent requests for the same model are batched into a single predict call.
+
+    Rows may be sent as JSON records, an Arrow IPC stream or a .npy array; the predictions come
+    back in the format named by the Accept header.
+    """
+    request, data = parsed
+    if data is None and request.data is None:
+        raise HTTPException(status_code=400, detail="data must be provided.")
+    try:
+        try:
+            if not model_cache.has_compiled(request.model_filename):
+                # the manifest and coefficient file are read off the event loop, once per model version
+                await asyncio.get_running_loop().run_in_executor(None, model_cache.get_compiled,
+                                                                 request.model_filename)
+            # linear models on numeric columns: one matmul inline, no DataFrame and no batching wait
+            predictions = predict_compiled(request.model_filename, data if data is not None else request.data)
+        except (ValueError, KeyError, TypeError) as e:
+            # e.g. non-numeric or missing values the kernel cannot fill: the full pipeline decides
+            logger.debug(f"Compiled predict fell back to the pipeline: {e}")
+            predictions = None
+        if predictions is None:
+            if data is None:
+                data = pd.DataFrame(request.data)
+            predictions = await batcher.predict(request.model_filename, data)
+        content_type = wants_binary(http_request)
+        if content_type:
+            return array_response(predictions, content_type, 'prediction')
         return PredictResponse(predictions=predictions)
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model '{request.model_filename}' not found")
     except Exception as e:
         logger.error(f"Predict error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/score", response_model=ScoreResponse)
+def score_batch(request: ScoreRequest):
+    """Score a CSV/Parquet file under BATCH_SCORING_PATH, a stored dataset or a PostgreSQL query chunk by chunk.
+
+    With output_path the predictions are written to that file and the response reports the
+    row count and rows/s; without it they are streamed back as CSV in a chunked response.
+    Memory stays bounded by chunk_size (times 2 * workers with parallel scoring).
+    """
+    try:
+        if not os.path.exists(get_model_path(request.model_filename)):
+            raise HTTPException(status_code=404, detail=f"Model '{request.model_filename}' not found")
+        if request.chunk_size is not None and request.chunk_size < 1:
+            raise HTTPException(status_code=400, detail="chunk_size must be a positive number of rows")
+        if request.workers is not None and request.workers < 1:
+            raise HTTPException(status_code=400, detail="workers must be a positive number of processes")
+        input_path = resolve_scoring_path(request.input_path) if request.input_path else None
+        output_path = resolve_scoring_path(request.output_path) if request.output_path else None
+        output_format = output_format_for(output_path or '', request.output_format)
+        if output_path is None and output_format != 'csv':
+            raise HTTPException(status_code=400, detail="Streamed predictions are CSV; give an output_path for Parquet")
+        options = {'chunk_size': request.chunk_size} if request.chunk_size else {}
+        chunks = open_chunks(input_path, request.query, request.dataset_id, **options)
+        workers = request.workers or SCORING_WORKERS
+        if output_path is not None:
+            stats = score_to_file(request.model_filename, chunks, output_path, output_format, request.id_columns,
+                                  workers)
+            return ScoreResponse(**{**stats, 'output_path': request.output_path})
+        scored = iter_scored_chunks(request.model_filename, chunks, request.id_columns, workers)
+        # score the first chunk before answering, so a bad input still gets an error status
+        first = next(scored, None)
+        if first is None:
+            first = pd.DataFrame({'prediction': []})
+        return StreamingResponse(iter_csv_bytes(itertools.chain([first], scored)), media_type='text/csv')
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Batch scoring error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/models/{model_filename}/manifest")
+def get_model_manifest(model_filename: str):
+    """Model type, feature schema, preprocessing and metrics recorded when the model was saved."""
+    try:
+        if not os.path.exists(get_model_path(model_filename)):
+            raise HTTPException(status_code=404, detail=f"Model '{model_filename}' not found")
+        manifest = load_manifest(model_filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if manifest is None:
+        raise HTTPException(status_code=404, detail=f"Model '{model_filename}' was saved without a manifest")
+    return manifest
+
+@router.get("/cache/stats", response_model=ModelCacheStats)
+def get_cache_stats():
+    return ModelCacheStats(**model_cache.stats())
+
+@router.get("/batcher/stats", response_model=BatcherStats)
+def get_batcher_stats():
+    return BatcherStats(**batcher.stats())
+
+@router.get("/result_cache/stats", response_model=ResultCacheStats)
+def get_result_cache_stats():
+    # hits and misses are counted by this process; training workers count their own
+    return ResultCacheStats(**result_cache.stats())
@@ -0,0 +1,135 @@
+import os
+import tempfile
+from fastapi import HTTPException, Request
+from multipart.multipart import parse_options_header
+from starlette.concurrency import run_in_threadpool
+from config import MAX_FILE_SIZE, UPLOAD_TMP_PATH
+from modules.data_ingestion import UPLOAD_SUFFIXES
+
+MULTIPART_OVERHEAD = 64 * 1024  # boundary lines and part headers allowed on top of MAX_FILE_SIZE in Content-Length
+MAX_PART_HEADER_BYTES = 16 * 1024
+
+def _too_large(max_bytes):
+    return HTTPException(status_code=413, detail=f"The uploaded file exceeds the maximum size of {max_bytes} bytes.")
+
+class MultipartReader:
+    """Incremental multipart/form-data splitter: feed() the body chunk by chunk and get every part's
+    headers and data back.
+
+    Boundaries are searched with bytes.find, so the body is scanned at memchr speed; python-multipart,
+    which starlette's form parsing uses, walks file data byte by byte in Python (about 15MB/s),
+    holding the event loop for seconds on a large upload.
+    """
+
+    def __init__(self, boundary):
+        self.delimiter = b'\r\n--' + boundary
+        self._buffer = b'\r\n'  # the first boundary line has no CRLF of its own before it
+        self._state = 'preamble'
+
+    def feed(self, chunk):
+        """Parse the next chunk; returns a list of ('headers', {name: value}) and ('data', bytes) events."""
+        events = []
+        buffer = self._buffer + chunk
+        while True:
+            if self._state in ('preamble', 'data'):
+                i = buffer.find(self.delimiter)
+                if i < 0:
+                    # keep what could be the start of a delimiter split across chunks
+                    keep = min(len(buffer), len(self.delimiter) - 1)
+                    if self._state == 'data' and len(buffer) > keep:
+                        events.append(('data', buffer[:len(buffer) - keep]))
+                    buffer = buffer[len(buffer) - keep:]
+                    break
+                if self._state == 'data' and i:
+                    events.append(('data', buffer[:i]))
+                buffer = buffer[i + len(self.delimiter):]
+                self._state = 'boundary'
+            elif self._state == 'boundary':
+                if buffer.startswith(b'--'):
+                    self._state, buffer = 'end', b''
+                    break
+                end = buffer.find(b'\r\n')
+                if end < 0:
+                    break
+                # headers start with the CRLF ending the boundary line, so empty headers are found too
+                buffer = buffer[end:]
+                self._state = 'headers'
+            elif self._state == 'headers':
+                end = buffer.find(b'\r\n\r\n')
+                if end < 0:
+                    if len(buffer) > MAX_PART_HEADER_BYTES:
+                        raise HTTPException(status_code=400, detail="Multipart part headers are too long.")
+                    break
+                headers = {}
+                for line in buffer[2:end].split(b'\r\n'):
+                    name, _, value = line.partition(b':')
+                    headers[name.strip().lower()] = value.strip()
+                events.append(('headers', headers))
+                buffer = buffer[end + 4:]
+                self._state = 'data'
+            else:
+                buffer = b''  # epilogue
+                break
+        self._buffer = buffer
+        return events
+
+    def finalize(self):
+        if self._state != 'end':
+            raise HTTPException(status_code=400, detail="The multipart body ended before its closing boundary.")
+
+async def receive_upload(request: Request, field='file', suffixes=UPLOAD_SUFFIXES, max_bytes=None, directory=None):
+    """Stream the file field of a multipart/form-data request to disk; returns (filename, path, size).
+
+    The body is never held in memory: each received chunk is split and its file data appended
+    to a temporary file under directory (default UPLOAD_TMP_PATH), which the caller removes. The
+    request is rejected with 413 by its Content-Length, or as soon as the data received exceeds
+    max_bytes (default MAX_FILE_SIZE), and with 400 when the file name does not end with one of
+    suffixes, before any of the file is read.
+    """
+    max_bytes = MAX_FILE_SIZE if max_bytes is None else max_bytes
+    directory = UPLOAD_TMP_PATH if directory is None else directory
+    content_type, options = parse_options_header(request.headers.get('content-type', ''))
+    if content_type != b'multipart/form-data' or not options.get(b'boundary'):
+        raise HTTPException(status_code=415, detail="Send the file as multipart/form-data.")
+    length = request.headers.get('content-length')
+    if length and length.isdigit() and int(length) > max_bytes + MULTIPART_OVERHEAD:
+        raise _too_large(max_bytes)
+    reader = MultipartReader(options[b'boundary'])
+    filename, file, size, writing = None, None, 0, False
+    try:
+        async for chunk in request.stream():
+            pending = []
+            for kind, value in reader.feed(chunk):
+                if kind == 'headers':
+                    _, disposition = parse_options_header(value.get(b'content-disposition', b''))
+                    name = disposition.get(b'name', b'').decode('utf-8', 'replace')
+                    writing = name == field and b'filename' in disposition
+                    if not writing:
+                        continue
+                    if file is not None:
+                        raise HTTPException(status_code=400, detail=f"Send a single file in the '{field}' field.")
+                    filename = os.path.basename(disposition[b'filename'].decode('utf-8', 'replace'))
+                    if not filename.endswith(tuple(suffixes)):
+                        raise HTTPException(status_code=400,
+                                            detail="Unsupported file type. Please upload CSV or Excel files.")
+                    os.makedirs(directory, exist_ok=True)
+                    # the suffix keeps the format visible to the parser
+                    file = tempfile.NamedTemporaryFile(dir=directory, prefix='upload-', delete=False,
+                                                       suffix=os.path.splitext(filename)[1])
+                elif writing:
+                    size += len(value)
+                    if size > max_bytes:
+                        raise _too_large(max_bytes)
+                    pending.append(value)
+            if pending:
+                await run_in_threadpool(file.write, b''.join(pending))
+        reader.finalize()
+    except BaseException:
+        if file is not None:
+            file.close()
+            os.remove(file.name)
+        raise
+    if file is None:
+        raise HTTPException(status_code=422, detail=f"No file was sent in the '{field}' field.")
+    file.close()
+    return filename, file.name, size
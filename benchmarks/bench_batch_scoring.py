@@ -0,0 +1,83 @@
+"""Benchmark batch scoring: rows/s and peak RSS of chunked scoring against loading the whole file.
+
+Writes a synthetic CSV, saves a preprocessing + model pipeline, then scores the file once per
+configuration in a fresh interpreter, so each peak RSS is that run's own (Linux /proc/self/status).
+'whole' is what /predict amounts to: one DataFrame and one predict call for all rows. With
+--workers > 1 the peak RSS is the parent's; each worker holds about 2 chunks plus the model.
+
+Usage: python -m benchmarks.bench_batch_scoring --rows 1000000 --chunk-sizes 10000 100000 --workers 1 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+from benchmarks.synthetic import DatasetSpec, make_dataset
+from modules import model_training
+from modules.data_preprocessing import fit_preprocessor
+
+RUN_SCRIPT = """
+import json, sys, time
+from modules.batch_scoring import open_chunks, score_to_file
+from modules.data_ingestion import read_csv_bytes
+from modules.model_deployment import predict
+def peak_rss_mb():
+    # VmHWM rather than ru_maxrss, which keeps the parent's peak across fork + exec
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmHWM')) / 1024
+model, input_path, output_path, chunk_size, workers = sys.argv[1:6]
+start = time.perf_counter()
+if chunk_size == 'whole':
+    with open(input_path, 'rb') as f:
+        df = read_csv_bytes(f.read())
+    rows = len(predict(model, df.drop(columns=['target'])))
+else:
+    rows = score_to_file(model, open_chunks(input_path, chunk_size=int(chunk_size)), output_path,
+                         workers=int(workers))['rows']
+seconds = time.perf_counter() - start
+print(json.dumps({'rows': rows, 'seconds': seconds, 'peak_rss_mb': peak_rss_mb()}))
+"""
+
+def fit_model(kind, spec):
+    df = make_dataset(DatasetSpec(**{**spec.to_dict(), 'rows': 5000}))
+    X = df.drop(columns=['target'])
+    preprocessor, X_out = fit_preprocessor(X)
+    estimator = (RandomForestClassifier(n_estimators=50, n_jobs=1, random_state=0) if kind == 'forest'
+                 else LogisticRegression(max_iter=1000))
+    return model_training.attach_preprocessor(preprocessor, estimator.fit(X_out, df['target']))
+
+def run(model_dir, model, input_path, output_path, chunk_size, workers):
+    env = {**os.environ, 'MODEL_PATH': model_dir, 'LOG_LEVEL': 'WARNING'}
+    out = subprocess.run([sys.executable, '-c', RUN_SCRIPT, model, input_path, output_path, str(chunk_size),
+                          str(workers)], check=True, capture_output=True, text=True, env=env, cwd=os.getcwd())
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1])
+    parser.add_argument('--models', nargs='+', choices=['logistic', 'forest'], default=['logistic', 'forest'])
+    args = parser.parse_args()
+
+    spec = DatasetSpec(rows=args.rows)
+    with tempfile.TemporaryDirectory(prefix='auto_ml_scoring_') as work_dir:
+        input_path = os.path.join(work_dir, 'input.csv')
+        make_dataset(spec).to_csv(input_path, index=False)
+        print(f"{spec.name}: {os.path.getsize(input_path) / 1e6:.0f} MB CSV")
+        model_training.MODEL_PATH = work_dir
+        print(f"{'model':>10} {'chunk_size':>10} {'workers':>7} {'seconds':>8} {'rows/s':>10} {'peak_rss_mb':>11}")
+        for kind in args.models:
+            model_training.save_model(fit_model(kind, spec), f"{kind}.pkl")
+            configs = [('whole', 1)] + [(size, workers) for size in args.chunk_sizes for workers in args.workers]
+            for chunk_size, workers in configs:
+                result = run(work_dir, f"{kind}.pkl", input_path, os.path.join(work_dir, 'out.parquet'), chunk_size,
+                             workers)
+                print(f"{kind:>10} {str(chunk_size):>10} {workers:>7} {result['seconds']:8.2f} "
+                      f"{result['rows'] / result['seconds']:10,.0f} {result['peak_rss_mb']:11.0f}", flush=True)
+
+if __name__ == '__main__':
+    main()
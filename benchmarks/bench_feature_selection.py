@@ -0,0 +1,56 @@
+"""Benchmark the feature selection stage: model search time and test score with and without it.
+
+Preprocesses a wide synthetic dataset (high-cardinality categoricals one-hot encoded into hundreds
+of mostly near-constant dummy columns) and runs train_and_select_best on it once per selection
+setting, single-threaded so the speedup does not depend on the core count.
+
+Usage: python -m benchmarks.bench_feature_selection --rows 5000 --cardinality 200
+"""
+import argparse
+import time
+from benchmarks.synthetic import DatasetSpec, make_dataset
+from modules.data_preprocessing import fit_preprocessor
+from modules.model_training import train_and_select_best
+
+SETTINGS = {
+    'none': None,
+    'variance': {'variance_threshold': 0.01},
+    'variance+corr': {'variance_threshold': 0.01, 'correlation_threshold': 0.95},
+    'mutual_info k=20': {'variance_threshold': 0.01, 'method': 'mutual_info', 'k': 20},
+    'l1 k=20': {'variance_threshold': 0.01, 'method': 'l1', 'k': 20},
+    'svd 20': {'variance_threshold': 0.001, 'svd_components': 20},
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--numeric', type=int, default=10)
+    parser.add_argument('--categorical', type=int, default=3)
+    parser.add_argument('--cardinality', type=int, default=200)
+    parser.add_argument('--problem', choices=['classification', 'regression'], default='classification')
+    parser.add_argument('--only', nargs='+', choices=sorted(SETTINGS))
+    args = parser.parse_args()
+
+    spec = DatasetSpec(rows=args.rows, numeric=args.numeric, categorical=args.categorical,
+                       cardinality=args.cardinality, problem=args.problem)
+    df = make_dataset(spec)
+    _, X = fit_preprocessor(df.drop(columns=['target']))
+    y = df['target']
+    print(f"{spec.name}: {X.shape[1]} preprocessed columns")
+    print(f"{'selection':>18} {'columns':>8} {'select_s':>9} {'train_s':>8} {'speedup':>8} {'score':>7}  model")
+    baseline = None
+    for name, options in SETTINGS.items():
+        if args.only and name not in args.only and name != 'none':
+            continue
+        start = time.perf_counter()
+        _, metrics = train_and_select_best(X, y, n_jobs=1, memory_budget=0, feature_selection=options)
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        selection = metrics.get('feature_selection') or {}
+        columns = selection.get('svd_components', selection.get('selected_columns', X.shape[1]))
+        score = metrics['accuracy' if args.problem == 'classification' else 'r2']
+        print(f"{name:>18} {columns:>8} {selection.get('fit_time', 0.0):9.3f} {seconds:8.2f} "
+              f"{baseline / seconds:7.1f}x {score:7.3f}  {metrics['model_name']}", flush=True)
+
+if __name__ == '__main__':
+    main()
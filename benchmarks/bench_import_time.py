@@ -0,0 +1,66 @@
+"""Benchmark the API's cold-start import time and check it against a budget.
+
+Imports a module (default backend.main, what uvicorn and gunicorn import before serving) with
+`python -X importtime` in fresh interpreters, reports the median total and the slowest
+top-level imports of the fastest run, and fails when the total exceeds --budget or when any of
+the --forbid modules (heavy dependencies that only training, preprocessing or a database source
+need) was loaded. Meant for CI, so a new eager import is caught when it lands.
+
+Usage: python -m benchmarks.bench_import_time --runs 5 --budget 1.5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+FORBIDDEN_MODULES = ('sklearn', 'scipy', 'pymongo', 'psycopg2', 'openpyxl')
+
+def import_profile(module):
+    """(total seconds, {imported module: (cumulative seconds, nesting depth)}) of one cold import."""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], check=True,
+                         capture_output=True, text=True, cwd=os.getcwd(),
+                         env={**os.environ, 'LOG_LEVEL': 'WARNING'})
+    modules = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # nesting is shown by two spaces of indentation per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (int(cumulative) / 1e6, depth)
+    return modules[module][0], modules
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='backend.main')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='slowest direct imports to list')
+    parser.add_argument('--budget', type=float, help='maximum median import time in seconds')
+    parser.add_argument('--forbid', nargs='*', default=list(FORBIDDEN_MODULES),
+                        help='modules that must not be imported')
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [total for total, _ in profiles]
+    median = statistics.median(totals)
+    _, modules = min(profiles, key=lambda profile: profile[0])
+    print(f"import {args.module}: median {median:.3f}s, min {min(totals):.3f}s, max {max(totals):.3f}s "
+          f"over {args.runs} runs")
+    print(f"{'seconds':>8}  module (fastest run, imports at depth <= 2)")
+    shallow = [(seconds, depth, name) for name, (seconds, depth) in modules.items() if 0 < depth <= 2]
+    for seconds, depth, name in sorted(shallow, reverse=True)[:args.top]:
+        print(f"{seconds:8.3f}  {'  ' * (depth - 1)}{name}")
+
+    failures = []
+    loaded = sorted(name for name in args.forbid if name in modules)
+    if loaded:
+        failures.append(f"forbidden modules imported: {loaded}")
+    if args.budget is not None and median > args.budget:
+        failures.append(f"median import time {median:.3f}s exceeds the budget of {args.budget:.3f}s")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
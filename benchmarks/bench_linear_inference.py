@@ -0,0 +1,79 @@
+"""Benchmark single-row latency of linear models: compiled raw-input kernel vs. the pandas/sklearn path.
+
+Times model_deployment.predict_compiled (rows -> float matrix -> matmul) against
+model_deployment.predict (DataFrame + fitted pipeline) on the same cached model, and both through
+/api/model/predict with the TestClient (which adds HTTP, JSON and validation overhead).
+
+Usage: python -m benchmarks.bench_linear_inference --features 20 --requests 5000
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from modules import model_training, training_jobs
+from modules.data_preprocessing import fit_preprocessor
+from modules.model_deployment import predict, predict_compiled, model_cache
+
+def make_pipeline(kind, features, rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, features)), columns=[f"x{i}" for i in range(features)])
+    X.iloc[::10, 0] = np.nan
+    signal = X.fillna(0).to_numpy() @ rng.normal(size=features)
+    preprocessor, X_out = fit_preprocessor(X)
+    if kind == 'logistic':
+        model = LogisticRegression().fit(X_out, signal > 0)
+    else:
+        model = LinearRegression().fit(X_out, signal)
+    return model_training.attach_preprocessor(preprocessor, model), X
+
+def percentiles(latencies):
+    ms = np.asarray(latencies) * 1000
+    return {p: float(np.percentile(ms, p)) for p in (50, 99)}
+
+def time_calls(func, payloads):
+    latencies = []
+    for payload in payloads:
+        start = time.perf_counter()
+        func(payload)
+        latencies.append(time.perf_counter() - start)
+    return percentiles(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--features', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='auto_ml_linear_') as model_dir:
+        model_training.MODEL_PATH = model_dir
+        training_jobs.JOB_DB_PATH = f"{model_dir}/jobs.db"
+        from fastapi.testclient import TestClient
+        from backend.main import app
+        print(f"{'model':>10} {'path':>22} {'p50_ms':>8} {'p99_ms':>8}")
+        with TestClient(app) as client:
+            for kind in ('logistic', 'linear'):
+                pipeline, X = make_pipeline(kind, args.features)
+                filename = f"{kind}.pkl"
+                model_training.save_model(pipeline, filename)
+                rows = [[{k: (None if pd.isna(v) else v) for k, v in row.items()}]
+                        for row in X.head(args.requests).to_dict('records')]
+                frames = [pd.DataFrame(r) for r in rows]
+                predict_compiled(filename, rows[0])
+                predict(filename, frames[0].copy())
+                results = {
+                    'compiled kernel': time_calls(lambda r: predict_compiled(filename, r), rows),
+                    'pandas pipeline': time_calls(lambda f: predict(filename, f), frames),
+                    'http compiled': time_calls(lambda r: client.post(
+                        '/api/model/predict', json={'model_filename': filename, 'data': r}), rows[:1000]),
+                }
+                # without the coefficient file the endpoint takes the batched pipeline path
+                model_cache._compiled[filename] = (*model_cache._compiled[filename][:2], None)
+                results['http pipeline'] = time_calls(lambda r: client.post(
+                    '/api/model/predict', json={'model_filename': filename, 'data': r}), rows[:1000])
+                for path, stats in results.items():
+                    print(f"{kind:>10} {path:>22} {stats[50]:8.3f} {stats[99]:8.3f}", flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark model artifact storage modes: file size, save time, cold load time and RSS per mode.
+
+Each load runs in a fresh interpreter, so the numbers include reading the file from the page cache
+and unpickling but not the import of sklearn. RSS is the resident set growth of the loading
+process (Linux /proc/self/statm); memory-mapped arrays count only once touched and their pages are
+shared between processes. RandomForest trees are copied into sklearn's own node storage when
+unpickled, so for forests mmap only saves the read buffer; array-heavy models (linear, SVM, naive
+Bayes) keep their arrays in the shared mapping.
+
+Usage: python -m benchmarks.bench_model_artifacts --rows 20000 --trees 100
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from modules import model_training
+from modules.model_artifacts import parse_compression
+
+MODES = ['none', 'none+mmap', 'lz4:1', 'zlib:1', 'zlib:3', 'lzma:1']
+
+LOAD_SCRIPT = """
+import json, os, sys, time
+import sklearn.ensemble, sklearn.linear_model
+from modules import model_training
+model_training.MODEL_PATH = sys.argv[1]
+def rss_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+before = rss_kb()
+start = time.perf_counter()
+if sys.argv[3] == 'coef':
+    model = model_training.load_coefficients(sys.argv[2])
+else:
+    model = model_training.load_model(sys.argv[2], mmap=sys.argv[3] == 'mmap')
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'rss_mb': (rss_kb() - before) / 1024}))
+"""
+
+def make_models(rows, features, trees, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, features))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    return {
+        'random_forest': RandomForestClassifier(n_estimators=trees, random_state=seed, n_jobs=-1).fit(X, y),
+        'logistic_regression': LogisticRegression(max_iter=500).fit(X, y),
+    }
+
+def cold_load(model_dir, filename, how):
+    out = subprocess.run([sys.executable, '-c', LOAD_SCRIPT, model_dir, filename, how], check=True,
+                         capture_output=True, text=True, cwd=os.getcwd())
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--features', type=int, default=20)
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    models = make_models(args.rows, args.features, args.trees)
+    print(f"{'model':>20} {'mode':>10} {'size_mb':>8} {'save_s':>7} {'load_s':>7} {'rss_mb':>7}")
+    with tempfile.TemporaryDirectory(prefix='auto_ml_artifacts_') as model_dir:
+        model_training.MODEL_PATH = model_dir
+        for name, model in models.items():
+            modes = MODES + (['coef'] if name == 'logistic_regression' else [])
+            for mode in modes:
+                compression = mode.split('+')[0] if mode != 'coef' else 'none'
+                try:
+                    parse_compression(compression)
+                except ValueError as e:
+                    print(f"{name:>20} {mode:>10} skipped: {e}")
+                    continue
+                filename = f"{name}-{mode.replace(':', '_').replace('+', '_')}.pkl"
+                start = time.perf_counter()
+                path = model_training.save_model(model, filename, compression=compression)
+                save_seconds = time.perf_counter() - start
+                how = 'coef' if mode == 'coef' else 'mmap' if mode.endswith('+mmap') else 'plain'
+                loads = [cold_load(model_dir, filename, how) for _ in range(args.repeat)]
+                best = min(loads, key=lambda r: r['seconds'])
+                size = os.path.getsize(path + '.coef.npz' if mode == 'coef' else path)
+                print(f"{name:>20} {mode:>10} {size / 1e6:8.2f} {save_seconds:7.3f} {best['seconds']:7.4f} "
+                      f"{best['rss_mb']:7.1f}", flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark the model families of the estimator registry: fit time against the cost model, and test score.
+
+For each dataset size (smallest first), fits every candidate of every registered batch family
+once on the preprocessed training split and prints the registered (prior) estimate, the estimate
+calibrated by the fit times recorded at the smaller sizes, the measured mean fit time and the
+test score. Families whose estimate exceeds --max-seconds, or that cannot take the data (e.g. a
+kernel SVM above its row limit), are reported as skipped, as the model search would.
+
+Usage: python -m benchmarks.bench_model_families --rows 2000 20000 100000 --problem classification
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from sklearn.model_selection import ParameterGrid, train_test_split
+from benchmarks.synthetic import DatasetSpec, make_dataset
+from modules.data_preprocessing import fit_preprocessor
+from modules.estimator_registry import FitHistory, registered_estimators
+from modules.model_training import evaluate_model
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[2000, 20000, 100000])
+    parser.add_argument('--numeric', type=int, default=20)
+    parser.add_argument('--problem', choices=['classification', 'regression'], default='classification')
+    parser.add_argument('--max-seconds', type=float, default=120.0, help='skip families estimated slower per fit')
+    args = parser.parse_args()
+
+    scoring = 'accuracy' if args.problem == 'classification' else 'r2'
+    with tempfile.TemporaryDirectory(prefix='auto_ml_families_') as work_dir:
+        history = FitHistory(os.path.join(work_dir, 'fit_history.db'))
+        print(f"{'rows':>8} {'family':>22} {'prior_s':>9} {'calibrated_s':>12} {'actual_s':>9} {scoring:>8}")
+        for rows in sorted(args.rows):
+            spec = DatasetSpec(rows=rows, numeric=args.numeric, categorical=0, problem=args.problem)
+            df = make_dataset(spec)
+            _, X = fit_preprocessor(df.drop(columns=['target']))
+            X_train, X_test, y_train, y_test = train_test_split(X, df['target'], test_size=0.2, random_state=42)
+            n_rows, n_features = X_train.shape
+            for family in registered_estimators(args.problem):
+                cost = history.cost(family)
+                prior = family.estimate(n_rows, n_features)
+                calibrated = family.estimate(n_rows, n_features, cost) if cost is not None else float('nan')
+                reason = family.unsupported_reason(n_rows)
+                estimate = prior if cost is None else calibrated
+                if reason is None and estimate > args.max_seconds:
+                    reason = f'estimated {estimate:.0f}s > --max-seconds'
+                if reason is not None:
+                    print(f"{rows:>8} {family.name:>22} {prior:9.3f} {calibrated:12.3f}  skipped: {reason}", flush=True)
+                    continue
+                seconds, scores, observed = [], [], []
+                for params in ParameterGrid(family.grid):
+                    start = time.perf_counter()
+                    model = family.make(**params).fit(X_train, y_train)
+                    seconds.append(time.perf_counter() - start)
+                    scores.append(evaluate_model(model, X_test, y_test, args.problem)[scoring])
+                    observed.append((family.name, n_rows, n_features, seconds[-1]))
+                history.record(args.problem, observed)
+                print(f"{rows:>8} {family.name:>22} {prior:9.3f} {calibrated:12.3f} {np.mean(seconds):9.3f} "
+                      f"{max(scores):8.3f}", flush=True)
+
+if __name__ == '__main__':
+    main()
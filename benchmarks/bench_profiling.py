@@ -0,0 +1,58 @@
+"""Benchmark dataset profiling: profile_dataset against an exact pandas profile, and distinct-count error.
+
+The exact profile is what a naive implementation computes per column: describe(), nunique(),
+value_counts() and quantiles over every row. profile_dataset counts distinct values with a
+HyperLogLog sketch and takes quantiles and top values from a sample of --sample-rows rows.
+Both run on the frame as /upload stores it, after optimize_dtypes (so low-cardinality text
+columns are categoricals).
+
+Usage: python -m benchmarks.bench_profiling --rows 100000 1000000 --cardinality 20 100000
+"""
+import argparse
+import time
+import numpy as np
+from benchmarks.synthetic import DatasetSpec, make_dataset
+from modules.data_ingestion import optimize_dtypes
+from modules.data_profiling import QUANTILES, profile_dataset
+
+def exact_profile(df, top_k):
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        column = {'null_count': int(series.isna().sum()), 'distinct': int(series.nunique()),
+                  'top_values': series.value_counts().head(top_k).to_dict(), 'describe': series.describe()}
+        if series.dtype.kind in 'iuf':
+            column['quantiles'] = series.quantile(QUANTILES).tolist()
+        columns[name] = column
+    return columns
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--numeric', type=int, default=10)
+    parser.add_argument('--categorical', type=int, default=4)
+    parser.add_argument('--cardinality', type=int, nargs='+', default=[20, 100_000])
+    parser.add_argument('--sample-rows', type=int, default=100_000)
+    parser.add_argument('--top-k', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'dataset':>40} {'exact_s':>8} {'profile_s':>9} {'speedup':>7} {'distinct_err_max':>16}")
+    for rows in args.rows:
+        for cardinality in args.cardinality:
+            spec = DatasetSpec(rows=rows, numeric=args.numeric, categorical=args.categorical,
+                               cardinality=cardinality)
+            df, _ = optimize_dtypes(make_dataset(spec))
+            start = time.perf_counter()
+            exact = exact_profile(df, args.top_k)
+            exact_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            profile = profile_dataset(df, sample_rows=args.sample_rows, top_k=args.top_k)
+            seconds = time.perf_counter() - start
+            truth = {name: max(column['distinct'], 1) for name, column in exact.items()}
+            errors = [abs(column['distinct'] - truth[column['name']]) / truth[column['name']]
+                      for column in profile['columns']]
+            print(f"{spec.name:>40} {exact_seconds:8.2f} {seconds:9.2f} {exact_seconds / seconds:6.1f}x "
+                  f"{100 * np.max(errors):15.2f}%", flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark peak memory of preprocessing a high-cardinality categorical column.
+
+Compares the dense one-hot path with the sparse path and its max_categories, hashing and target
+encoding variants; peak memory is measured with tracemalloc around fit_preprocessor.
+
+Usage: python -m benchmarks.bench_sparse_encoding --rows 20000 --cardinality 5000
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from modules.data_preprocessing import fit_preprocessor
+
+VARIANTS = {
+    'dense onehot': {},
+    'sparse onehot': {'sparse': True},
+    'sparse max_categories=100': {'sparse': True, 'max_categories': 100},
+    'sparse hashing': {'sparse': True, 'high_cardinality_encoding': 'hashing'},
+    'target': {'high_cardinality_encoding': 'target'},
+}
+
+def make_frame(rows, cardinality, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'amount': rng.normal(size=rows),
+        'country': rng.choice(['de', 'fr', 'us', 'uk'], rows),
+        'user_id': [f"user{i}" for i in rng.integers(0, cardinality, rows)],
+    })
+    y = pd.Series(rng.normal(size=rows))
+    return X, y
+
+def measure(X, y, options):
+    tracemalloc.start()
+    start = time.perf_counter()
+    _, X_out = fit_preprocessor(X, y=y, **options)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, seconds, X_out.shape
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--cardinality', type=int, default=5000)
+    args = parser.parse_args()
+
+    X, y = make_frame(args.rows, args.cardinality)
+    print(f"{args.rows} rows, {X['user_id'].nunique()} distinct user ids")
+    print(f"{'variant':>26} {'peak_mb':>9} {'seconds':>8} {'columns':>8}")
+    for name, options in VARIANTS.items():
+        peak, seconds, shape = measure(X, y, options)
+        print(f"{name:>26} {peak / 1e6:9.1f} {seconds:8.2f} {shape[1]:8d}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Load test: /predict latency while large files are uploaded.
+
+Starts the API with uvicorn in a subprocess (its data, model and upload directories in a
+temporary directory), measures single-row /predict latency on an idle server, then again
+while --uploads concurrent clients each upload a synthetic CSV of --rows rows, and prints
+the latency percentiles of both phases next to the upload times. With uploads parsed in the
+upload worker pool the two phases should look alike.
+
+Usage: python -m benchmarks.bench_upload_load --rows 500000 --uploads 3
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import httpx
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from benchmarks.synthetic import DatasetSpec, make_dataset
+
+def start_server(work_dir, port):
+    env = {**os.environ, 'LOG_LEVEL': 'WARNING', 'MODEL_PATH': os.path.join(work_dir, 'models'),
+           'DATASET_PATH': os.path.join(work_dir, 'datasets'), 'RESULT_CACHE_PATH': os.path.join(work_dir, 'cache'),
+           'UPLOAD_TMP_PATH': os.path.join(work_dir, 'uploads'), 'JOB_DB_PATH': os.path.join(work_dir, 'jobs.db'),
+           'FIT_HISTORY_PATH': os.path.join(work_dir, 'fit_history.db')}
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'backend.main:app', '--port', str(port),
+                               '--log-level', 'warning'], env=env, cwd=os.getcwd())
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('the API did not start')
+
+def percentiles(latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return f"{len(latencies):>8} {p50:8.1f} {p95:8.1f} {p99:8.1f} {max(latencies) * 1000:8.1f}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--uploads', type=int, default=3)
+    parser.add_argument('--baseline-requests', type=int, default=200)
+    parser.add_argument('--interval', type=float, default=0.01, help='seconds between /predict requests')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='auto_ml_upload_load_') as work_dir:
+        csv_path = os.path.join(work_dir, 'large.csv')
+        make_dataset(DatasetSpec(rows=args.rows)).to_csv(csv_path, index=False)
+        os.environ['MODEL_PATH'] = os.path.join(work_dir, 'models')
+        from modules import model_training
+        model_training.MODEL_PATH = os.environ['MODEL_PATH']
+        model_training.save_model(LinearRegression().fit(pd.DataFrame({'a': [1.0, 2.0, 3.0]}), [2.0, 4.0, 6.0]),
+                                  'linear.pkl')
+        server = start_server(work_dir, args.port)
+        base_url = f"http://127.0.0.1:{args.port}/api"
+        try:
+            with httpx.Client(base_url=base_url, timeout=600) as client:
+                payload = {'model_filename': 'linear.pkl', 'data': [{'a': 1.0}]}
+
+                def predict_latency():
+                    start = time.perf_counter()
+                    client.post('/model/predict', json=payload).raise_for_status()
+                    return time.perf_counter() - start
+
+                # first upload and prediction load the model and start the upload workers
+                client.post('/data/upload', files={'file': ('warmup.csv', b'a,b\n1,2\n')}).raise_for_status()
+                predict_latency()
+                baseline = []
+                for _ in range(args.baseline_requests):
+                    baseline.append(predict_latency())
+                    time.sleep(args.interval)
+
+                upload_seconds = []
+
+                def upload(i):
+                    start = time.perf_counter()
+                    with httpx.Client(base_url=base_url, timeout=600) as uploader, open(csv_path, 'rb') as f:
+                        uploader.post('/data/upload', files={'file': (f'large{i}.csv', f)}).raise_for_status()
+                    upload_seconds.append(time.perf_counter() - start)
+
+                threads = [threading.Thread(target=upload, args=(i,)) for i in range(args.uploads)]
+                for thread in threads:
+                    thread.start()
+                during = []
+                while any(thread.is_alive() for thread in threads):
+                    during.append(predict_latency())
+                    time.sleep(args.interval)
+                for thread in threads:
+                    thread.join()
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{args.uploads} uploads of {os.path.getsize(csv_path) / 1e6:.0f}MB: "
+              f"{', '.join(f'{s:.1f}s' for s in sorted(upload_seconds))}")
+        print(f"{'/predict':>16} {'requests':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'max_ms':>8}")
+        print(f"{'idle':>16} {percentiles(baseline)}")
+        print(f"{'during uploads':>16} {percentiles(during)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark request/response encodings of a feature matrix: JSON records vs. Arrow IPC vs. .npy.
+
+Each round trip is client-side encoding plus server-side decoding into a DataFrame; the JSON path
+includes the pydantic validation that List[Dict[str, Any]] request fields go through.
+
+Usage: python -m benchmarks.bench_wire_format --cells 1000000 --columns 100
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from modules.wire_format import ARROW_STREAM, NPY, decode_frame, encode_frame
+
+class Rows(BaseModel):
+    X: List[Dict[str, Any]]
+
+def make_frame(cells, columns, seed=0):
+    """Wide numeric frame shaped like a one-hot encoded matrix."""
+    rng = np.random.default_rng(seed)
+    rows = cells // columns
+    data = rng.integers(0, 2, size=(rows, columns)).astype(float)
+    data[:, :columns // 10] = rng.normal(size=(rows, columns // 10))
+    return pd.DataFrame(data, columns=[f"f{i}" for i in range(columns)])
+
+def json_round_trip(df):
+    body = json.dumps({'X': df.to_dict('records')}).encode()
+    return body, pd.DataFrame(Rows.model_validate_json(body).X)
+
+def binary_round_trip(df, content_type):
+    body = encode_frame(df, content_type)
+    return body, decode_frame(body, content_type, columns=list(df.columns))
+
+def time_call(func, *args, repeat=1):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cells', type=int, default=1_000_000)
+    parser.add_argument('--columns', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_frame(args.cells, args.columns)
+    print(f"{df.shape[0]} rows x {df.shape[1]} columns")
+    print(f"{'format':>8} {'seconds':>9} {'payload_mb':>11} {'speedup':>8}")
+    json_time, (body, _) = time_call(json_round_trip, df, repeat=args.repeat)
+    print(f"{'json':>8} {json_time:9.3f} {len(body) / 1e6:11.1f} {1:7.1f}x")
+    for name, content_type in (('arrow', ARROW_STREAM), ('npy', NPY)):
+        seconds, (body, decoded) = time_call(binary_round_trip, df, content_type, repeat=args.repeat)
+        assert decoded.shape == df.shape
+        print(f"{name:>8} {seconds:9.3f} {len(body) / 1e6:11.1f} {json_time / seconds:7.1f}x")
+
+if __name__ == '__main__':
+    main()
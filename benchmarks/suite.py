@@ -0,0 +1,251 @@
+"""Benchmark suite for the whole pipeline with a stored baseline, so performance regressions fail loudly.
+
+Times, on synthetic datasets varying rows, width, categorical cardinality and missing rate:
+the CSV upload parse, each data_preprocessing function, train_and_select_best (total and per model
+family), save_model/load_model, and /predict throughput through the FastAPI TestClient.
+
+Each benchmark reports the best of --repeat runs (setup excluded). Results are written as JSON;
+with --baseline every benchmark is compared to the stored run and the exit status is 1 when any is
+slower than the baseline by more than --tolerance (and by more than --min-delta seconds).
+
+Usage:
+    python -m benchmarks.suite --scale small --output bench.json --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --scale small --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import DatasetSpec, make_dataset, make_csv_bytes
+
+SCALES = {'small': 2_000, 'medium': 20_000, 'large': 200_000}
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MIN_DELTA = 0.005  # seconds; below this, differences are timer noise
+
+def dataset_specs(rows):
+    """Base dataset plus one variant per cost driver."""
+    base = DatasetSpec(rows=rows)
+    return [
+        base,
+        DatasetSpec(rows=rows, numeric=100),
+        DatasetSpec(rows=rows, cardinality=1000),
+        DatasetSpec(rows=rows, missing_rate=0.3),
+    ]
+
+def measure(func, setup=None, repeat=3):
+    """Best and mean wall time of func(*setup()) over repeat runs, and the last result."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        args = setup() if setup is not None else ()
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), float(np.mean(times)), result
+
+class Suite:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def add(self, name, seconds, mean=None, rows=None, **extra):
+        entry = {'name': name, 'seconds': seconds, 'mean': seconds if mean is None else mean}
+        if rows:
+            entry['rows'] = rows
+            entry['rows_per_second'] = rows / seconds if seconds > 0 else None
+        entry.update(extra)
+        self.results.append(entry)
+        throughput = f"{entry['rows_per_second']:>14,.0f} rows/s" if entry.get('rows_per_second') else ''
+        print(f"{name:<72} {seconds:9.4f}s {throughput}", flush=True)
+
+    def run(self, name, func, setup=None, rows=None, repeat=None):
+        best, mean, result = measure(func, setup, repeat or self.repeat)
+        self.add(name, best, mean, rows)
+        return result
+
+def bench_ingestion(suite, specs):
+    from modules.data_ingestion import read_csv_bytes
+    for spec in specs:
+        contents = make_csv_bytes(spec)
+        suite.run(f"ingest.read_csv_bytes[{spec.name}]", lambda: read_csv_bytes(contents), rows=spec.rows)
+
+def bench_preprocessing(suite, specs):
+    from modules.data_preprocessing import (handle_missing, encode_categorical, scale_numerical, optimize_dtypes,
+                                            fit_preprocessor)
+    for spec in specs:
+        df = make_dataset(spec)
+        X = df.drop(columns=['target'])
+        filled = handle_missing(X.copy())
+        encoded = encode_categorical(filled.copy())
+        suite.run(f"preprocess.handle_missing[{spec.name}]", handle_missing, lambda: (X.copy(),), rows=spec.rows)
+        suite.run(f"preprocess.encode_categorical[{spec.name}]", encode_categorical, lambda: (filled.copy(),),
+                  rows=spec.rows)
+        suite.run(f"preprocess.scale_numerical[{spec.name}]", scale_numerical, lambda: (encoded.copy(),),
+                  rows=spec.rows)
+        suite.run(f"preprocess.optimize_dtypes[{spec.name}]", optimize_dtypes, lambda: (df,), rows=spec.rows)
+        suite.run(f"preprocess.fit_preprocessor[{spec.name}]", fit_preprocessor, lambda: (X,), rows=spec.rows)
+        suite.run(f"preprocess.fit_preprocessor_sparse[{spec.name}]", lambda X: fit_preprocessor(X, sparse=True),
+                  lambda: (X,), rows=spec.rows)
+
+def bench_training(suite, spec):
+    from modules.data_preprocessing import fit_preprocessor
+    from modules.model_training import train_and_select_best
+    for problem in ('classification', 'regression'):
+        problem_spec = DatasetSpec(**{**spec.to_dict(), 'problem': problem})
+        df = make_dataset(problem_spec)
+        _, X = fit_preprocessor(df.drop(columns=['target']))
+        y = df['target']
+        # n_jobs=1 keeps the timing independent of the machine's core count
+        start = time.perf_counter()
+        _, metrics = train_and_select_best(X, y, n_jobs=1, memory_budget=0)
+        suite.add(f"train.train_and_select_best[{problem_spec.name}]", time.perf_counter() - start,
+                  rows=len(y), model=metrics['model_name'])
+        families = {}
+        for candidate in metrics['candidates']:
+            families[candidate['model_name']] = families.get(candidate['model_name'], 0.0) + candidate['fit_time']
+        for family, fit_time in families.items():
+            suite.add(f"train.cv_fit_time[{family}][{problem_spec.name}]", fit_time, rows=metrics['search_rows'])
+
+def _fit_pipeline(spec):
+    from sklearn.linear_model import LogisticRegression
+    from modules.data_preprocessing import fit_preprocessor
+    from modules.model_training import attach_preprocessor
+    df = make_dataset(spec)
+    X = df.drop(columns=['target'])
+    preprocessor, X_out = fit_preprocessor(X)
+    model = LogisticRegression(max_iter=1000).fit(X_out, df['target'])
+    return attach_preprocessor(preprocessor, model), X
+
+def bench_persistence(suite, spec, model_dir):
+    from modules import model_training
+    pipeline, _ = _fit_pipeline(spec)
+    path = suite.run(f"model.save_model[{spec.name}]", lambda: model_training.save_model(pipeline, 'bench.pkl'))
+    suite.results[-1]['bytes'] = os.path.getsize(path)
+    suite.run(f"model.load_model[{spec.name}]", lambda: model_training.load_model('bench.pkl'))
+
+def _records(X):
+    # JSON has no NaN: missing cells are sent as null
+    return X.astype(object).where(X.notna(), None).to_dict('records')
+
+def bench_predict(suite, spec, work_dir, requests=200):
+    from fastapi.testclient import TestClient
+    from modules import model_training, training_jobs
+    from backend.main import app
+    training_jobs.JOB_DB_PATH = os.path.join(work_dir, 'jobs.db')
+    pipeline, X = _fit_pipeline(spec)
+    model_training.save_model(pipeline, 'bench_predict.pkl')
+    single = [_records(X.iloc[[i]]) for i in range(min(requests, len(X)))]
+    bulk = _records(X)
+    with TestClient(app) as client:
+        def post(data):
+            response = client.post('/api/model/predict', json={'model_filename': 'bench_predict.pkl', 'data': data})
+            response.raise_for_status()
+            return response
+
+        post(single[0])  # load the model into the cache
+        best, mean, _ = measure(lambda: [post(data) for data in single], repeat=suite.repeat)
+        suite.add(f"predict.single_row_requests[{spec.name}]", best, mean, rows=len(single),
+                  requests_per_second=len(single) / best)
+        suite.run(f"predict.bulk_request[{spec.name}]", lambda: post(bulk), rows=len(bulk))
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, min_delta=DEFAULT_MIN_DELTA):
+    """Rows of (name, baseline seconds, seconds, ratio, status); status is 'ok', 'faster', 'regression',
+    'new' or 'missing'."""
+    previous = {entry['name']: entry['seconds'] for entry in baseline['results']}
+    current = {entry['name']: entry['seconds'] for entry in results['results']}
+    rows = []
+    for name, seconds in current.items():
+        if name not in previous:
+            rows.append((name, None, seconds, None, 'new'))
+            continue
+        before = previous[name]
+        ratio = seconds / before if before > 0 else float('inf')
+        if ratio > 1 + tolerance and seconds - before > min_delta:
+            status = 'regression'
+        elif ratio < 1 / (1 + tolerance) and before - seconds > min_delta:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, before, seconds, ratio, status))
+    rows.extend((name, seconds, None, None, 'missing') for name, seconds in previous.items() if name not in current)
+    return rows
+
+def print_comparison(rows):
+    print(f"\n{'benchmark':<72} {'baseline':>9} {'current':>9} {'ratio':>6}  status")
+    for name, before, seconds, ratio, status in rows:
+        fmt = lambda v, spec: format(v, spec) if v is not None else '-'
+        print(f"{name:<72} {fmt(before, '9.4f'):>9} {fmt(seconds, '9.4f'):>9} {fmt(ratio, '6.2f'):>6}  {status}")
+
+def environment():
+    import sklearn
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'processor': platform.machine(),
+            'cpu_count': os.cpu_count(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'sklearn': sklearn.__version__}
+
+def run_suite(scale='small', repeat=3, only=None):
+    rows = SCALES[scale]
+    specs = dataset_specs(rows)
+    suite = Suite(repeat)
+    selected = lambda group: only is None or group in only
+    with tempfile.TemporaryDirectory(prefix='auto_ml_bench_') as work_dir:
+        from modules import model_training
+        model_training.MODEL_PATH = work_dir
+        if selected('ingest'):
+            bench_ingestion(suite, specs)
+        if selected('preprocess'):
+            bench_preprocessing(suite, specs)
+        if selected('train'):
+            bench_training(suite, specs[0])
+        if selected('model'):
+            bench_persistence(suite, specs[0], work_dir)
+        if selected('predict'):
+            bench_predict(suite, specs[0], work_dir)
+    return {'scale': scale, 'repeat': repeat, 'created_at': time.time(), 'environment': environment(),
+            'results': suite.results}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', choices=['ingest', 'preprocess', 'train', 'model', 'predict'])
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare against this results file and fail on regressions')
+    parser.add_argument('--save-baseline', help='write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown as a fraction of the baseline time')
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA,
+                        help='slowdowns below this many seconds are never regressions')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.scale, args.repeat, args.only)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if args.only:
+        # benchmark names start with their group
+        baseline['results'] = [e for e in baseline['results'] if e['name'].split('.', 1)[0] in args.only]
+    if baseline.get('scale') != results['scale']:
+        print(f"Baseline was recorded at scale {baseline.get('scale')!r}, not {results['scale']!r}", file=sys.stderr)
+        return 2
+    if baseline.get('environment', {}).get('platform') != results['environment']['platform']:
+        print("Warning: baseline was recorded on a different platform", file=sys.stderr)
+    rows = compare(results, baseline, args.tolerance, args.min_delta)
+    print_comparison(rows)
+    regressions = [row for row in rows if row[-1] == 'regression']
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
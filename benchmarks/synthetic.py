@@ -0,0 +1,52 @@
+"""Synthetic datasets for the benchmark suite, parameterised by the properties that drive cost:
+rows, numeric width, number and cardinality of categorical columns, and missing-value rate.
+"""
+from dataclasses import dataclass, asdict
+import numpy as np
+import pandas as pd
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    rows: int = 10_000
+    numeric: int = 10
+    categorical: int = 2
+    cardinality: int = 20
+    missing_rate: float = 0.05
+    problem: str = 'classification'  # or 'regression'
+    seed: int = 0
+
+    @property
+    def name(self):
+        return (f"{self.problem[:5]}-r{self.rows}-n{self.numeric}-c{self.categorical}x{self.cardinality}"
+                f"-m{self.missing_rate:g}")
+
+    def to_dict(self):
+        return asdict(self)
+
+def make_dataset(spec):
+    """DataFrame with numeric columns x0.., categorical columns c0.. and a 'target' depending on both.
+
+    Missing values are injected into the features only, at spec.missing_rate per cell.
+    """
+    rng = np.random.default_rng(spec.seed)
+    numeric = rng.normal(size=(spec.rows, spec.numeric))
+    df = pd.DataFrame(numeric, columns=[f"x{i}" for i in range(spec.numeric)])
+    signal = numeric[:, :3].sum(axis=1) if spec.numeric else np.zeros(spec.rows)
+    for i in range(spec.categorical):
+        # Zipf-like frequencies, so there are frequent and rare levels as in real id columns
+        weights = 1.0 / np.arange(1, spec.cardinality + 1)
+        codes = rng.choice(spec.cardinality, spec.rows, p=weights / weights.sum())
+        df[f"c{i}"] = np.char.add(f"c{i}_", codes.astype(str)).astype(object)
+        signal = signal + (codes % 2) * 0.5
+    if spec.missing_rate:
+        mask = rng.random(df.shape) < spec.missing_rate
+        df = df.mask(mask)
+    signal = signal + rng.normal(scale=0.1, size=spec.rows)
+    if spec.problem == 'classification':
+        df['target'] = np.where(signal > np.median(signal), 'pos', 'neg')
+    else:
+        df['target'] = signal
+    return df
+
+def make_csv_bytes(spec):
+    return make_dataset(spec).to_csv(index=False).encode('utf-8')
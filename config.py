@@ -3,16 +3,95 @@ import os
 # Database configurations
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/auto_ml_db")
 POSTGRES_URI = os.getenv("POSTGRES_URI", "postgresql://localhost/auto_ml_db")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 10))
+POSTGRES_POOL_MIN = int(os.getenv("POSTGRES_POOL_MIN", 1))
+POSTGRES_POOL_MAX = int(os.getenv("POSTGRES_POOL_MAX", 10))
+INGESTION_CHUNK_SIZE = int(os.getenv("INGESTION_CHUNK_SIZE", 10000))  # rows per database fetch
 
 # Logging configuration
 LOG_FILE = "logs/auto_ml.log"
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
-# Model save path
+# Model save path (created by the first save_model; importing config has no side effects)
 MODEL_PATH = os.getenv("MODEL_PATH", "models/")
 
-# Ensure model directory exists
-os.makedirs(MODEL_PATH, exist_ok=True)
+# Model search: worker processes shared by all candidates and CV folds (-1 = all cores)
+TRAINING_N_JOBS = int(os.getenv("TRAINING_N_JOBS", -1))
 
-# Other configs
-MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
\ No newline at end of file
+# Asynchronous training jobs
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "database/jobs.db")
+MAX_CONCURRENT_TRAININGS = int(os.getenv("MAX_CONCURRENT_TRAININGS", 2))  # in the single job runner, not per server worker
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1))  # how often the runner looks for queued jobs and heartbeats
+JOB_HEARTBEAT_TIMEOUT = float(os.getenv("JOB_HEARTBEAT_TIMEOUT", 30))  # seconds after which a silent runner's jobs are requeued
+
+# In-process cache of loaded models used by /predict
+MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", 1024 * 1024 * 1024))  # 1GB of model files
+MODEL_CACHE_WARMUP = [f for f in os.getenv("MODEL_CACHE_WARMUP", "").split(",") if f]  # model filenames loaded at startup
+
+# Model artifacts: joblib compression ('none' or 'lz4', 'zlib:3', 'lzma:1', ...) and read-only memory
+# mapping of uncompressed artifacts, so processes serving the same model share its pages
+MODEL_COMPRESSION = os.getenv("MODEL_COMPRESSION", "none")
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") == "1"
+
+# Production server (backend/gunicorn_conf.py): worker processes forked from a master that preloads
+# MODEL_CACHE_WARMUP, recycled gracefully after a number of requests
+SERVER_BIND = os.getenv("SERVER_BIND", "0.0.0.0:8000")
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", os.cpu_count() or 1))
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", 10000))  # 0 = never recycle
+SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", 1000))
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", 30))  # seconds for in-flight requests
+SERVER_TIMEOUT = int(os.getenv("SERVER_TIMEOUT", 120))  # seconds of silence before a worker is restarted
+
+# Micro-batching of concurrent /predict requests
+PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", 256))  # rows per vectorized predict call
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", 2))  # how long a request waits for others to join its batch
+
+# Server-side dataset store (Parquet files keyed by content hash)
+DATASET_PATH = os.getenv("DATASET_PATH", "database/datasets/")
+DATASET_STORE_MAX_BYTES = int(os.getenv("DATASET_STORE_MAX_BYTES", 5 * 1024 * 1024 * 1024))  # 5GB
+DATASET_JSON_MAX_ROWS = int(os.getenv("DATASET_JSON_MAX_ROWS", 10000))  # rows per page of /datasets/{id}/data as JSON
+
+# CSV upload parsing
+CSV_SNIFF_BYTES = int(os.getenv("CSV_SNIFF_BYTES", 64 * 1024))  # prefix used to detect encoding and delimiter
+CSV_PARSER_ENGINE = os.getenv("CSV_PARSER_ENGINE", "c")  # 'c' or 'pyarrow'
+
+# Categorical columns with more distinct values than this use the high cardinality encoding
+CATEGORICAL_CARDINALITY_THRESHOLD = int(os.getenv("CATEGORICAL_CARDINALITY_THRESHOLD", 50))
+
+# Dtype optimization after ingestion: string columns with at most this share of distinct values become `category`
+CATEGORY_MAX_RATIO = float(os.getenv("CATEGORY_MAX_RATIO", 0.5))
+
+# Model search runs on a row sample when the training split is larger than this (0 = no limit)
+TRAINING_MEMORY_BUDGET = int(os.getenv("TRAINING_MEMORY_BUDGET", 512 * 1024 * 1024))  # 512MB
+
+# Out-of-core training: passes over the data and rows reservoir-sampled for evaluation
+INCREMENTAL_EPOCHS = int(os.getenv("INCREMENTAL_EPOCHS", 3))
+INCREMENTAL_HOLDOUT_ROWS = int(os.getenv("INCREMENTAL_HOLDOUT_ROWS", 10000))
+
+# Disk cache of preprocessing results and per-candidate CV scores, keyed by content hash
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "database/cache/")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))  # 2GB
+
+# Dataset profiles computed at ingestion: rows sampled for quantiles and top values, top values kept per column
+PROFILE_SAMPLE_ROWS = int(os.getenv("PROFILE_SAMPLE_ROWS", 100000))
+PROFILE_TOP_K = int(os.getenv("PROFILE_TOP_K", 5))
+
+# Observed fit times per model family, which calibrate the registry's cost estimates (latest FIT_HISTORY_WINDOW used)
+FIT_HISTORY_PATH = os.getenv("FIT_HISTORY_PATH", "database/fit_history.db")
+FIT_HISTORY_WINDOW = int(os.getenv("FIT_HISTORY_WINDOW", 50))
+
+# Instrumentation: per-request cProfile dumps for requests sending an X-Profile header (off by default)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_PATH = os.getenv("PROFILE_PATH", "logs/profiles/")
+
+# Batch scoring (/api/model/score): files read and written through the API must be under BATCH_SCORING_PATH
+BATCH_SCORING_PATH = os.getenv("BATCH_SCORING_PATH", "database/scoring/")
+SCORING_CHUNK_SIZE = int(os.getenv("SCORING_CHUNK_SIZE", 50000))  # rows scored per predict call
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", 1))  # processes scoring chunks in parallel (1 = in process)
+
+# Uploads: streamed to UPLOAD_TMP_PATH (on disk, not a RAM-backed /tmp) and rejected with 413 past MAX_FILE_SIZE,
+# then parsed by UPLOAD_WORKERS processes running at a lower CPU priority (UPLOAD_WORKER_NICE) than the API
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 100 * 1024 * 1024))  # 100MB
+UPLOAD_TMP_PATH = os.getenv("UPLOAD_TMP_PATH", "database/uploads/")
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", 2))
+UPLOAD_WORKER_NICE = int(os.getenv("UPLOAD_WORKER_NICE", 10))
\ No newline at end of file
@@ -5,11 +5,34 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from io import BytesIO
 import json
+import time
 
 API_BASE = "http://localhost:8000/api"
 
 st.title("Auto ML Suite")
 
+def show_profile(profile):
+    """Column profile table, with a warning for columns flagged as poor features."""
+    if not profile:
+        return
+    rows = [{
+        'column': c['name'],
+        'dtype': c['dtype'],
+        'null %': round(100 * c['null_rate'], 1),
+        'distinct': c['distinct'],
+        'min': c.get('min'),
+        'median': (c.get('quantiles') or {}).get('p50'),
+        'max': c.get('max'),
+        'top values': ', '.join(f"{v['value']} ({v['count']})" for v in c['top_values']),
+        'flags': ', '.join(c['flags']),
+    } for c in profile['columns']]
+    if profile.get('sampled_rows'):
+        st.caption(f"Quantiles and top values from a sample of {profile['sampled_rows']} of {profile['rows']} rows")
+    st.dataframe(pd.DataFrame(rows).astype({'min': str, 'median': str, 'max': str}))
+    flagged = [f"{c['name']} ({', '.join(c['flags'])})" for c in profile['columns'] if c['flags']]
+    if flagged:
+        st.warning(f"Columns that are unlikely to be useful features: {'; '.join(flagged)}")
+
 # Initialize session state
 if 'upload_error' not in st.session_state:
     st.session_state.upload_error = None
@@ -47,9 +70,11 @@ if uploaded_file:
                 if response.status_code == 200:
                     data = response.json()
                     st.session_state.upload_success = data['message']
+                    st.session_state['dataset_id'] = data['dataset_id']
                     st.session_state['columns'] = data['columns']
+                    st.session_state['shape'] = data['shape']
                     st.session_state['data'] = data['preview']
-                    st.session_state['df'] = pd.DataFrame(data['data'])
+                    st.session_state['profile'] = data.get('profile')
                 else:
                     error_msg = response.json().get('detail', 'Upload failed')
                     st.session_state.upload_error = error_msg
@@ -66,9 +91,10 @@ with upload_status:
         st.error(st.session_state.upload_error)
     elif st.session_state.upload_success:
         st.success(st.session_state.upload_success)
-        if 'df' in st.session_state:
-            st.write(f"Shape: {st.session_state['df'].shape}")
+        if 'dataset_id' in st.session_state:
+            st.write(f"Shape: {tuple(st.session_state['shape'])}")
             st.dataframe(pd.DataFrame(st.session_state.get('data', [])))
+            show_profile(st.session_state.get('profile'))
 
 
 # DB load
@@ -86,55 +112,95 @@ if st.button("Load from DB"):
         data = response.json()
         st.success(data['message'])
         st.dataframe(pd.DataFrame(data['preview']))
-        st.session_state['df'] = pd.DataFrame(data['data'])
+        show_profile(data.get('profile'))
+        st.session_state['dataset_id'] = data['dataset_id']
+        st.session_state['columns'] = data['columns']
+        st.session_state['shape'] = data['shape']
     else:
         st.error("DB load failed")
 
 # Preprocessing
-if 'df' in st.session_state:
+if 'dataset_id' in st.session_state:
     st.header("2. Data Preprocessing")
-    features = st.multiselect("Select Features (X)", st.session_state['df'].columns)
-    target = st.selectbox("Select Target (Y)", st.session_state['df'].columns)
+    features = st.multiselect("Select Features (X)", st.session_state['columns'])
+    target = st.selectbox("Select Target (Y)", st.session_state['columns'])
     if st.button("Preprocess"):
         payload = {
-            "data": st.session_state['df'].to_dict('records'),
+            "dataset_id": st.session_state['dataset_id'],
             "features": features,
             "target": target
         }
         response = requests.post(f"{API_BASE}/data/preprocess", json=payload)
         if response.status_code == 200:
             data = response.json()
-            st.session_state['X'] = pd.DataFrame(data['X'])
-            st.session_state['y'] = data['y']
-            st.success("Data preprocessed")
-            st.dataframe(st.session_state['X'].head())
+            st.session_state['processed_dataset_id'] = data['dataset_id']
+            st.session_state['target'] = data['target']
+            st.session_state['preprocessor_filename'] = data['preprocessor_filename']
+            st.session_state['features'] = features
+            st.success(f"Data preprocessed, shape: {tuple(data['shape'])}")
+            st.dataframe(pd.DataFrame(data['preview']))
         else:
             st.error("Preprocessing failed")
 
 # Training
-if 'X' in st.session_state:
+if 'processed_dataset_id' in st.session_state:
     st.header("3. Model Training")
+    search = st.selectbox("Search strategy", ["grid", "halving"])
+    time_budget = st.number_input("Time budget in seconds (0 = unlimited)", min_value=0, value=0)
     if st.button("Train Model"):
         payload = {
-            "X": st.session_state['X'].to_dict('records'),
-            "y": st.session_state['y']
+            "dataset_id": st.session_state['processed_dataset_id'],
+            "target": st.session_state['target'],
+            "preprocessor_filename": st.session_state['preprocessor_filename'],
+            "search": search,
+            "time_budget": time_budget or None
         }
         response = requests.post(f"{API_BASE}/model/train", json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            st.session_state['model_filename'] = data['model_filename']
-            st.success(f"Model trained: {data['metrics']}")
+        if response.status_code == 202:
+            st.session_state['job_id'] = response.json()['job_id']
+        else:
+            st.error("Training failed")
+
+    if 'job_id' in st.session_state:
+        job_id = st.session_state['job_id']
+        if st.button("Cancel training"):
+            requests.delete(f"{API_BASE}/model/jobs/{job_id}")
+        progress_bar = st.progress(0.0, text="Waiting for training job...")
+        # a button click reruns the script, which also ends this polling loop
+        while True:
+            job = requests.get(f"{API_BASE}/model/jobs/{job_id}").json()
+            if job['total']:
+                progress_bar.progress(job['completed'] / job['total'],
+                                      text=f"{job['status']}: {job['completed']}/{job['total']} candidates evaluated")
+            if job['status'] in ('completed', 'failed', 'cancelled'):
+                break
+            time.sleep(1)
+        del st.session_state['job_id']
+        if job['status'] == 'completed':
+            st.session_state['model_filename'] = job['model_filename']
+            metrics = job['metrics']
+            st.success(f"Model trained: {metrics['model_name']} in {metrics['training_time']:.1f}s")
             # Plot metrics
+            scores = {k: v for k, v in metrics.items() if k in ('accuracy', 'r2', 'mse')}
             fig, ax = plt.subplots()
-            ax.bar(data['metrics'].keys(), data['metrics'].values())
+            ax.bar(scores.keys(), scores.values())
             st.pyplot(fig)
+            # Per-candidate CV scores and fit times
+            candidates = pd.DataFrame(metrics['candidates'])
+            candidates['params'] = candidates['params'].astype(str)
+            st.dataframe(candidates)
+        elif job['status'] == 'cancelled':
+            st.warning("Training cancelled")
         else:
-            st.error("Training failed")
+            st.error(f"Training failed: {job['error']}")
 
 # Prediction
 if 'model_filename' in st.session_state:
     st.header("4. Model Prediction")
-    pred_data = st.text_area("Enter prediction data as JSON list of dicts")
+    pred_data = st.text_area(
+        "Enter prediction data as JSON list of dicts with the raw feature columns: "
+        + ", ".join(st.session_state.get('features', []))
+    )
     if st.button("Predict"):
         try:
             data = json.loads(pred_data)
@@ -0,0 +1,217 @@
+"""Scores large inputs through a saved model chunk by chunk, so memory stays bounded by the chunk size.
+
+Also a command line tool for scheduled jobs:
+
+    python -m modules.batch_scoring model.pkl --input data.csv --output predictions.parquet
+    python -m modules.batch_scoring model.pkl --query "SELECT * FROM events ORDER BY id" --output out.csv --workers 4
+"""
+import argparse
+import collections
+import io
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import BATCH_SCORING_PATH, SCORING_CHUNK_SIZE, SCORING_WORKERS
+from modules.data_ingestion import iter_csv_chunks, iter_parquet_chunks, iter_postgres_chunks
+from modules.dataset_store import iter_dataset_chunks
+from modules.instrumentation import span
+from modules.model_deployment import predict, predict_compiled
+from modules.utils import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+OUTPUT_FORMATS = ('csv', 'parquet')
+PREDICTION_COLUMN = 'prediction'
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+
+def resolve_scoring_path(path, base=None):
+    """path (relative to base, default BATCH_SCORING_PATH) as an absolute path; ValueError if it leaves base."""
+    base = os.path.realpath(base or BATCH_SCORING_PATH)
+    resolved = os.path.realpath(os.path.join(base, path))
+    if os.path.commonpath([base, resolved]) != base:
+        raise ValueError(f"Path '{path}' is outside the batch scoring directory")
+    return resolved
+
+def output_format_for(path, output_format=None):
+    if output_format is None:
+        output_format = 'parquet' if str(path).endswith(PARQUET_SUFFIXES) else 'csv'
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+    return output_format
+
+def open_chunks(input_path=None, query=None, dataset_id=None, chunk_size=SCORING_CHUNK_SIZE):
+    """Lazy chunks of a CSV or Parquet file, a PostgreSQL query or a stored dataset (exactly one of them)."""
+    if sum(source is not None for source in (input_path, query, dataset_id)) != 1:
+        raise ValueError("Exactly one of input_path, query or dataset_id must be given")
+    if input_path is not None:
+        if not os.path.isfile(input_path):
+            raise FileNotFoundError(f"Input file '{input_path}' not found")
+        if str(input_path).endswith(PARQUET_SUFFIXES):
+            return iter_parquet_chunks(input_path, chunk_size)
+        return iter_csv_chunks(input_path, chunk_size)
+    if query is not None:
+        return iter_postgres_chunks(query, chunk_size=chunk_size)
+    return iter_dataset_chunks(dataset_id, chunk_size)
+
+def score_chunk(model_filename, chunk, id_columns=()):
+    """Predictions for one chunk as a DataFrame of the id columns followed by 'prediction'."""
+    with span('score.chunk', rows=len(chunk)):
+        scored = chunk[list(id_columns)].reset_index(drop=True) if id_columns else pd.DataFrame(index=range(len(chunk)))
+        try:
+            # linear models on numeric columns skip the pipeline
+            predictions = predict_compiled(model_filename, chunk)
+        except (ValueError, KeyError, TypeError):
+            predictions = None
+        if predictions is None:
+            predictions = predict(model_filename, chunk)
+        scored[PREDICTION_COLUMN] = predictions
+        return scored
+
+def iter_scored_chunks(model_filename, chunks, id_columns=(), workers=1):
+    """Scored chunks in input order.
+
+    With workers > 1 the chunks are scored in that many processes, each with its own model
+    cache; at most 2 * workers chunks are in flight, so memory stays bounded however long
+    the input is.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield score_chunk(model_filename, chunk, id_columns)
+        return
+    # spawn, as for training jobs: the parent may be running an event loop and thread pools
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=setup_logging) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.submit(score_chunk, model_filename, chunk, tuple(id_columns)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class PredictionWriter:
+    """Appends scored chunks to a CSV or Parquet file.
+
+    The file is written under a temporary name and moved into place by close(), so readers
+    never see a partial output.
+    """
+
+    def __init__(self, path, output_format='csv'):
+        self.path = path
+        self.format = output_format_for(path, output_format)
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+        self._file = None
+        self._parquet = None
+
+    def write(self, scored):
+        if self.format == 'parquet':
+            table = pa.Table.from_pandas(scored, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self._tmp_path, table.schema)
+            else:
+                # e.g. an id column parsed as int64 in one CSV chunk and float64 in the next
+                table = table.cast(self._parquet.schema)
+            self._parquet.write_table(table)
+        else:
+            header = self._file is None
+            if header:
+                self._file = open(self._tmp_path, 'w', newline='')
+            scored.to_csv(self._file, header=header, index=False)
+
+    def close(self):
+        if self._parquet is None and self._file is None:
+            self.write(pd.DataFrame({PREDICTION_COLUMN: []}))  # empty input: a valid file with no rows
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None:
+            self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        for handle in (self._parquet, self._file):
+            if handle is not None:
+                handle.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+class _Progress:
+    def __init__(self):
+        self.rows = 0
+        self.chunks = 0
+        self.start = time.perf_counter()
+
+    def update(self, scored):
+        self.rows += len(scored)
+        self.chunks += 1
+        logger.info(f"Scored {self.rows} rows in {self.chunks} chunks, {self.rows_per_second:.0f} rows/s")
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+def score_to_file(model_filename, chunks, output_path, output_format=None, id_columns=(), workers=SCORING_WORKERS):
+    """Score chunks into output_path; returns the row and chunk counts, duration and rows/s."""
+    writer = PredictionWriter(output_path, output_format)
+    progress = _Progress()
+    with span('score.batch') as timing:
+        try:
+            for scored in iter_scored_chunks(model_filename, chunks, id_columns, workers):
+                writer.write(scored)
+                progress.update(scored)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        timing.rows = progress.rows
+    return {'output_path': output_path, 'format': writer.format, 'rows': progress.rows, 'chunks': progress.chunks,
+            'seconds': progress.seconds, 'rows_per_second': progress.rows_per_second}
+
+def iter_csv_bytes(scored_chunks):
+    """Scored chunks as CSV text, the header in the first piece, for a chunked HTTP response."""
+    progress = _Progress()
+    with span('score.stream') as timing:
+        for scored in scored_chunks:
+            buffer = io.StringIO()
+            scored.to_csv(buffer, header=progress.chunks == 0, index=False)
+            progress.update(scored)
+            yield buffer.getvalue().encode('utf-8')
+        timing.rows = progress.rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('model_filename', help='saved model under MODEL_PATH')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help='CSV or Parquet file')
+    source.add_argument('--query', help='PostgreSQL query, streamed through a server-side cursor')
+    source.add_argument('--dataset-id', help='dataset in the server-side dataset store')
+    parser.add_argument('--output', help='CSV or Parquet file to write (default: CSV on stdout)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, help='output format (default: from the --output suffix)')
+    parser.add_argument('--id-columns', nargs='+', default=[], help='input columns copied next to the predictions')
+    parser.add_argument('--chunk-size', type=int, default=SCORING_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=SCORING_WORKERS)
+    args = parser.parse_args(argv)
+
+    chunks = open_chunks(args.input, args.query, args.dataset_id, args.chunk_size)
+    if args.output is None:
+        if args.format == 'parquet':
+            parser.error('--format parquet needs --output')
+        for piece in iter_csv_bytes(iter_scored_chunks(args.model_filename, chunks, args.id_columns, args.workers)):
+            sys.stdout.buffer.write(piece)
+        return 0
+    stats = score_to_file(args.model_filename, chunks, args.output, args.format, args.id_columns, args.workers)
+    print(f"Scored {stats['rows']} rows in {stats['chunks']} chunks into {stats['output_path']} "
+          f"in {stats['seconds']:.1f}s ({stats['rows_per_second']:.0f} rows/s)", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    setup_logging()
+    sys.exit(main())
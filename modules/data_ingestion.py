@@ -1,11 +1,27 @@
 import pandas as pd
-from pymongo import MongoClient
-import psycopg2
-from config import MONGO_URI, POSTGRES_URI
+import numpy as np
+import pyarrow.parquet as pq
+import codecs
+import csv
+import io
+import itertools
+import threading
+import time
+import uuid
+from config import (MONGO_URI, POSTGRES_URI, CSV_SNIFF_BYTES, CSV_PARSER_ENGINE, INGESTION_CHUNK_SIZE,
+                    MONGO_MAX_POOL_SIZE, POSTGRES_POOL_MIN, POSTGRES_POOL_MAX, CATEGORY_MAX_RATIO)
+from modules.instrumentation import timed
 from modules.utils import get_logger
 
 logger = get_logger(__name__)
 
+CSV_DELIMITERS = ',;\t|'
+
+# Process-wide database clients, created on first use and closed on shutdown
+_mongo_client = None
+_postgres_pool = None
+_client_lock = threading.Lock()
+
 def load_csv(file_path):
     try:
         df = pd.read_csv(file_path)
@@ -15,6 +31,118 @@ def load_csv(file_path):
         logger.error(f"Error loading CSV: {e}")
         raise
 
+def sniff_encoding(prefix):
+    """Guess the text encoding of a CSV from a bounded prefix of its bytes."""
+    if prefix.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    if b'\x00' in prefix:
+        # BOM-less UTF-16: the zero byte of ASCII characters sits at the odd or even offsets
+        return 'utf-16-le' if prefix[1::2].count(0) > prefix[::2].count(0) else 'utf-16-be'
+    try:
+        # incremental decoding tolerates a multi-byte character cut off at the end of the prefix
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+def sniff_delimiter(prefix, encoding='utf-8'):
+    """Detect the delimiter from the first complete lines of a CSV prefix."""
+    try:
+        text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(prefix, final=False)
+        lines = text.splitlines()
+        if len(lines) > 1 and not text.endswith(('\n', '\r')):
+            lines = lines[:-1]  # last line may be cut off by the prefix boundary
+        delimiter = csv.Sniffer().sniff('\n'.join(lines[:20]), delimiters=CSV_DELIMITERS).delimiter
+        logger.info(f"Detected delimiter: {repr(delimiter)}")
+        return delimiter
+    except Exception as e:
+        logger.warning(f"Could not detect delimiter: {e}, using comma as default")
+        return ','
+
+def _read_csv_buffer(contents, encoding, delimiter, engine):
+    if engine == 'pyarrow':
+        # the pyarrow engine supports neither on_bad_lines nor skipinitialspace
+        return pd.read_csv(io.BytesIO(contents), encoding=encoding, sep=delimiter, engine='pyarrow')
+    return pd.read_csv(
+        io.BytesIO(contents),
+        encoding=encoding,
+        sep=delimiter,
+        on_bad_lines='skip',
+        engine=engine,
+        skipinitialspace=True
+    )
+
+@timed('ingest.csv', rows=len)
+def read_csv_bytes(contents, sniff_bytes=CSV_SNIFF_BYTES, engine=CSV_PARSER_ENGINE):
+    """Parse an in-memory CSV in a single pass.
+
+    Encoding and delimiter are sniffed from the first ``sniff_bytes`` bytes, then the
+    whole buffer is parsed once with the C (or pyarrow) engine. The python engine and
+    the latin-1 encoding are only used as fallbacks when the fast parse fails.
+    """
+    start = time.perf_counter()
+    prefix = contents[:sniff_bytes]
+    encoding = sniff_encoding(prefix)
+    delimiter = sniff_delimiter(prefix, encoding)
+    if engine == 'pyarrow' and (delimiter + ' ').encode(encoding) in prefix:
+        engine = 'c'  # leading spaces after the delimiter need skipinitialspace
+    sniffed = time.perf_counter()
+    logger.info(f"Sniffed encoding={encoding}, delimiter={repr(delimiter)} in {(sniffed - start) * 1000:.1f} ms")
+
+    try:
+        df = _read_csv_buffer(contents, encoding, delimiter, engine)
+    except UnicodeDecodeError:
+        # non UTF-8 bytes beyond the sniffed prefix
+        logger.warning(f"Encoding {encoding} failed past the sniffed prefix, retrying with latin-1")
+        encoding = 'latin-1'
+        df = _read_csv_buffer(contents, encoding, delimiter, 'c' if engine == 'pyarrow' else engine)
+    except Exception as e:
+        if engine == 'python' or isinstance(e, pd.errors.EmptyDataError):
+            raise
+        fallback = 'c' if engine == 'pyarrow' else 'python'
+        logger.warning(f"{engine} engine failed to parse CSV ({type(e).__name__}: {e}), retrying with the {fallback} engine")
+        engine = fallback
+        df = _read_csv_buffer(contents, encoding, delimiter, engine)
+    parsed = time.perf_counter()
+    logger.info(f"Parsed CSV with {engine} engine in {(parsed - sniffed) * 1000:.1f} ms, shape: {df.shape}")
+    return df
+
+UPLOAD_SUFFIXES = ('.csv', '.xlsx', '.xls')
+
+def read_file(path, filename=None):
+    """Parse a CSV or Excel file on disk; the format follows the suffix of filename (default: path)."""
+    name = filename or path
+    if name.endswith('.csv'):
+        with open(path, 'rb') as f:
+            return read_csv_bytes(f.read())
+    if name.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(path)
+    raise ValueError(f"Unsupported file type '{name}', expected one of {UPLOAD_SUFFIXES}")
+
+def iter_csv_chunks(file_path, chunk_size=INGESTION_CHUNK_SIZE, sniff_bytes=CSV_SNIFF_BYTES):
+    """Yield a CSV file as DataFrames of at most chunk_size rows without reading it whole; encoding and
+    delimiter are sniffed from its first sniff_bytes bytes."""
+    with open(file_path, 'rb') as f:
+        prefix = f.read(sniff_bytes)
+    encoding = sniff_encoding(prefix)
+    delimiter = sniff_delimiter(prefix, encoding)
+    with pd.read_csv(file_path, encoding=encoding, sep=delimiter, chunksize=chunk_size, on_bad_lines='skip',
+                     skipinitialspace=True) as reader:
+        yield from reader
+
+def iter_parquet_chunks(file_path, chunk_size=INGESTION_CHUNK_SIZE, columns=None):
+    """Yield a Parquet file as DataFrames of at most chunk_size rows, reading batch by batch."""
+    parquet_file = pq.ParquetFile(file_path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        df = batch.to_pandas()
+        # Arrow hands back None for missing strings; the preprocessing steps expect NaN
+        obj_cols = df.select_dtypes(include=['object']).columns
+        if len(obj_cols) > 0:
+            df[obj_cols] = df[obj_cols].fillna(np.nan)
+        yield df
+
 def load_excel(file_path):
     try:
         df = pd.read_excel(file_path)
@@ -24,29 +152,197 @@ def load_excel(file_path):
         logger.error(f"Error loading Excel: {e}")
         raise
 
-def load_from_mongo(collection_name, query={}, db_name="auto_ml_db"):
+def get_mongo_client():
+    """Shared MongoClient; it maintains its own connection pool."""
+    global _mongo_client
+    with _client_lock:
+        if _mongo_client is None:
+            # the drivers are imported on first use, so CSV-only deployments never load them
+            from pymongo import MongoClient
+            _mongo_client = MongoClient(MONGO_URI, maxPoolSize=MONGO_MAX_POOL_SIZE)
+            logger.info("Created MongoDB client")
+        return _mongo_client
+
+def get_postgres_pool():
+    """Shared thread-safe psycopg2 connection pool."""
+    global _postgres_pool
+    with _client_lock:
+        if _postgres_pool is None:
+            import psycopg2.pool
+            _postgres_pool = psycopg2.pool.ThreadedConnectionPool(POSTGRES_POOL_MIN, POSTGRES_POOL_MAX, POSTGRES_URI)
+            logger.info(f"Created PostgreSQL pool ({POSTGRES_POOL_MIN}-{POSTGRES_POOL_MAX} connections)")
+        return _postgres_pool
+
+def close_connections():
+    global _mongo_client, _postgres_pool
+    with _client_lock:
+        if _mongo_client is not None:
+            _mongo_client.close()
+            _mongo_client = None
+        if _postgres_pool is not None:
+            _postgres_pool.closeall()
+            _postgres_pool = None
+    logger.info("Closed database connections")
+
+def _documents_to_frame(docs, fields=None):
+    """Assemble a batch of documents column by column."""
+    if fields is None:
+        fields = list(dict.fromkeys(key for doc in docs for key in doc))
+    return pd.DataFrame({field: [doc.get(field) for doc in docs] for field in fields}, columns=fields)
+
+def _rows_to_frame(rows, columns):
+    """Assemble a batch of row tuples column by column (duplicate column names are kept)."""
+    df = pd.DataFrame({i: values for i, values in enumerate(zip(*rows))})
+    df.columns = columns
+    return df
+
+def _collect_chunks(chunks, sample=None, seed=42):
+    """Concatenate chunks, keeping a Bernoulli sample of each one when sample is a fraction."""
+    rng = np.random.default_rng(seed) if sample is not None else None
+    frames = []
+    schema = None
+    for chunk in chunks:
+        if schema is None:
+            schema = chunk.iloc[:0]
+        if rng is not None:
+            chunk = chunk[rng.random(len(chunk)) < sample]
+        if len(chunk) > 0:
+            frames.append(chunk)
+    if not frames:
+        # keep the column names of an empty or fully sampled-out result
+        return schema.reset_index(drop=True) if schema is not None else pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+def iter_mongo_chunks(collection_name, query=None, projection=None, db_name="auto_ml_db",
+                      chunk_size=INGESTION_CHUNK_SIZE, limit=None, client=None):
+    """Yield a MongoDB query result as DataFrames of at most chunk_size rows."""
+    client = client or get_mongo_client()
+    collection = client[db_name][collection_name]
+    fields = None
+    if projection:
+        fields = list(projection)
+        projection = {field: 1 for field in fields}
+        projection.setdefault('_id', 0)
+    else:
+        projection = {'_id': 0}
+    cursor = collection.find(query or {}, projection).batch_size(chunk_size)
+    if limit:
+        cursor = cursor.limit(limit)
+    try:
+        empty = True
+        while True:
+            docs = list(itertools.islice(cursor, chunk_size))
+            if not docs:
+                break
+            empty = False
+            yield _documents_to_frame(docs, fields)
+        if empty and fields:
+            yield pd.DataFrame(columns=fields)
+    finally:
+        cursor.close()
+
+def iter_postgres_chunks(query, chunk_size=INGESTION_CHUNK_SIZE, limit=None, conn=None):
+    """Yield a PostgreSQL query result as DataFrames, streamed through a server-side cursor."""
+    pool = None
+    if conn is None:
+        pool = get_postgres_pool()
+        conn = pool.getconn()
+    cursor = None
+    try:
+        # a named cursor keeps the result set on the server and fetches it chunk by chunk
+        cursor = conn.cursor(name=f"auto_ml_{uuid.uuid4().hex}")
+        cursor.itersize = chunk_size
+        cursor.execute(query)
+        fetched = 0
+        empty = True
+        while limit is None or fetched < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - fetched)
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            fetched += len(rows)
+            empty = False
+            yield _rows_to_frame(rows, [desc[0] for desc in cursor.description])
+        if empty and cursor.description:
+            yield pd.DataFrame(columns=[desc[0] for desc in cursor.description])
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if pool is not None:
+            conn.rollback()
+            pool.putconn(conn)
+
+@timed('ingest.mongo', rows=len)
+def load_from_mongo(collection_name, query=None, db_name="auto_ml_db", projection=None, limit=None, sample=None,
+                    chunk_size=INGESTION_CHUNK_SIZE, client=None):
     try:
-        client = MongoClient(MONGO_URI)
-        db = client[db_name]
-        collection = db[collection_name]
-        data = list(collection.find(query))
-        df = pd.DataFrame(data)
-        if '_id' in df.columns:
-            df.drop('_id', axis=1, inplace=True)
+        chunks = iter_mongo_chunks(collection_name, query, projection=projection, db_name=db_name,
+                                   chunk_size=chunk_size, limit=limit, client=client)
+        df = _collect_chunks(chunks, sample=sample)
         logger.info(f"Loaded data from MongoDB {collection_name}, shape: {df.shape}")
-        client.close()
         return df
     except Exception as e:
         logger.error(f"Error loading from MongoDB: {e}")
         raise
 
-def load_from_postgres(query, db_name="auto_ml_db"):
+@timed('ingest.postgres', rows=len)
+def load_from_postgres(query, db_name="auto_ml_db", limit=None, sample=None, chunk_size=INGESTION_CHUNK_SIZE, conn=None):
     try:
-        conn = psycopg2.connect(POSTGRES_URI)
-        df = pd.read_sql_query(query, conn)
+        chunks = iter_postgres_chunks(query, chunk_size=chunk_size, limit=limit, conn=conn)
+        df = _collect_chunks(chunks, sample=sample)
         logger.info(f"Loaded data from PostgreSQL, shape: {df.shape}")
-        conn.close()
         return df
     except Exception as e:
         logger.error(f"Error loading from PostgreSQL: {e}")
-        raise
\ No newline at end of file
+        raise
+
+def _nbytes(col):
+    return int(col.memory_usage(index=False, deep=True))
+
+def _downcast_float(col):
+    as_float32 = col.astype(np.float32)
+    # only when every value survives the round trip unchanged
+    if ((as_float32.astype(np.float64) == col) | col.isna()).all():
+        return as_float32
+    return col
+
+@timed('preprocess.optimize_dtypes', rows=lambda result: len(result[0]))
+def optimize_dtypes(df, category_max_ratio=CATEGORY_MAX_RATIO):
+    """Shrink a freshly ingested frame: smallest safe int/float per numeric column and `category` for
+    string columns whose distinct values are at most category_max_ratio of the rows.
+
+    Returns (optimized frame, report); the report lists the columns that changed with their
+    dtypes and bytes before and after.
+    """
+    if len(df.columns) == 0:
+        return df, []
+    columns = []
+    report = []
+    for i, col in enumerate(df.columns):
+        series = df.iloc[:, i]
+        new = series
+        if pd.api.types.is_bool_dtype(series):
+            pass
+        elif pd.api.types.is_integer_dtype(series):
+            new = pd.to_numeric(series, downcast='unsigned' if (series >= 0).all() else 'integer')
+        elif pd.api.types.is_float_dtype(series):
+            new = _downcast_float(series)
+        elif series.dtype == object and len(series) > 0:
+            n_unique = series.nunique(dropna=True)
+            is_strings = pd.api.types.infer_dtype(series, skipna=True) == 'string'
+            if is_strings and n_unique <= category_max_ratio * len(series):
+                new = series.astype('category')
+        if new.dtype != series.dtype:
+            before, after = _nbytes(series), _nbytes(new)
+            if after >= before:
+                # e.g. a category column on a handful of rows
+                new = series
+        columns.append(new)
+        if new.dtype != series.dtype:
+            report.append({'column': str(col), 'from_dtype': str(series.dtype), 'to_dtype': str(new.dtype),
+                           'bytes_before': before, 'bytes_after': after, 'bytes_saved': before - after})
+    optimized = pd.concat(columns, axis=1)
+    optimized.columns = df.columns
+    saved = sum(r['bytes_saved'] for r in report)
+    logger.info(f"Optimized dtypes of {len(report)} columns, saved {saved} bytes")
+    return optimized, report
@@ -1,12 +1,23 @@
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler, MinMaxScaler, LabelEncoder, OneHotEncoder
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.preprocessing import (StandardScaler, MinMaxScaler, MaxAbsScaler, LabelEncoder, OneHotEncoder,
+                                   OrdinalEncoder, TargetEncoder)
 from sklearn.impute import SimpleImputer
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
+from config import CATEGORICAL_CARDINALITY_THRESHOLD
+# optimize_dtypes runs at upload time, so it lives in data_ingestion, which does not import sklearn
+from modules.data_ingestion import optimize_dtypes  # noqa: F401
+from modules.instrumentation import timed
 from modules.utils import get_logger
 
 logger = get_logger(__name__)
 
+HIGH_CARDINALITY_ENCODINGS = ('onehot', 'hashing', 'target')
+HASHING_N_FEATURES = 1024
+
 def select_features_target(df, features, target):
     if target not in df.columns:
         raise ValueError(f"Target column '{target}' not found in dataframe")
@@ -18,22 +29,32 @@ def select_features_target(df, features, target):
     logger.info(f"Selected features: {features}, target: {target}")
     return X, y
 
+def _fill_value(col, strategy):
+    if strategy == 'mean':
+        return col.mean()
+    if strategy == 'median':
+        return col.median()
+    mode = col.mode(dropna=True)
+    return mode.iloc[0] if len(mode) else None
+
+@timed('preprocess.handle_missing', rows=len)
 def handle_missing(X, strategy_num='mean', strategy_cat='most_frequent'):
+    """Fill missing values column by column, so every column keeps its own dtype."""
     num_cols = X.select_dtypes(include=['number']).columns
     cat_cols = X.select_dtypes(include=['object', 'category']).columns
     
-    transformers = []
-    if len(num_cols) > 0:
-        transformers.append(('num_imputer', SimpleImputer(strategy=strategy_num), num_cols))
-    if len(cat_cols) > 0:
-        transformers.append(('cat_imputer', SimpleImputer(strategy=strategy_cat), cat_cols))
-    
-    if transformers:
-        preprocessor = ColumnTransformer(transformers=transformers, remainder='passthrough')
-        X = pd.DataFrame(preprocessor.fit_transform(X), columns=X.columns)
+    fill_values = {}
+    for col in num_cols:
+        fill_values[col] = _fill_value(X[col], strategy_num)
+    for col in cat_cols:
+        fill_values[col] = _fill_value(X[col], strategy_cat)
+    fill_values = {col: value for col, value in fill_values.items() if value is not None and not pd.isna(value)}
+    if fill_values:
+        X = X.fillna(fill_values)
     logger.info("Handled missing values")
     return X
 
+@timed('preprocess.encode_categorical', rows=len)
 def encode_categorical(X, encoding='onehot'):
     cat_cols = X.select_dtypes(include=['object', 'category']).columns
     if len(cat_cols) == 0:
@@ -52,19 +73,124 @@ def encode_categorical(X, encoding='onehot'):
     logger.info(f"Encoded categorical columns with {encoding}")
     return X
 
+def _make_scaler(scaler, sparse=False):
+    # centring would densify a sparse block, so sparse input is only scaled
+    if scaler == 'minmax':
+        return MaxAbsScaler() if sparse else MinMaxScaler()
+    if scaler != 'standard':
+        logger.warning(f"Unknown scaler type '{scaler}', defaulting to standard")
+    return StandardScaler(with_mean=not sparse)
+
+class HashingEncoder(TransformerMixin, BaseEstimator):
+    """Hashes 'column=value' tokens into a fixed number of columns, whatever the cardinality."""
+
+    def __init__(self, n_features=HASHING_N_FEATURES, sparse_output=True):
+        self.n_features = n_features
+        self.sparse_output = sparse_output
+
+    def fit(self, X, y=None):
+        X = pd.DataFrame(X)
+        self.feature_names_in_ = np.asarray([str(c) for c in X.columns], dtype=object)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def transform(self, X):
+        X = pd.DataFrame(X)
+        hasher = FeatureHasher(n_features=self.n_features, input_type='string', alternate_sign=False)
+        tokens = (col + '=' + X.iloc[:, i].astype(str) for i, col in enumerate(self.feature_names_in_))
+        out = hasher.transform(zip(*tokens))
+        return out if self.sparse_output else out.toarray()
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray([f"hash_{i}" for i in range(self.n_features)], dtype=object)
+
+def _make_encoder(encoding, sparse, max_categories=None, min_frequency=None):
+    if encoding == 'label':
+        return OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1,
+                              max_categories=max_categories, min_frequency=min_frequency)
+    if encoding == 'hashing':
+        return HashingEncoder(sparse_output=sparse)
+    if encoding == 'target':
+        return TargetEncoder(random_state=0)
+    if max_categories is not None or min_frequency is not None:
+        # rare and unseen categories share one infrequent column
+        return OneHotEncoder(sparse_output=sparse, drop='first', handle_unknown='infrequent_if_exist',
+                             max_categories=max_categories, min_frequency=min_frequency)
+    return OneHotEncoder(sparse_output=sparse, drop='first', handle_unknown='ignore')
+
+@timed('preprocess.scale_numerical', rows=len)
 def scale_numerical(X, scaler='standard'):
     num_cols = X.select_dtypes(include=['number']).columns
     if len(num_cols) == 0:
         return X
     
-    if scaler == 'standard':
-        sc = StandardScaler()
-    elif scaler == 'minmax':
-        sc = MinMaxScaler()
-    else:
-        logger.warning(f"Unknown scaler type '{scaler}', defaulting to standard")
-        sc = StandardScaler()
-    
+    sc = _make_scaler(scaler)
     X[num_cols] = sc.fit_transform(X[num_cols])
     logger.info(f"Scaled numerical columns with {scaler} scaler")
-    return X
\ No newline at end of file
+    return X
+
+def build_preprocessor(X, strategy_num='mean', strategy_cat='most_frequent', encoding='onehot', scaler='standard',
+                       sparse=False, max_categories=None, min_frequency=None, high_cardinality_encoding=None,
+                       cardinality_threshold=CATEGORICAL_CARDINALITY_THRESHOLD):
+    """Unfitted ColumnTransformer doing what handle_missing, encode_categorical and scale_numerical do.
+
+    Once fitted it is saved together with the trained model, so predictions go
+    through exactly the transform seen during training.
+
+    With sparse=True the output is a CSR matrix instead of a DataFrame. Categorical columns with
+    more than cardinality_threshold distinct values use high_cardinality_encoding ('onehot',
+    'hashing' or 'target', default: the same as encoding); max_categories and min_frequency
+    cap the one-hot columns.
+    """
+    if high_cardinality_encoding is not None and high_cardinality_encoding not in HIGH_CARDINALITY_ENCODINGS:
+        raise ValueError(f"Unknown high cardinality encoding '{high_cardinality_encoding}', "
+                         f"expected one of {HIGH_CARDINALITY_ENCODINGS}")
+    num_cols = list(X.select_dtypes(include=['number']).columns)
+    cat_cols = list(X.select_dtypes(include=['object', 'category']).columns)
+    high_cols = [c for c in cat_cols if X[c].nunique() > cardinality_threshold] if high_cardinality_encoding else []
+    low_cols = [c for c in cat_cols if c not in high_cols]
+
+    def categorical_pipeline(encoder_type):
+        encoder = _make_encoder(encoder_type, sparse, max_categories, min_frequency)
+        return Pipeline([
+            ('imputer', SimpleImputer(strategy=strategy_cat)),
+            ('encoder', encoder),
+            ('scaler', _make_scaler(scaler, sparse=sparse and encoder_type in ('onehot', 'hashing'))),
+        ])
+
+    transformers = []
+    if num_cols:
+        transformers.append(('num', Pipeline([
+            ('imputer', SimpleImputer(strategy=strategy_num)),
+            ('scaler', _make_scaler(scaler)),
+        ]), num_cols))
+    if low_cols:
+        transformers.append(('cat', categorical_pipeline(encoding), low_cols))
+    if high_cols:
+        logger.info(f"High cardinality columns encoded with {high_cardinality_encoding}: {high_cols}")
+        transformers.append(('high_cat', categorical_pipeline(high_cardinality_encoding), high_cols))
+    if sparse:
+        # any sparse block makes the whole output CSR
+        return ColumnTransformer(transformers=transformers, remainder='passthrough', sparse_threshold=1.0,
+                                 verbose_feature_names_out=False)
+    preprocessor = ColumnTransformer(transformers=transformers, remainder='passthrough', verbose_feature_names_out=False)
+    # DataFrame output keeps the feature names the downstream estimator was fitted with
+    return preprocessor.set_output(transform='pandas')
+
+@timed('preprocess.fit', rows=lambda result: result[1].shape[0])
+def fit_preprocessor(X, strategy_num='mean', strategy_cat='most_frequent', encoding='onehot', scaler='standard',
+                     y=None, **options):
+    """Fit build_preprocessor(X, ..., **options); y is only needed for target encoding."""
+    preprocessor = build_preprocessor(X, strategy_num, strategy_cat, encoding, scaler, **options)
+    X_out = preprocessor.fit_transform(X, y)
+    logger.info(f"Fitted preprocessing pipeline: {X.shape[1]} input columns -> {X_out.shape[1]} output columns")
+    return preprocessor, X_out
+
+def to_frame(preprocessor, X_out):
+    """Output of a fitted preprocessor as a DataFrame; sparse output becomes sparse columns."""
+    if isinstance(X_out, pd.DataFrame):
+        return X_out
+    columns = [str(c) for c in preprocessor.get_feature_names_out()]
+    if hasattr(X_out, 'tocsr'):
+        return pd.DataFrame.sparse.from_spmatrix(X_out.tocsr(), columns=columns)
+    return pd.DataFrame(X_out, columns=columns)
\ No newline at end of file
@@ -0,0 +1,170 @@
+import warnings
+import numpy as np
+import pandas as pd
+from config import PROFILE_SAMPLE_ROWS, PROFILE_TOP_K
+from modules.dataset_store import load_dataset
+from modules.instrumentation import timed
+from modules.result_cache import result_cache, make_key
+from modules.utils import get_logger
+
+logger = get_logger(__name__)
+
+HLL_PRECISION = 12  # 4096 one-byte registers per column, about 1.6% standard error
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+MOSTLY_NULL_RATE = 0.5  # null share from which a column is flagged 'mostly_null'
+ID_LIKE_RATIO = 0.95  # distinct share of the non-null values from which an integer or text column is flagged 'id_like'
+ID_LIKE_MIN_ROWS = 20  # too few rows to tell an identifier from a small table
+
+class HyperLogLog:
+    """Distinct-count sketch of 64-bit hashes in 2 ** precision registers; standard error 1.04 / sqrt(registers).
+
+    update() consumes a whole array of hashes in one vectorized pass, so memory stays at the
+    registers however many values a column has.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return self
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.intp)
+        # rank = position of the first set bit of the remaining width bits (width + 1 when all are zero); they
+        # fit a float64 mantissa exactly, so frexp gives their bit length
+        _, bit_length = np.frexp((hashes & np.uint64((1 << width) - 1)).astype(np.float64))
+        rank = width + 1 - bit_length
+        # register maxima from a register x rank presence table: a plain scatter instead of np.maximum.at
+        seen = np.zeros((len(self.registers), width + 2), dtype=bool)
+        seen[index, rank] = True
+        ranks = (seen * np.arange(width + 2, dtype=np.uint8)).max(axis=1).astype(np.uint8)
+        np.maximum(self.registers, ranks, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty:
+            # linear counting is more accurate for small sets
+            estimate = m * np.log(m / empty)
+        return int(round(estimate))
+
+def approximate_distinct(values, precision=HLL_PRECISION):
+    """HyperLogLog estimate of the distinct non-null values of a Series."""
+    values = values.dropna().to_numpy()
+    # categorize=False: hashing each value directly is faster than factorizing high-cardinality text first
+    hashes = pd.util.hash_array(values, categorize=False) if len(values) else np.empty(0, dtype=np.uint64)
+    return HyperLogLog(precision).update(hashes).count()
+
+def _scalar(value):
+    """JSON-friendly Python scalar (None for missing values)."""
+    if value is None or (np.ndim(value) == 0 and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value.item() if hasattr(value, 'item') else value
+
+def _kind(series):
+    if pd.api.types.is_bool_dtype(series):
+        return 'boolean'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime'
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return 'categorical'
+    return 'text'
+
+def _top_values(counts, top_k, scale):
+    """[{'value', 'count'}] of the top_k entries of a value -> count Series, counts scaled from a sample."""
+    top = counts.nlargest(top_k)
+    return [{'value': _scalar(value), 'count': int(round(count * scale))} for value, count in top.items() if count]
+
+def _distinct_and_top(series, sample, non_null, top_k, scale):
+    """HyperLogLog distinct count over every row and top values from the sample."""
+    distinct = min(approximate_distinct(series), non_null)
+    # values of a near-unique column each occur about once, so its top values say nothing
+    if non_null and distinct >= ID_LIKE_RATIO * non_null:
+        return distinct, []
+    return distinct, _top_values(sample.value_counts(dropna=True), top_k, scale)
+
+def _profile_column(series, sample, top_k, scale):
+    n_rows = len(series)
+    kind = _kind(series)
+    null_count = int(series.isna().sum())
+    non_null = n_rows - null_count
+    profile = {'name': str(series.name), 'dtype': str(series.dtype), 'kind': kind, 'null_count': null_count,
+               'null_rate': null_count / n_rows if n_rows else 0.0}
+    if kind == 'categorical':
+        # exact from the codes over every row, as cheap as a sketch
+        codes = series.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+        profile.update(distinct=int(np.count_nonzero(counts)), distinct_approximate=False)
+        profile['top_values'] = _top_values(pd.Series(counts, index=series.cat.categories), top_k, 1.0)
+    else:
+        try:
+            distinct, top_values = _distinct_and_top(series, sample, non_null, top_k, scale)
+        except (TypeError, ValueError):
+            # unhashable values, e.g. nested documents or arrays from MongoDB, are profiled by their text
+            distinct, top_values = _distinct_and_top(series.map(str, na_action='ignore'),
+                                                     sample.map(str, na_action='ignore'), non_null, top_k, scale)
+        profile.update(distinct=distinct, distinct_approximate=True, top_values=top_values)
+    profile['distinct_ratio'] = profile['distinct'] / non_null if non_null else 0.0
+    if kind in ('numeric', 'datetime'):
+        profile.update(min=_scalar(series.min()), max=_scalar(series.max()))
+    if kind == 'numeric':
+        profile.update(mean=_scalar(series.mean()), std=_scalar(series.std()))
+    flags = []
+    if n_rows and profile['null_rate'] >= MOSTLY_NULL_RATE:
+        flags.append('mostly_null')
+    if non_null and profile['distinct'] <= 1:
+        flags.append('constant')
+    integer_or_text = kind == 'text' or pd.api.types.is_integer_dtype(series)
+    if integer_or_text and non_null >= ID_LIKE_MIN_ROWS and profile['distinct_ratio'] >= ID_LIKE_RATIO:
+        flags.append('id_like')
+    profile['flags'] = flags
+    return profile
+
+@timed('ingest.profile', rows=lambda result: result['rows'])
+def profile_dataset(df, sample_rows=PROFILE_SAMPLE_ROWS, top_k=PROFILE_TOP_K, seed=0):
+    """Per-column profile of a frame: dtype, null rate, distinct count, min/max, mean, quantiles, top values
+    and flags ('mostly_null', 'constant', 'id_like') for choosing features.
+
+    Null counts, min/max and the HyperLogLog distinct counts cover every row; on frames longer
+    than sample_rows, quantiles and top values come from a uniform sample of that many rows
+    (their counts scaled to the full frame) and 'sampled_rows' says so.
+    """
+    n_rows = len(df)
+    if sample_rows and n_rows > sample_rows:
+        positions = np.sort(np.random.default_rng(seed).choice(n_rows, sample_rows, replace=False))
+        sample = df.iloc[positions]
+    else:
+        sample = df
+    scale = n_rows / len(sample) if len(sample) else 1.0
+    columns = [_profile_column(df.iloc[:, i], sample.iloc[:, i], top_k, scale) for i in range(df.shape[1])]
+    numeric = [i for i, column in enumerate(columns) if column['kind'] == 'numeric']
+    if numeric and len(sample):
+        # one pass over the sampled numeric block for every quantile of every column
+        block = sample.iloc[:, numeric].to_numpy(dtype=np.float64, na_value=np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # all-null columns get None quantiles
+            values = np.nanquantile(block, QUANTILES, axis=0)
+        for j, i in enumerate(numeric):
+            columns[i]['quantiles'] = {f"p{round(q * 100)}": _scalar(values[k, j]) for k, q in enumerate(QUANTILES)}
+    flagged = {column['name']: column['flags'] for column in columns if column['flags']}
+    if flagged:
+        logger.info(f"Profiled {df.shape[1]} columns of {n_rows} rows, flagged {flagged}")
+    return {'rows': n_rows, 'sampled_rows': len(sample) if len(sample) < n_rows else None, 'columns': columns}
+
+def dataset_profile(dataset_id, df=None):
+    """Profile of a stored dataset (df: its contents, when already loaded), computed once per dataset content
+    and kept in the result cache."""
+    key = make_key('profile', dataset_id, PROFILE_SAMPLE_ROWS, PROFILE_TOP_K)
+    profile = result_cache.get(key)
+    if profile is None:
+        profile = profile_dataset(load_dataset(dataset_id) if df is None else df)
+        result_cache.put(key, profile)
+    return profile
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import DATASET_PATH, DATASET_STORE_MAX_BYTES
+from modules.utils import get_logger
+
+logger = get_logger(__name__)
+
+DATASET_SUFFIX = ".parquet"
+SPARSE_DATASET_SUFFIX = ".npz"  # CSR components of the sparse columns plus the dense columns as Arrow IPC
+_DATASET_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+def _dataset_path(dataset_id, suffix=DATASET_SUFFIX):
+    if not isinstance(dataset_id, str) or not _DATASET_ID_RE.match(dataset_id):
+        raise ValueError(f"Invalid dataset id: {dataset_id!r}")
+    return os.path.join(DATASET_PATH, dataset_id + suffix)
+
+def _existing_path(dataset_id):
+    for suffix in (DATASET_SUFFIX, SPARSE_DATASET_SUFFIX):
+        path = _dataset_path(dataset_id, suffix)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"Dataset '{dataset_id}' not found")
+
+def _sparse_columns(df):
+    return [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)]
+
+def _to_arrow_table(df):
+    """Convert to an Arrow table, stringifying object columns Arrow cannot type (mixed values, nested documents)."""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for col in df.select_dtypes(include=['object']).columns:
+            try:
+                pa.array(df[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                logger.warning(f"Column '{col}' has mixed types, storing it as strings")
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+def compute_dataset_id(df):
+    """Content hash of a DataFrame's column names, dtypes and values."""
+    try:
+        row_hashes = pd.util.hash_pandas_object(df, index=False)
+    except TypeError:
+        row_hashes = pd.util.hash_pandas_object(df.astype(str), index=False)
+    hasher = hashlib.sha256()
+    hasher.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    hasher.update(row_hashes.to_numpy().tobytes())
+    return hasher.hexdigest()[:32]
+
+def _sparse_dataset_id(matrix, columns, dense):
+    hasher = hashlib.sha256()
+    hasher.update(repr(columns).encode())
+    for array in (matrix.data, matrix.indices, matrix.indptr, np.asarray(matrix.shape)):
+        hasher.update(np.ascontiguousarray(array).tobytes())
+    if dense.shape[1]:
+        hasher.update(compute_dataset_id(dense).encode())
+    return hasher.hexdigest()[:32]
+
+def _evict_lru(max_bytes, keep=None):
+    """Delete least recently used datasets until the store fits in max_bytes."""
+    entries = []
+    for name in os.listdir(DATASET_PATH):
+        if not name.endswith((DATASET_SUFFIX, SPARSE_DATASET_SUFFIX)):
+            continue
+        path = os.path.join(DATASET_PATH, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            logger.info(f"Evicted dataset {os.path.basename(path)} ({size} bytes)")
+        except FileNotFoundError:
+            pass
+
+def _write_sparse(df, sparse_cols, path):
+    """Write the sparse columns as one CSR matrix without densifying them."""
+    matrix = df[sparse_cols].sparse.to_coo().tocsr()
+    dense = df.drop(columns=sparse_cols)
+    sink = pa.BufferOutputStream()
+    table = _to_arrow_table(dense)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    with open(path, 'wb') as f:
+        np.savez(f, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr, shape=np.asarray(matrix.shape),
+                 sparse_columns=np.asarray(sparse_cols, dtype=str), columns=np.asarray(list(df.columns), dtype=str),
+                 dense=np.frombuffer(sink.getvalue(), dtype=np.uint8))
+
+def _read_sparse(path, columns=None):
+    import scipy.sparse as sp
+    with np.load(path, allow_pickle=False) as npz:
+        sparse_cols = list(npz['sparse_columns'])
+        all_cols = list(npz['columns'])
+        wanted = all_cols if columns is None else list(columns)
+        missing = [c for c in wanted if c not in all_cols]
+        if missing:
+            raise ValueError(f"Columns not found in dataset: {missing}")
+        parts = {}
+        wanted_sparse = [c for c in wanted if c in sparse_cols]
+        if wanted_sparse:
+            matrix = sp.csr_matrix((npz['data'], npz['indices'], npz['indptr']), shape=tuple(npz['shape']))
+            positions = [sparse_cols.index(c) for c in wanted_sparse]
+            parts['sparse'] = pd.DataFrame.sparse.from_spmatrix(matrix[:, positions].tocsc(), columns=wanted_sparse)
+        wanted_dense = [c for c in wanted if c not in sparse_cols]
+        if wanted_dense:
+            parts['dense'] = pa.ipc.open_stream(pa.py_buffer(npz['dense'].tobytes())).read_all().select(wanted_dense).to_pandas()
+    return pd.concat(list(parts.values()), axis=1)[wanted] if parts else pd.DataFrame()
+
+def save_dataset(df):
+    """Store a DataFrame and return its content-hash dataset id.
+
+    Frames with pandas sparse columns (sparse one-hot output) are stored as CSR so they never
+    get densified; everything else goes to Parquet.
+    """
+    os.makedirs(DATASET_PATH, exist_ok=True)
+    df = df.set_axis([str(c) for c in df.columns], axis=1)
+    sparse_cols = _sparse_columns(df)
+    if sparse_cols:
+        dataset_id = _sparse_dataset_id(df[sparse_cols].sparse.to_coo().tocsr(), list(df.columns),
+                                        df.drop(columns=sparse_cols))
+        path = _dataset_path(dataset_id, SPARSE_DATASET_SUFFIX)
+    else:
+        dataset_id = compute_dataset_id(df)
+        path = _dataset_path(dataset_id)
+    if os.path.exists(path):
+        os.utime(path)
+        logger.info(f"Dataset {dataset_id} already stored, reusing it")
+        return dataset_id
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if sparse_cols:
+        _write_sparse(df, sparse_cols, tmp_path)
+    else:
+        pq.write_table(_to_arrow_table(df), tmp_path)
+    os.replace(tmp_path, path)
+    logger.info(f"Stored dataset {dataset_id}, shape: {df.shape}, {os.path.getsize(path)} bytes")
+    _evict_lru(DATASET_STORE_MAX_BYTES, keep=path)
+    return dataset_id
+
+def load_dataset(dataset_id, columns=None):
+    """Load a stored dataset, optionally reading only the given columns."""
+    path = _existing_path(dataset_id)
+    if path.endswith(SPARSE_DATASET_SUFFIX):
+        df = _read_sparse(path, columns)
+    else:
+        df = pd.read_parquet(path, columns=columns)
+    # Arrow hands back None for missing strings; the preprocessing steps expect NaN
+    obj_cols = df.select_dtypes(include=['object']).columns
+    if len(obj_cols) > 0:
+        df[obj_cols] = df[obj_cols].fillna(np.nan)
+    os.utime(path)
+    logger.info(f"Loaded dataset {dataset_id}, shape: {df.shape}")
+    return df
+
+def iter_dataset_chunks(dataset_id, chunk_size, columns=None):
+    """Yield a stored Parquet dataset as DataFrames of at most chunk_size rows, reading batch by batch."""
+    path = _existing_path(dataset_id)
+    if path.endswith(SPARSE_DATASET_SUFFIX):
+        raise ValueError(f"Dataset '{dataset_id}' is sparse and cannot be streamed in chunks")
+    os.utime(path)
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        df = batch.to_pandas()
+        obj_cols = df.select_dtypes(include=['object']).columns
+        if len(obj_cols) > 0:
+            df[obj_cols] = df[obj_cols].fillna(np.nan)
+        yield df
+
+def dataset_info(dataset_id):
+    """Column names and shape of a stored dataset, read from the Parquet footer only."""
+    path = _existing_path(dataset_id)
+    if path.endswith(SPARSE_DATASET_SUFFIX):
+        with np.load(path, allow_pickle=False) as npz:
+            columns = [str(c) for c in npz['columns']]
+            return {'dataset_id': dataset_id, 'columns': columns, 'shape': (int(npz['shape'][0]), len(columns))}
+    metadata = pq.read_metadata(path)
+    columns = metadata.schema.to_arrow_schema().names
+    return {'dataset_id': dataset_id, 'columns': columns, 'shape': (metadata.num_rows, len(columns))}
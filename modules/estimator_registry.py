@@ -0,0 +1,190 @@
+"""Model families searched by the batch trainer and the out-of-core trainer, with what the search needs to
+know before fitting them: a fit cost model, sparse input and partial_fit support, and row limits.
+
+Families are registered per problem type and training mode; another family plugs in with e.g.
+
+    register_estimator(EstimatorSpec('ExtraTrees', 'classification', 'sklearn.ensemble.ExtraTreesClassifier',
+                                     {'n_estimators': [100]}, cost=0.15, row_exponent=1.1, feature_exponent=0.5))
+
+Estimator modules are imported when a family is instantiated, not when it is registered.
+"""
+import importlib
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+import numpy as np
+from config import FIT_HISTORY_PATH, FIT_HISTORY_WINDOW
+from modules.utils import get_logger
+
+logger = get_logger(__name__)
+
+PROBLEM_TYPES = ('classification', 'regression')
+MODES = ('batch', 'incremental')  # incremental families are trained chunk by chunk by modules.incremental_training
+REFERENCE_ROWS = 1000  # shape the registered costs are given for
+REFERENCE_FEATURES = 10
+KERNEL_MAX_ROWS = 50000  # kernel SVMs fit in O(rows^2) time and memory
+MIN_OBSERVATIONS = 3  # recorded fits of a family before they replace its registered cost
+
+@dataclass(frozen=True)
+class EstimatorSpec:
+    """A model family: estimator class (import path), parameter grid (anything ParameterGrid takes) and metadata.
+
+    cost is the expected seconds of one fit, averaged over the grid, on REFERENCE_ROWS x
+    REFERENCE_FEATURES; a fit on rows x features is expected to take cost * (rows / REFERENCE_ROWS)
+    ** row_exponent * (features / REFERENCE_FEATURES) ** feature_exponent. sparse: accepts scipy
+    sparse input; partial_fit: can be trained chunk by chunk; nonnegative: needs non-negative input;
+    max_rows: not searched on more rows than this. params are fixed constructor arguments.
+    """
+    name: str
+    problem_type: str
+    estimator: str
+    grid: object = field(default_factory=dict)
+    cost: float = 0.01
+    row_exponent: float = 1.0
+    feature_exponent: float = 1.0
+    sparse: bool = True
+    partial_fit: bool = False
+    nonnegative: bool = False
+    max_rows: int = None
+    mode: str = 'batch'
+    params: dict = field(default_factory=dict)
+
+    def make(self, **params):
+        module, _, class_name = self.estimator.rpartition('.')
+        return getattr(importlib.import_module(module), class_name)(**{**self.params, **params})
+
+    def shape_factor(self, rows, features):
+        return ((max(rows, 1) / REFERENCE_ROWS) ** self.row_exponent
+                * (max(features, 1) / REFERENCE_FEATURES) ** self.feature_exponent)
+
+    def estimate(self, rows, features, cost=None):
+        """Expected seconds of one fit on rows x features, from cost (e.g. FitHistory.cost) or the registered one."""
+        return (self.cost if cost is None else cost) * self.shape_factor(rows, features)
+
+    def unsupported_reason(self, rows, sparse=False):
+        """Why the family cannot be searched on this data, or None."""
+        if sparse and not self.sparse:
+            return 'does not accept sparse input'
+        if self.max_rows is not None and rows > self.max_rows:
+            return f'more than {self.max_rows} rows'
+        return None
+
+_registry = {}
+
+def register_estimator(spec, replace=False):
+    """Add a family to the search of its problem type and mode; ValueError if the name is taken (unless replace)."""
+    if spec.problem_type not in PROBLEM_TYPES:
+        raise ValueError(f"Unknown problem type '{spec.problem_type}', expected one of {PROBLEM_TYPES}")
+    if spec.mode not in MODES:
+        raise ValueError(f"Unknown training mode '{spec.mode}', expected one of {MODES}")
+    if spec.mode == 'incremental' and not spec.partial_fit:
+        raise ValueError(f"Incremental family '{spec.name}' must support partial_fit")
+    key = (spec.problem_type, spec.mode, spec.name)
+    if key in _registry and not replace:
+        raise ValueError(f"Model family '{spec.name}' is already registered for {spec.mode} {spec.problem_type}")
+    _registry[key] = spec
+    return spec
+
+def unregister_estimator(problem_type, name, mode='batch'):
+    return _registry.pop((problem_type, mode, name), None)
+
+def registered_estimators(problem_type, mode='batch'):
+    """Families of a problem type and mode, in registration order."""
+    return [spec for (p, m, _), spec in _registry.items() if p == problem_type and m == mode]
+
+# Batch costs measured with scikit-learn 1.3 on one core; the exponents follow each algorithm's complexity
+# (histogram gradient boosting grows slower than linearly in rows: binning is cheap and it stops early above 10k)
+for _spec in (
+    EstimatorSpec('LogisticRegression', 'classification', 'sklearn.linear_model.LogisticRegression',
+                  {'C': [0.1, 1, 10]}, cost=0.005),
+    EstimatorSpec('RandomForest', 'classification', 'sklearn.ensemble.RandomForestClassifier',
+                  {'n_estimators': [10, 50, 100]}, cost=0.17, row_exponent=1.1, feature_exponent=0.5),
+    EstimatorSpec('SVM', 'classification', 'sklearn.svm.SVC', {'C': [0.1, 1, 10], 'kernel': ['linear', 'rbf']},
+                  cost=0.015, row_exponent=2.0, max_rows=KERNEL_MAX_ROWS),
+    EstimatorSpec('HistGradientBoosting', 'classification', 'sklearn.ensemble.HistGradientBoostingClassifier',
+                  {'max_leaf_nodes': [15, 31]}, cost=0.2, row_exponent=0.6, feature_exponent=0.8, sparse=False),
+    EstimatorSpec('LinearRegression', 'regression', 'sklearn.linear_model.LinearRegression', cost=0.002),
+    EstimatorSpec('RandomForest', 'regression', 'sklearn.ensemble.RandomForestRegressor',
+                  {'n_estimators': [10, 50, 100]}, cost=0.4, row_exponent=1.1),
+    EstimatorSpec('SVM', 'regression', 'sklearn.svm.SVR', {'C': [0.1, 1, 10], 'kernel': ['linear', 'rbf']},
+                  cost=0.05, row_exponent=2.0, max_rows=KERNEL_MAX_ROWS),
+    EstimatorSpec('HistGradientBoosting', 'regression', 'sklearn.ensemble.HistGradientBoostingRegressor',
+                  {'max_leaf_nodes': [15, 31]}, cost=0.2, row_exponent=0.6, feature_exponent=0.8, sparse=False),
+    EstimatorSpec('SGDClassifier', 'classification', 'sklearn.linear_model.SGDClassifier',
+                  [{'loss': ['log_loss'], 'alpha': [1e-4, 1e-3]}, {'loss': ['hinge'], 'alpha': [1e-4]}],
+                  partial_fit=True, mode='incremental'),
+    EstimatorSpec('PassiveAggressive', 'classification', 'sklearn.linear_model.PassiveAggressiveClassifier',
+                  {'C': [1.0]}, partial_fit=True, mode='incremental'),
+    EstimatorSpec('MultinomialNB', 'classification', 'sklearn.naive_bayes.MultinomialNB', {'alpha': [1.0]},
+                  partial_fit=True, nonnegative=True, mode='incremental'),
+    EstimatorSpec('SGDRegressor', 'regression', 'sklearn.linear_model.SGDRegressor', {'alpha': [1e-4, 1e-3]},
+                  partial_fit=True, mode='incremental'),
+    EstimatorSpec('PassiveAggressive', 'regression', 'sklearn.linear_model.PassiveAggressiveRegressor',
+                  {'C': [0.1]}, partial_fit=True, mode='incremental'),
+):
+    register_estimator(_spec)
+
+class FitHistory:
+    """Observed fit times per model family, in a SQLite file shared by the API and the training workers.
+
+    cost() turns a family's latest window observations into its cost at the reference shape
+    (the median of seconds / shape_factor), so estimates follow this machine and data once a
+    family has been fitted a few times.
+    """
+
+    def __init__(self, path, window=FIT_HISTORY_WINDOW):
+        self.path = path
+        self.window = window
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS fit_times (
+                problem_type TEXT NOT NULL,
+                name TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                features INTEGER NOT NULL,
+                seconds REAL NOT NULL,
+                recorded_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS fit_times_family ON fit_times (problem_type, name, recorded_at)")
+        return conn
+
+    def record(self, problem_type, observations):
+        """Store (name, rows, features, seconds) per fit; failures are logged, a training never fails on them."""
+        if not observations:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany("INSERT INTO fit_times VALUES (?, ?, ?, ?, ?, ?)",
+                                     [(problem_type, name, int(rows), int(features), float(seconds), now)
+                                      for name, rows, features, seconds in observations])
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not record fit times in {self.path}: {e}")
+
+    def cost(self, spec):
+        """Observed seconds per fit at the reference shape, or None before MIN_OBSERVATIONS fits."""
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute("SELECT rows, features, seconds FROM fit_times WHERE problem_type = ? AND name = ? "
+                                    "ORDER BY recorded_at DESC LIMIT ?",
+                                    (spec.problem_type, spec.name, self.window)).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read fit times from {self.path}: {e}")
+            return None
+        if len(rows) < MIN_OBSERVATIONS:
+            return None
+        return float(np.median([seconds / spec.shape_factor(n, features) for n, features, seconds in rows]))
+
+fit_history = FitHistory(FIT_HISTORY_PATH)
@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_selection import mutual_info_classif, mutual_info_regression
+from sklearn.linear_model import Lasso, LogisticRegression
+from sklearn.utils.sparsefuncs import mean_variance_axis
+from modules.utils import get_logger
+
+logger = get_logger(__name__)
+
+SELECTION_METHODS = ('mutual_info', 'l1')
+SAMPLE_ROWS = 5000  # rows the correlation and relevance scores are computed on
+CORRELATION_BLOCK = 256  # columns per block of the correlation matrix, bounding its memory
+L1_C = 1.0  # inverse regularization of the L1 logistic regression ranking classification features
+L1_ALPHA = 0.01  # regularization of the Lasso ranking regression features (on a standardized target)
+
+def check_selection_options(options):
+    """Raise ValueError when FeatureSelector(**options) would be misconfigured."""
+    unknown = set(options) - set(FeatureSelector().get_params())
+    if unknown:
+        raise ValueError(f"Unknown feature selection options: {sorted(unknown)}")
+    method, k = options.get('method'), options.get('k')
+    if method is not None and method not in SELECTION_METHODS:
+        raise ValueError(f"Unknown feature selection method '{method}', expected one of {SELECTION_METHODS}")
+    if method == 'mutual_info' and k is None:
+        raise ValueError("Mutual information selection needs k, the number of columns to keep")
+    if k is not None and k < 1:
+        raise ValueError("k must be a positive number of columns")
+    if k is not None and method is None:
+        raise ValueError("k needs a selection method")
+    if not 0 <= (options.get('variance_threshold') or 0) < 0.25:
+        raise ValueError("variance_threshold must be in [0, 0.25)")
+    threshold = options.get('correlation_threshold')
+    if threshold is not None and not 0 < threshold <= 1:
+        raise ValueError("correlation_threshold must be in (0, 1]")
+    components = options.get('svd_components')
+    if components is not None and components < 1:
+        raise ValueError("svd_components must be a positive number of components")
+
+def _columns(X, positions):
+    return X.iloc[:, positions] if isinstance(X, pd.DataFrame) else X[:, positions]
+
+def _matrix(X):
+    """Float CSC matrix for sparse input (cheap column slices), float ndarray otherwise."""
+    if isinstance(X, pd.DataFrame):
+        X = X.sparse.to_coo() if X.dtypes.map(lambda d: isinstance(d, pd.SparseDtype)).all() else X.to_numpy()
+    if sp.issparse(X):
+        return sp.csc_matrix(X, dtype=np.float64)
+    return np.asarray(X, dtype=np.float64)
+
+def _normalized_variance(X):
+    """Variance of each column after rescaling it to [0, 1]: p * (1 - p) for a 0/1 column set in a share p
+    of the rows whatever scaler was applied to it, 0 for constant columns."""
+    if sp.issparse(X):
+        _, variance = mean_variance_axis(X, axis=0)
+        low, high = (np.asarray(bound(axis=0).todense()).ravel() for bound in (X.min, X.max))
+    else:
+        variance, low, high = X.var(axis=0), X.min(axis=0), X.max(axis=0)
+    spread = np.asarray(high - low, dtype=np.float64)
+    return np.divide(variance, spread ** 2, out=np.zeros(X.shape[1]), where=spread > 0)
+
+def _uncorrelated(X, threshold, block=CORRELATION_BLOCK):
+    """Mask keeping each column unless its absolute correlation with an earlier kept column exceeds threshold.
+
+    The correlation matrix is computed one block of columns at a time, so memory stays at
+    block x columns whatever the width.
+    """
+    n, width = X.shape
+    mean = np.asarray(X.mean(axis=0)).ravel()
+    square = np.asarray((X.multiply(X) if sp.issparse(X) else X ** 2).mean(axis=0)).ravel()
+    std = np.sqrt(np.maximum(square - mean ** 2, 0))
+    keep = std > 0
+    for start in range(0, width, block):
+        stop = min(start + block, width)
+        cross = X[:, start:stop].T @ X[:, :stop]
+        cross = cross.toarray() if sp.issparse(cross) else np.asarray(cross)
+        denominator = np.outer(std[start:stop], std[:stop])
+        corr = np.divide(cross / n - np.outer(mean[start:stop], mean[:stop]), denominator,
+                         out=np.zeros_like(denominator), where=denominator > 0)
+        for i, j in enumerate(range(start, stop)):
+            if keep[j] and np.any(np.abs(corr[i, :j][keep[:j]]) > threshold):
+                keep[j] = False
+    return keep
+
+def _relevance(X, y, method, random_state):
+    """Score of each column's relation to y: mutual information, or |coefficient| of an L1-penalized
+    linear model (summed over classes)."""
+    classification = not pd.api.types.is_numeric_dtype(pd.Series(y))
+    if method == 'mutual_info':
+        score = mutual_info_classif if classification else mutual_info_regression
+        return score(X, y, discrete_features=sp.issparse(X), random_state=random_state)
+    if classification:
+        model = LogisticRegression(penalty='l1', solver='liblinear', C=L1_C, random_state=random_state)
+        return np.abs(model.fit(X, y).coef_).sum(axis=0)
+    y = np.asarray(y, dtype=np.float64)
+    y = (y - y.mean()) / (y.std() or 1.0)
+    return np.abs(Lasso(alpha=L1_ALPHA, random_state=random_state).fit(X, y).coef_)
+
+class FeatureSelector(TransformerMixin, BaseEstimator):
+    """Drops near-constant, redundant and uninformative columns of the preprocessed matrix before the
+    model search, optionally projecting what is left onto TruncatedSVD components.
+
+    Each step works on the columns the previous one kept:
+    variance_threshold drops columns whose variance, measured after rescaling the column to
+    [0, 1], is at most this (0 drops constant columns; 0.01 drops dummies set in fewer than ~1% of
+    the rows); correlation_threshold drops the later column of each pair with an absolute
+    correlation above it; method ('mutual_info' or 'l1') keeps the k columns most related to y
+    (for 'l1' without k: those with a non-zero coefficient); svd_components projects onto that many
+    components, which suits wide sparse one-hot data. Correlation and relevance are computed on
+    at most sample_rows rows.
+    """
+
+    def __init__(self, variance_threshold=0.0, correlation_threshold=None, method=None, k=None, svd_components=None,
+                 sample_rows=SAMPLE_ROWS, random_state=0):
+        self.variance_threshold = variance_threshold
+        self.correlation_threshold = correlation_threshold
+        self.method = method
+        self.k = k
+        self.svd_components = svd_components
+        self.sample_rows = sample_rows
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        check_selection_options(self.get_params())
+        self.n_features_in_ = X.shape[1]
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray([str(c) for c in X.columns], dtype=object)
+        matrix = _matrix(X)
+        support = np.arange(matrix.shape[1])
+        self.dropped_ = {}
+
+        def keep(step, mask):
+            nonlocal support
+            if not mask.any():
+                logger.warning(f"Feature selection step '{step}' would drop every column, skipping it")
+                return
+            self.dropped_[step] = int((~mask).sum())
+            support = support[mask]
+
+        keep('variance', _normalized_variance(matrix) > (self.variance_threshold or 0))
+        rows = np.random.default_rng(self.random_state).permutation(matrix.shape[0])[:self.sample_rows]
+        rows.sort()
+        sample = matrix[rows]
+        if self.correlation_threshold is not None:
+            keep('correlation', _uncorrelated(sample[:, support], self.correlation_threshold))
+        if self.method is not None:
+            scores = _relevance(sample[:, support], np.asarray(y)[rows], self.method, self.random_state)
+            if self.k is not None:
+                mask = np.zeros(len(support), dtype=bool)
+                mask[np.argsort(-scores, kind='stable')[:self.k]] = True
+            else:
+                mask = scores > 0
+            keep(self.method, mask)
+        self.support_ = support
+        self.svd_ = None
+        if self.svd_components is not None and len(support) > 1:
+            components = min(self.svd_components, len(support) - 1)
+            self.svd_ = TruncatedSVD(n_components=components, random_state=self.random_state)
+            self.svd_.fit(matrix[:, support])
+        logger.info(f"Feature selection kept {len(support)} of {self.n_features_in_} columns, dropped {self.dropped_}")
+        return self
+
+    def transform(self, X):
+        X = _columns(X, self.support_)
+        if self.svd_ is None:
+            return X
+        projected = self.svd_.transform(_matrix(X))
+        if isinstance(X, pd.DataFrame):
+            return pd.DataFrame(projected, columns=self.get_feature_names_out(), index=X.index)
+        return projected
+
+    def get_feature_names_out(self, input_features=None):
+        if self.svd_ is not None:
+            return np.asarray([f"svd_{i}" for i in range(self.svd_.n_components)], dtype=object)
+        names = getattr(self, 'feature_names_in_', None)
+        if names is None:
+            names = np.asarray([f"x{i}" for i in range(self.n_features_in_)], dtype=object)
+        return names[self.support_]
+
+    def expand_coef(self, coef):
+        """Coefficients of a linear model fitted on the output, as coefficients on the input columns
+        (0 for dropped columns)."""
+        coef = np.atleast_2d(coef)
+        if self.svd_ is not None:
+            coef = coef @ self.svd_.components_
+        expanded = np.zeros((coef.shape[0], self.n_features_in_), dtype=np.float64)
+        expanded[:, self.support_] = coef
+        return expanded
+
+    def summary(self):
+        """Column counts per step, for the training metrics and the model manifest."""
+        summary = {'input_columns': int(self.n_features_in_), 'selected_columns': int(len(self.support_)),
+                   'dropped': dict(self.dropped_), 'method': self.method}
+        if self.svd_ is not None:
+            summary['svd_components'] = int(self.svd_.n_components)
+            summary['svd_explained_variance'] = float(self.svd_.explained_variance_ratio_.sum())
+        return summary
@@ -0,0 +1,248 @@
+import copy
+import time
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+from sklearn.metrics import accuracy_score, r2_score, mean_squared_error
+from sklearn.model_selection import ParameterGrid
+from sklearn.pipeline import Pipeline
+from config import INCREMENTAL_EPOCHS, INCREMENTAL_HOLDOUT_ROWS
+from modules.estimator_registry import registered_estimators
+from modules.model_training import detect_problem_type
+from modules.utils import get_logger
+
+logger = get_logger(__name__)
+
+MAX_CATEGORIES = 100  # one-hot columns per categorical feature, the most frequent values are kept
+CATEGORY_SKETCH_SIZE = 10 * MAX_CATEGORIES  # distinct values counted per column before rare ones are pruned
+HOLDOUT_MAX_FRACTION = 0.2  # share of the rows the holdout may take on sources smaller than holdout_rows * 5
+
+class StreamingPreprocessor(TransformerMixin, BaseEstimator):
+    """Imputer, scaler and one-hot encoder fitted from chunk-wise statistics in a single pass.
+
+    Numeric columns keep a running count, mean, variance, min and max (merged per chunk), so the
+    fitted state is independent of the row count. Categorical columns keep approximate counts of
+    their most frequent values. scaling is 'standard' or 'minmax'; 'minmax' output is
+    non-negative, as MultinomialNB requires.
+    """
+
+    def __init__(self, scaling='standard', max_categories=MAX_CATEGORIES):
+        self.scaling = scaling
+        self.max_categories = max_categories
+
+    def partial_fit(self, X, y=None):
+        if not hasattr(self, 'numeric_columns_'):
+            self.numeric_columns_ = [str(c) for c in X.select_dtypes(include=['number', 'bool']).columns]
+            self.categorical_columns_ = [str(c) for c in X.columns if str(c) not in self.numeric_columns_]
+            self.feature_names_in_ = np.asarray([str(c) for c in X.columns], dtype=object)
+            self.n_features_in_ = X.shape[1]
+            n = len(self.numeric_columns_)
+            self.count_, self.mean_, self.m2_ = np.zeros(n), np.zeros(n), np.zeros(n)
+            self.min_, self.max_ = np.full(n, np.inf), np.full(n, -np.inf)
+            self.category_counts_ = {col: {} for col in self.categorical_columns_}
+        if self.numeric_columns_:
+            values = self._numeric(X)
+            missing = np.isnan(values)
+            count = np.sum(~missing, axis=0)
+            mean = np.divide(np.nansum(values, axis=0), count, out=np.zeros(len(count)), where=count > 0)
+            m2 = np.nansum((values - mean) ** 2, axis=0)
+            # Chan et al. merge of the chunk's moments into the running ones
+            total = self.count_ + count
+            delta = mean - self.mean_
+            safe_total = np.maximum(total, 1)
+            self.mean_ = self.mean_ + delta * count / safe_total
+            self.m2_ = self.m2_ + m2 + delta ** 2 * self.count_ * count / safe_total
+            self.count_ = total
+            if len(values):
+                self.min_ = np.minimum(self.min_, np.where(missing, np.inf, values).min(axis=0))
+                self.max_ = np.maximum(self.max_, np.where(missing, -np.inf, values).max(axis=0))
+        for col in self.categorical_columns_:
+            counts = self.category_counts_[col]
+            for value, n in X[col].dropna().astype(str).value_counts().items():
+                counts[value] = counts.get(value, 0) + int(n)
+            if len(counts) > CATEGORY_SKETCH_SIZE:
+                # keep memory bounded for ID-like columns: drop the rarest values
+                kept = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:CATEGORY_SKETCH_SIZE // 2]
+                self.category_counts_[col] = dict(kept)
+        return self
+
+    def fit(self, X, y=None):
+        for attr in ('numeric_columns_', 'categorical_columns_', 'category_counts_'):
+            self.__dict__.pop(attr, None)
+        return self.partial_fit(X, y)
+
+    def _numeric(self, X):
+        return np.column_stack([pd.to_numeric(X[col], errors='coerce').to_numpy(dtype=float)
+                                for col in self.numeric_columns_]) if self.numeric_columns_ else np.empty((len(X), 0))
+
+    @property
+    def categories_(self):
+        return {col: [value for value, _ in sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self.max_categories]]
+                for col, counts in self.category_counts_.items()}
+
+    def transform(self, X):
+        X = pd.DataFrame(X)
+        parts = []
+        if self.numeric_columns_:
+            values = self._numeric(X)
+            mean = np.where(self.count_ > 0, self.mean_, 0.0)
+            values = np.where(np.isnan(values), mean, values)
+            if self.scaling == 'minmax':
+                low = np.where(np.isfinite(self.min_), self.min_, 0.0)
+                span = np.where(np.isfinite(self.max_) & (self.max_ > low), self.max_ - low, 1.0)
+                values = np.clip((values - low) / span, 0.0, None)
+            else:
+                std = np.sqrt(self.m2_ / np.maximum(self.count_, 1))
+                values = (values - mean) / np.where(std > 0, std, 1.0)
+            parts.append(values)
+        categories = self.categories_
+        for col in self.categorical_columns_:
+            values = X[col].astype(object).where(X[col].notna(), None)
+            # missing values are imputed with the most frequent category
+            if categories[col]:
+                values = values.fillna(categories[col][0])
+            values = values.astype(str).to_numpy()
+            parts.append((values[:, None] == np.asarray(categories[col], dtype=str)[None, :]).astype(float))
+        return np.hstack(parts) if parts else np.empty((len(X), 0))
+
+    def get_feature_names_out(self, input_features=None):
+        names = list(self.numeric_columns_)
+        for col, values in self.categories_.items():
+            names.extend(f"{col}_{value}" for value in values)
+        return np.asarray(names, dtype=object)
+
+def reservoir_sample(start, size, k, rng, reservoir):
+    """Algorithm R over row numbers start..start+size-1, vectorised per chunk; returns the updated reservoir."""
+    positions = np.arange(start, start + size)
+    fill = min(max(k - len(reservoir), 0), size)
+    reservoir = np.concatenate([reservoir, positions[:fill]])
+    rest = positions[fill:]
+    if len(rest):
+        slots = rng.integers(0, rest + 1)
+        accepted = slots < k
+        # a later row drawing the same slot replaces an earlier one, as in the sequential algorithm
+        reservoir[slots[accepted]] = rest[accepted]
+    return reservoir
+
+def get_incremental_models(problem_type):
+    """partial_fit-capable candidates of the estimator registry as (name, estimator, params, scaling)."""
+    candidates = []
+    for spec in registered_estimators(problem_type, mode='incremental'):
+        # minmax output is non-negative, as e.g. MultinomialNB requires
+        scaling = 'minmax' if spec.nonnegative else 'standard'
+        for params in ParameterGrid(spec.grid):
+            estimator = spec.make(**params)
+            if 'random_state' in estimator.get_params():
+                estimator.set_params(random_state=0)
+            candidates.append((spec.name, estimator, params, scaling))
+    return candidates
+
+def _score(model, X, y, problem_type):
+    y_pred = model.predict(X)
+    if problem_type == 'classification':
+        return {'accuracy': accuracy_score(y, y_pred)}
+    return {'r2': r2_score(y, y_pred), 'mse': mean_squared_error(y, y_pred)}
+
+def train_incremental(chunk_factory, target, epochs=INCREMENTAL_EPOCHS, holdout_rows=INCREMENTAL_HOLDOUT_ROWS,
+                      progress_callback=None, seed=42):
+    """Train partial_fit estimators on a chunk stream too large to hold in memory.
+
+    chunk_factory() must return a fresh iterator of DataFrame chunks in the same row order each
+    time (give SQL queries an ORDER BY). The first pass fits the preprocessing statistics and
+    reservoir-samples holdout_rows row numbers (at most a fifth of the rows); each following pass (one per epoch) trains every
+    candidate on the non-holdout rows. Memory stays bounded by the chunk and holdout sizes.
+    progress_callback(completed, total, progress) is called after each training chunk.
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    preprocessor = StreamingPreprocessor()
+    holdout = np.empty(0, dtype=np.int64)
+    classes = set()
+    problem_type = None
+    n_rows = n_chunks = 0
+    for chunk in chunk_factory():
+        if target not in chunk.columns:
+            raise ValueError(f"Target column '{target}' not found in the data")
+        y = chunk[target]
+        if problem_type is None and len(chunk):
+            problem_type = detect_problem_type(y)
+        preprocessor.partial_fit(chunk.drop(columns=[target]))
+        if problem_type == 'classification':
+            classes.update(y.dropna().unique().tolist())
+        holdout = reservoir_sample(n_rows, len(chunk), holdout_rows, rng, holdout)
+        n_rows += len(chunk)
+        n_chunks += 1
+    if n_rows == 0:
+        raise ValueError("The data source returned no rows")
+    max_holdout = max(1, int(n_rows * HOLDOUT_MAX_FRACTION))
+    if len(holdout) > max_holdout:
+        # small sources: a random subset of the reservoir is still a uniform sample
+        holdout = rng.choice(holdout, max_holdout, replace=False)
+    holdout = np.sort(holdout)
+    logger.info(f"Streaming statistics over {n_rows} rows in {n_chunks} chunks, {len(holdout)} holdout rows")
+
+    preprocessors = {'standard': preprocessor, 'minmax': copy.copy(preprocessor)}
+    preprocessors['minmax'].scaling = 'minmax'
+    candidates = get_incremental_models(problem_type)
+    models = [clone(estimator) for _, estimator, _, _ in candidates]
+    fit_times = [0.0] * len(candidates)
+    class_labels = np.array(sorted(classes, key=str), dtype=object) if classes else None
+    holdout_frames = []
+    completed, total = 0, n_chunks * epochs
+    for epoch in range(epochs):
+        offset = 0
+        for chunk in chunk_factory():
+            positions = np.arange(offset, offset + len(chunk))
+            offset += len(chunk)
+            in_holdout = np.isin(positions, holdout, assume_unique=True)
+            labelled = chunk[target].notna().to_numpy()
+            if epoch == 0 and (in_holdout & labelled).any():
+                holdout_frames.append(chunk[in_holdout & labelled])
+            train = chunk[~in_holdout & labelled]
+            if len(train):
+                train = train.iloc[rng.permutation(len(train))]
+                y = train[target].to_numpy()
+                X = train.drop(columns=[target])
+                transformed = {scaling: pre.transform(X) for scaling, pre in preprocessors.items()}
+                for i, (_, _, _, scaling) in enumerate(candidates):
+                    fit_start = time.perf_counter()
+                    if class_labels is not None:
+                        models[i].partial_fit(transformed[scaling], y, classes=class_labels)
+                    else:
+                        models[i].partial_fit(transformed[scaling], y)
+                    fit_times[i] += time.perf_counter() - fit_start
+            completed += 1
+            if progress_callback is not None:
+                progress_callback(completed, total, {'epoch': epoch + 1, 'chunk': completed - epoch * n_chunks})
+
+    if not holdout_frames:
+        raise ValueError("No labelled rows were left for the holdout")
+    holdout_frame = pd.concat(holdout_frames, ignore_index=True)
+    y_holdout = holdout_frame[target].to_numpy()
+    X_holdout = holdout_frame.drop(columns=[target])
+    scoring = 'accuracy' if problem_type == 'classification' else 'r2'
+    records = []
+    best = None
+    for i, (name, _, params, scaling) in enumerate(candidates):
+        record = {'model_name': name, 'params': params, 'holdout_score': None, 'fit_time': fit_times[i],
+                  'status': 'evaluated'}
+        try:
+            metrics = _score(models[i], preprocessors[scaling].transform(X_holdout), y_holdout, problem_type)
+            record['holdout_score'] = float(metrics[scoring])
+            if best is None or metrics[scoring] > best[1][scoring]:
+                best = (i, metrics)
+        except Exception as e:
+            # e.g. an estimator that never saw a training row
+            record.update(status='failed', reason=str(e))
+        records.append(record)
+    if best is None:
+        raise ValueError("No incremental model could be fitted on this data")
+    i, metrics = best
+    name, _, params, scaling = candidates[i]
+    model = Pipeline([('preprocessor', preprocessors[scaling]), ('model', models[i])])
+    metrics.update(model_name=name, params=params, search='incremental', epochs=epochs, rows=n_rows,
+                   holdout_rows=len(holdout_frame), candidates=records,
+                   training_time=time.perf_counter() - start)
+    logger.info(f"Incremental training: best {name} {params}, holdout {scoring}={metrics[scoring]:.4f}, "
+                f"{n_rows} rows x {epochs} epochs in {metrics['training_time']:.2f}s")
+    return model, metrics
@@ -0,0 +1,166 @@
+import asyncio
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+from config import PREDICT_MAX_BATCH_SIZE, PREDICT_MAX_WAIT_MS
+from modules.model_deployment import predict, model_cache
+from modules.utils import get_logger
+
+logger = get_logger(__name__)
+
+LATENCY_WINDOW = 10000  # most recent request latencies kept for percentiles
+WORKER_IDLE_SECONDS = 60  # a model's queue and worker are dropped after this long without requests
+
+def _signature(data):
+    """Requests are only batched with requests of the same columns and dtypes: concatenating others
+    would fill the columns one of them lacks with NaN, which the model's imputer then fills silently."""
+    return tuple(data.columns), tuple(str(dtype) for dtype in data.dtypes)
+
+class MicroBatcher:
+    """Coalesces concurrent prediction requests for the same model into one vectorized predict call.
+
+    A per-model worker takes the first queued request, waits up to max_wait_ms for more requests
+    with the same columns (or until max_batch_size rows are collected), predicts on the
+    concatenated frame in a thread and hands each caller its slice of the result. A model gets
+    its queue and worker once resolve_func (in a thread) has loaded it, so unknown model names
+    fail without leaving anything behind, and loses them after idle_seconds without requests.
+    """
+
+    def __init__(self, predict_func=predict, max_batch_size=PREDICT_MAX_BATCH_SIZE, max_wait_ms=PREDICT_MAX_WAIT_MS,
+                 resolve_func=model_cache.get, idle_seconds=WORKER_IDLE_SECONDS):
+        self.predict_func = predict_func
+        self.resolve_func = resolve_func
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.idle_seconds = idle_seconds
+        self._loop = None
+        self._queues = {}
+        self._workers = {}
+        self.batches = 0
+        self.requests = 0
+        self.fallbacks = 0
+        self.batch_size_histogram = {}
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    async def _queue_for(self, model_filename):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # queues and workers belong to one event loop
+            self._loop = loop
+            self._queues = {}
+            self._workers = {}
+        if model_filename not in self._queues:
+            # raises for a missing or unloadable model before any queue exists for it
+            await loop.run_in_executor(None, self.resolve_func, model_filename)
+        if model_filename not in self._queues:
+            self._queues[model_filename] = asyncio.Queue()
+            self._workers[model_filename] = loop.create_task(self._worker(model_filename, self._queues[model_filename]))
+        return self._queues[model_filename]
+
+    async def predict(self, model_filename, data):
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        (await self._queue_for(model_filename)).put_nowait((data, future))
+        try:
+            return await future
+        finally:
+            self._latencies.append((time.perf_counter() - start) * 1000)
+
+    async def _worker(self, model_filename, queue):
+        loop = asyncio.get_running_loop()
+        waiting = deque()  # requests with other columns than the batch being collected, first in line for the next
+        while True:
+            if waiting:
+                batch = [waiting.popleft()]
+            else:
+                try:
+                    batch = [await asyncio.wait_for(queue.get(), self.idle_seconds)]
+                except asyncio.TimeoutError:
+                    # no await between the check and the removal, so no request can slip into the queue
+                    if queue.empty():
+                        self._queues.pop(model_filename, None)
+                        self._workers.pop(model_filename, None)
+                        return
+                    continue
+            signature = _signature(batch[0][0])
+            rows = len(batch[0][0])
+            for item in list(waiting):
+                if rows >= self.max_batch_size:
+                    break
+                if _signature(item[0]) == signature:
+                    waiting.remove(item)
+                    batch.append(item)
+                    rows += len(item[0])
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if _signature(item[0]) != signature:
+                    waiting.append(item)
+                    continue
+                batch.append(item)
+                rows += len(item[0])
+            await self._run_batch(model_filename, batch, rows)
+
+    async def _run_batch(self, model_filename, batch, rows):
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+        self.requests += len(batch)
+        bucket = 1 << max(rows - 1, 0).bit_length()  # power-of-two bucket
+        self.batch_size_histogram[bucket] = self.batch_size_histogram.get(bucket, 0) + 1
+        try:
+            frame = batch[0][0] if len(batch) == 1 else pd.concat([data for data, _ in batch], ignore_index=True)
+            predictions = await loop.run_in_executor(None, self.predict_func, model_filename, frame)
+        except Exception as e:
+            if len(batch) == 1:
+                self._set_exception(batch[0][1], e)
+                return
+            # one malformed request must not fail the rest of the batch: score them one by one
+            self.fallbacks += 1
+            logger.warning(f"Batch of {len(batch)} requests for {model_filename} failed ({e}), predicting individually")
+            for data, future in batch:
+                try:
+                    result = await loop.run_in_executor(None, self.predict_func, model_filename, data)
+                    self._set_result(future, result)
+                except Exception as item_error:
+                    self._set_exception(future, item_error)
+            return
+        offset = 0
+        for data, future in batch:
+            self._set_result(future, predictions[offset:offset + len(data)])
+            offset += len(data)
+
+    @staticmethod
+    def _set_result(future, result):
+        if not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    def _set_exception(future, error):
+        if not future.done():
+            future.set_exception(error)
+
+    def stats(self):
+        latencies = np.array(self._latencies) if self._latencies else None
+        percentiles = {}
+        if latencies is not None:
+            for p in (50, 90, 99):
+                percentiles[f'p{p}'] = float(np.percentile(latencies, p))
+        return {
+            'queue_depth': {name: queue.qsize() for name, queue in self._queues.items()},
+            'requests': self.requests,
+            'batches': self.batches,
+            'fallbacks': self.fallbacks,
+            'batch_size_histogram': {str(k): v for k, v in sorted(self.batch_size_histogram.items())},
+            'latency_ms': percentiles,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+batcher = MicroBatcher()
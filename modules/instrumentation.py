@@ -0,0 +1,230 @@
+import contextvars
+import cProfile
+import functools
+import math
+import pstats
+import resource
+import sys
+import threading
+import time
+from modules.utils import get_logger
+
+logger = get_logger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+METRICS = {
+    # name: (type, help)
+    'automl_stage_seconds': ('histogram', 'Wall time of an instrumented stage'),
+    'automl_stage_cpu_seconds_total': ('counter', 'CPU time of the calling thread spent in a stage'),
+    'automl_stage_rows_total': ('counter', 'Rows processed by a stage'),
+    'automl_stage_rows_per_second': ('gauge', 'Throughput of the latest run of a stage'),
+    'automl_stage_peak_rss_bytes': ('gauge', 'Process peak resident set size when the latest run of a stage ended'),
+    'automl_http_request_seconds': ('histogram', 'HTTP request latency per route'),
+    'automl_process_peak_rss_bytes': ('gauge', 'Process peak resident set size'),
+}
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricsRegistry:
+    """Process-local counters, gauges and histograms rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}  # (name, labels) -> float
+        self._histograms = {}  # (name, labels) -> [bucket counts, sum, count]
+
+    def inc(self, name, value=1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def get(self, name, **labels):
+        """Current value of a counter or gauge, or (sum, count) of a histogram; None when never recorded."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key in self._histograms:
+                _, total, count = self._histograms[key]
+                return total, count
+            return self._values.get(key)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Picklable copy of every series, for merge() into the registry of another process."""
+        with self._lock:
+            histograms = {key: (list(counts), total, count) for key, (counts, total, count) in self._histograms.items()}
+            return dict(self._values), histograms
+
+    def merge(self, snapshot):
+        """Add the series recorded by a worker process: counters and histograms add up, gauges are replaced."""
+        values, histograms = snapshot
+        with self._lock:
+            for key, value in values.items():
+                counter = METRICS.get(key[0], ('gauge',))[0] == 'counter'
+                self._values[key] = self._values.get(key, 0.0) + value if counter else value
+            for key, (counts, total, count) in histograms.items():
+                histogram = self._histograms.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+                histogram[0] = [a + b for a, b in zip(histogram[0], counts)]
+                histogram[1] += total
+                histogram[2] += count
+
+    def render(self):
+        self.set('automl_process_peak_rss_bytes', peak_rss_bytes())
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: (list(counts), total, count) for key, (counts, total, count) in self._histograms.items()}
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            series = sorted((labels, v) for (n, labels), v in (histograms if kind == 'histogram' else values).items()
+                            if n == name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                if kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                counts, total, count = value
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {bucket_count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+def record_stage(stage, seconds, cpu_seconds=None, rows=None):
+    """Record one run of a stage whose timing was measured elsewhere, e.g. in a worker process."""
+    registry.observe('automl_stage_seconds', seconds, stage=stage)
+    if cpu_seconds is not None:
+        registry.inc('automl_stage_cpu_seconds_total', cpu_seconds, stage=stage)
+    if rows is not None:
+        registry.inc('automl_stage_rows_total', rows, stage=stage)
+        if seconds > 0:
+            registry.set('automl_stage_rows_per_second', rows / seconds, stage=stage)
+
+class Span:
+    """Times a block: wall time, CPU time of the calling thread, rows/s and the process peak RSS.
+
+    Set `rows` inside the block when the row count is only known at the end.
+    """
+
+    def __init__(self, stage, rows=None):
+        self.stage = stage
+        self.rows = rows
+        self.seconds = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._start
+        cpu_seconds = time.thread_time() - self._cpu_start
+        stage = self.stage if exc_type is None else f"{self.stage}.error"
+        record_stage(stage, self.seconds, cpu_seconds, self.rows)
+        peak = peak_rss_bytes()
+        registry.set('automl_stage_peak_rss_bytes', peak, stage=stage)
+        throughput = f", {self.rows / self.seconds:.0f} rows/s" if self.rows and self.seconds > 0 else ''
+        logger.debug(f"{stage}: {self.seconds * 1000:.1f} ms wall, {cpu_seconds * 1000:.1f} ms cpu{throughput}, "
+                     f"peak rss {peak / 1024 ** 2:.0f}MB")
+        return False
+
+def span(stage, rows=None):
+    return Span(stage, rows)
+
+def timed(stage, rows=None):
+    """Decorator recording every call as a span; rows(result) gives the row count of the output."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(stage) as s:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    s.rows = rows(result)
+                return result
+        return wrapper
+    return decorator
+
+# Per-request profiling: the HTTP middleware sets this for requests asking for a profile, and
+# profiled() adds a profiler in whichever threadpool thread runs the endpoint.
+_request_profile = contextvars.ContextVar('request_profile', default=None)
+
+class RequestProfile:
+    def __init__(self):
+        self.profilers = []
+        self._lock = threading.Lock()
+
+    def new_profiler(self):
+        profiler = cProfile.Profile()
+        with self._lock:
+            self.profilers.append(profiler)
+        return profiler
+
+    def dump(self, path):
+        stats = None
+        for profiler in self.profilers:
+            if stats is None:
+                stats = pstats.Stats(profiler)
+            else:
+                stats.add(profiler)
+        if stats is not None:
+            stats.dump_stats(path)
+
+def start_request_profile():
+    profile = RequestProfile()
+    return profile, _request_profile.set(profile)
+
+def end_request_profile(token):
+    _request_profile.reset(token)
+
+def profiled(func):
+    """Wrap a sync endpoint so it runs under its own profiler when its request is being profiled."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _request_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        profiler = profile.new_profiler()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+    return wrapper
@@ -0,0 +1,339 @@
+import json
+import os
+import threading
+import time
+import joblib
+import numpy as np
+from modules.utils import get_logger
+
+# scikit-learn is imported inside the functions that inspect a model: they only run on models that were
+# fitted or unpickled, so it is loaded by then, and importing this module for read_artifact/LinearCoefficients
+# does not load it
+
+logger = get_logger(__name__)
+
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+COEFFICIENTS_SUFFIX = ".coef.npz"
+COMPRESSION_METHODS = ('zlib', 'gzip', 'bz2', 'lzma', 'xz', 'lz4')
+MANIFEST_METRIC_EXCLUDES = ('candidates', 'rounds')  # per-candidate search details stay in the job record
+
+def parse_compression(spec):
+    """'none' or 'method[:level]' (e.g. 'lz4', 'zlib:3') as the joblib compress argument; 0 means uncompressed."""
+    if spec in (None, '', 'none', '0'):
+        return 0
+    method, _, level = str(spec).partition(':')
+    if method == 'zstd':
+        raise ValueError("zstd compression is not supported by joblib; use lz4 for speed or zlib/lzma for size")
+    if method not in COMPRESSION_METHODS:
+        raise ValueError(f"Unknown compression '{spec}', expected 'none' or one of {COMPRESSION_METHODS}[:level]")
+    if method == 'lz4':
+        try:
+            import lz4  # noqa: F401
+        except ImportError:
+            raise ValueError("lz4 compression needs the lz4 package (pip install lz4)")
+    return (method, int(level)) if level else (method, 3)
+
+def compression_name(compress):
+    return 'none' if not compress else f"{compress[0]}:{compress[1]}"
+
+def manifest_path(path):
+    return path + MANIFEST_SUFFIX
+
+def coefficients_path(path):
+    return path + COEFFICIENTS_SUFFIX
+
+def _final_estimator(model):
+    from sklearn.pipeline import Pipeline
+    return model.steps[-1][1] if isinstance(model, Pipeline) else model
+
+def _preprocessor(model):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    if isinstance(model, ColumnTransformer):
+        return model
+    if isinstance(model, Pipeline) and len(model.steps) > 1 and isinstance(model.steps[0][1], ColumnTransformer):
+        return model.steps[0][1]
+    return None
+
+def _selectors(model):
+    """FeatureSelector steps between the preprocessing and the estimator of a pipeline."""
+    from sklearn.pipeline import Pipeline
+    from modules.feature_selection import FeatureSelector
+    if not isinstance(model, Pipeline):
+        return []
+    return [step for _, step in model.steps[:-1] if isinstance(step, FeatureSelector)]
+
+def describe_feature_selection(model):
+    selectors = _selectors(model)
+    return selectors[0].summary() if selectors else None
+
+def _step_names(transformer):
+    from sklearn.pipeline import Pipeline
+    if isinstance(transformer, Pipeline):
+        return [type(step).__name__ for _, step in transformer.steps]
+    return [transformer if isinstance(transformer, str) else type(transformer).__name__]
+
+def describe_preprocessing(model):
+    """Transformers of a fitted ColumnTransformer as [{'name', 'steps', 'columns'}], or None."""
+    preprocessor = _preprocessor(model)
+    if preprocessor is None or not hasattr(preprocessor, 'transformers_'):
+        return None
+    return [{'name': name, 'steps': _step_names(transformer), 'columns': [str(c) for c in columns]}
+            for name, transformer, columns in preprocessor.transformers_
+            if not (isinstance(transformer, str) and transformer == 'drop') and len(columns)]
+
+FEATURE_DTYPES = {'numeric': 'float64', 'categorical': 'object', 'any': None}
+
+def feature_schema(model):
+    """Input columns the model expects, in order, each with its kind ('numeric', 'categorical' or 'any')
+    and the dtype it is converted to."""
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        return None
+    if _preprocessor(model) is None:
+        # a bare estimator was fitted on numbers
+        kinds = {str(name): 'numeric' for name in names}
+    else:
+        kinds = {}
+        for transformer in describe_preprocessing(model):
+            kind = {'num': 'numeric', 'remainder': 'any'}.get(transformer['name'], 'categorical')
+            kinds.update((column, kind) for column in transformer['columns'])
+    return [{'name': str(name), 'kind': kinds.get(str(name), 'any'), 'dtype': FEATURE_DTYPES[kinds.get(str(name), 'any')]}
+            for name in names]
+
+def is_linear(estimator):
+    """Plain coefficient models whose predictions are X @ coef.T + intercept (no kernel or tree)."""
+    return (type(estimator).__module__.startswith('sklearn.linear_model') and hasattr(estimator, 'coef_')
+            and hasattr(estimator, 'intercept_'))
+
+def _fold_steps(transformer, n_columns):
+    """(a, c, fill) per column when transformer computes a * x + c after replacing NaN by fill, else None."""
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler, MinMaxScaler, MaxAbsScaler
+    a, c, fill = np.ones(n_columns), np.zeros(n_columns), np.full(n_columns, np.nan)
+    if isinstance(transformer, str):
+        return (a, c, fill) if transformer == 'passthrough' else None
+    steps = [step for _, step in transformer.steps] if isinstance(transformer, Pipeline) else [transformer]
+    for step in steps:
+        if isinstance(step, SimpleImputer):
+            statistics = np.asarray(step.statistics_)
+            if step.add_indicator or statistics.dtype.kind not in 'fiu':
+                return None
+            # the imputer sees a * x + c, so a missing raw value behaves like this raw value
+            fill = np.where(np.isnan(fill), (statistics - c) / np.where(a == 0, 1, a), fill)
+        elif isinstance(step, StandardScaler):
+            mean = step.mean_ if step.with_mean else 0.0
+            scale = step.scale_ if step.with_std else 1.0
+            a, c = a / scale, (c - mean) / scale
+        elif isinstance(step, MinMaxScaler):
+            if step.clip:
+                return None
+            a, c = a * step.scale_, c * step.scale_ + step.min_
+        elif isinstance(step, MaxAbsScaler):
+            a, c = a / step.scale_, c / step.scale_
+        else:
+            return None
+    return a, c, fill
+
+def fold_preprocessing(model):
+    """Raw-input linear kernel of a pipeline whose preprocessing is only numeric imputation and scaling.
+
+    Returns (coef, intercept, feature_names, fill_values) with the scalers and any feature selection
+    folded into the coefficients, or None when the preprocessing is not affine (e.g. one-hot
+    encoding). Input columns the coefficients ignore are left out, so they are never read.
+    """
+    preprocessor = _preprocessor(model)
+    estimator = _final_estimator(model)
+    selectors = _selectors(model)
+    if preprocessor is None or len(model.steps) != 2 + len(selectors):
+        return None
+    names, a, c, fill = [], [], [], []
+    for _, transformer, columns in preprocessor.transformers_:
+        if (isinstance(transformer, str) and transformer == 'drop') or not len(columns):
+            continue
+        columns = [str(col) for col in (preprocessor.feature_names_in_[columns] if np.asarray(columns).dtype.kind in 'iub'
+                                        else columns)]
+        folded = _fold_steps(transformer, len(columns))
+        if folded is None:
+            return None
+        names.extend(columns)
+        for values, part in zip((a, c, fill), folded):
+            values.append(part)
+    if not names or len(set(names)) != len(names):
+        return None
+    a, c, fill = np.concatenate(a), np.concatenate(c), np.concatenate(fill)
+    coef = np.atleast_2d(estimator.coef_)
+    for selector in reversed(selectors):
+        coef = selector.expand_coef(coef)
+    if coef.shape[1] != len(names):
+        return None
+    intercept = np.atleast_1d(estimator.intercept_) + coef @ c
+    coef = coef * a
+    used = np.flatnonzero((coef != 0).any(axis=0))
+    names = [names[i] for i in used]
+    coef = coef[:, used]
+    return (coef if np.ndim(estimator.coef_) == 2 else coef.ravel()), intercept, names, fill[used]
+
+def _array_of_scalars(values):
+    """values as a non-object array, which np.load can read back without pickle; None if impossible."""
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = np.asarray(values.tolist())
+    return None if values.dtype == object else values
+
+def export_coefficients(model, path):
+    """Write the coefficients of a linear final estimator to path as .npz; returns False for other models.
+
+    When the pipeline's preprocessing is numeric imputation and scaling only, it is folded into the
+    coefficients (input 'raw'); otherwise the coefficients apply to the preprocessed features.
+    """
+    estimator = _final_estimator(model)
+    if not is_linear(estimator):
+        return False
+    arrays = {'coef': np.asarray(estimator.coef_), 'intercept': np.atleast_1d(estimator.intercept_),
+              'raw_input': np.asarray(_preprocessor(model) is None)}
+    if hasattr(estimator, 'feature_names_in_'):
+        arrays['feature_names'] = np.asarray(estimator.feature_names_in_, dtype=str)
+    folded = fold_preprocessing(model)
+    if folded is not None:
+        coef, intercept, names, fill = folded
+        arrays.update(coef=coef, intercept=intercept, feature_names=np.asarray(names, dtype=str), fill_values=fill,
+                      raw_input=np.asarray(True))
+    if hasattr(estimator, 'classes_'):
+        classes = _array_of_scalars(estimator.classes_)
+        if classes is None:
+            return False
+        arrays['classes'] = classes
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    return True
+
+class LinearCoefficients:
+    """Predicts from an exported coefficient file without unpickling the estimator.
+
+    When raw_input is true the coefficients apply to the model's raw input columns (feature_names,
+    missing values replaced by fill_values); otherwise to the preprocessed matrix the linear
+    estimator saw.
+    """
+
+    def __init__(self, coef, intercept, classes=None, feature_names=None, fill_values=None, raw_input=False):
+        self.coef = np.ascontiguousarray(coef)
+        self.intercept = intercept
+        self.classes = classes
+        self.feature_names = feature_names
+        self.fill_values = fill_values
+        self.raw_input = raw_input
+        self._names = [str(name) for name in feature_names] if feature_names is not None else None
+        self._coef_t = np.ascontiguousarray(self.coef.T) if self.coef.ndim == 2 else self.coef
+        self._has_fill = fill_values is not None and not np.isnan(fill_values).all()
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            get = lambda key: arrays[key] if key in arrays else None
+            raw_input = bool(arrays['raw_input']) if 'raw_input' in arrays else False
+            return cls(arrays['coef'], arrays['intercept'], get('classes'), get('feature_names'), get('fill_values'),
+                       raw_input)
+
+    def decision_function(self, X):
+        scores = np.asarray(X, dtype=self.coef.dtype) @ self._coef_t + self.intercept
+        return scores.ravel() if scores.ndim == 2 and scores.shape[1] == 1 else scores
+
+    def records_to_array(self, records):
+        """Rows given as dicts to a contiguous matrix in feature order; None becomes the fill value.
+        Raises KeyError for a row lacking a feature, as the pipeline does for a missing column, and
+        ValueError for non-numeric values or values no imputer can fill."""
+        names = self._names
+        X = np.array([[row[name] for name in names] for row in records], dtype=self.coef.dtype)
+        return self._fill(X.reshape(len(records), len(names)))
+
+    def frame_to_array(self, frame):
+        X = np.ascontiguousarray(frame[self._names].to_numpy(dtype=self.coef.dtype, na_value=np.nan))
+        return self._fill(X)
+
+    def _fill(self, X):
+        missing = np.isnan(X)
+        if missing.any():
+            if self._has_fill:
+                np.copyto(X, np.broadcast_to(self.fill_values, X.shape), where=missing)
+            if np.isnan(X).any():
+                raise ValueError("Missing values in columns without an imputer")
+        return X
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        if self.classes is None:
+            return scores
+        if scores.ndim == 1:
+            return self.classes[(scores > 0).astype(int)]
+        return self.classes[scores.argmax(axis=1)]
+
+def build_manifest(model, compress, metrics=None, coefficients_file=None, coefficients_input=None):
+    import sklearn
+    estimator = _final_estimator(model)
+    if metrics is not None:
+        metrics = {k: v for k, v in metrics.items() if k not in MANIFEST_METRIC_EXCLUDES}
+    return {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'created_at': time.time(),
+        'model_type': f"{type(estimator).__module__}.{type(estimator).__name__}",
+        'artifact_type': type(model).__name__,
+        'sklearn_version': sklearn.__version__,
+        'compression': compression_name(compress),
+        'memory_mappable': not compress,
+        'features': feature_schema(model),
+        'preprocessing': describe_preprocessing(model),
+        'feature_selection': describe_feature_selection(model),
+        'metrics': metrics,
+        'coefficients_file': coefficients_file,
+        'coefficients_input': coefficients_input,
+    }
+
+def _json_default(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return repr(value)
+
+def write_artifact(model, path, compress=0, metrics=None, coefficients=True):
+    """Dump model to path (atomically: readers that memory-mapped the old file keep their pages) and
+    write its manifest and, for linear models, its coefficient file next to it."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    joblib.dump(model, tmp_path, compress=compress)
+    os.replace(tmp_path, path)
+    coefficients_file = coefficients_input = None
+    if coefficients and export_coefficients(model, coefficients_path(path)):
+        coefficients_file = os.path.basename(coefficients_path(path))
+        coefficients_input = 'raw' if LinearCoefficients.load(coefficients_path(path)).raw_input else 'preprocessed'
+    elif os.path.exists(coefficients_path(path)):
+        os.remove(coefficients_path(path))
+    manifest = build_manifest(model, compress, metrics, coefficients_file, coefficients_input)
+    tmp_path = f"{manifest_path(path)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, default=_json_default)
+    os.replace(tmp_path, manifest_path(path))
+    return manifest
+
+def read_manifest(path):
+    """Manifest of the artifact at path, or None for files saved before the manifest existed."""
+    try:
+        with open(manifest_path(path)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get('format_version', 0) > ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Model artifact {os.path.basename(path)} has format version "
+                         f"{manifest['format_version']}, newer than the supported {ARTIFACT_FORMAT_VERSION}")
+    return manifest
+
+def read_artifact(path, mmap=True):
+    """Load the model at path; uncompressed artifacts are memory-mapped read-only when mmap is true, so
+    processes loading the same file share its array pages."""
+    manifest = read_manifest(path)
+    if mmap and manifest is not None and manifest.get('memory_mappable'):
+        return joblib.load(path, mmap_mode='r')
+    return joblib.load(path)
@@ -1,13 +1,157 @@
-from modules.model_training import load_model
+from collections import OrderedDict
+from modules.model_training import load_model, load_coefficients, load_manifest, get_model_path
+from modules.instrumentation import timed, span
 from modules.utils import get_logger
+from config import MODEL_CACHE_MAX_BYTES
+import numpy as np
 import pandas as pd
+import os
+import threading
+import time
 
 logger = get_logger(__name__)
 
+class ModelCache:
+    """LRU cache of loaded models bounded by their size on disk.
+
+    Entries are keyed by filename and remember the file's mtime and size, so a
+    model file that is rewritten is reloaded on the next access.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # filename -> (mtime_ns, size, model)
+        self._compiled = {}  # filename -> (mtime_ns, size, LinearCoefficients or None)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.warmup = {'state': 'pending', 'loaded': [], 'failed': [], 'seconds': None}
+
+    def get(self, filename):
+        stat = os.stat(get_model_path(filename))
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                self._entries.move_to_end(filename)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._pop(filename)
+                self.invalidations += 1
+                logger.info(f"Model {filename} changed on disk, reloading")
+            self.misses += 1
+        # load outside the lock so other models stay servable meanwhile
+        model = load_model(filename)
+        with self._lock:
+            self._put(filename, stat, model)
+        return model
+
+    def get_compiled(self, filename):
+        """Raw-input linear kernel exported with the model (see model_artifacts.fold_preprocessing), or None
+        when the model has none; the answer is cached until the model file changes."""
+        stat = os.stat(get_model_path(filename))
+        entry = self._compiled.get(filename)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            return entry[2]
+        compiled = None
+        manifest = load_manifest(filename)
+        if manifest is not None and manifest.get('coefficients_input') == 'raw':
+            compiled = load_coefficients(filename)
+        # the kernels are a few arrays, so they are kept outside the size-bounded LRU
+        self._compiled[filename] = (stat.st_mtime_ns, stat.st_size, compiled)
+        return compiled
+
+    def has_compiled(self, filename):
+        """Whether get_compiled(filename) would answer from memory, without reading any file."""
+        entry = self._compiled.get(filename)
+        if entry is None:
+            return False
+        stat = os.stat(get_model_path(filename))
+        return entry[:2] == (stat.st_mtime_ns, stat.st_size)
+
+    def _pop(self, filename):
+        _, size, _ = self._entries.pop(filename)
+        self._bytes -= size
+
+    def _put(self, filename, stat, model):
+        if filename in self._entries:
+            self._pop(filename)
+        if stat.st_size > self.max_bytes:
+            logger.warning(f"Model {filename} ({stat.st_size} bytes) exceeds the cache size, not caching it")
+            return
+        self._entries[filename] = (stat.st_mtime_ns, stat.st_size, model)
+        self._bytes += stat.st_size
+        while self._bytes > self.max_bytes:
+            evicted, _ = next(iter(self._entries.items()))
+            self._pop(evicted)
+            self.evictions += 1
+            logger.info(f"Evicted model {evicted} from cache")
+
+    def invalidate(self, filename=None):
+        with self._lock:
+            if filename is None:
+                self._entries.clear()
+                self._compiled.clear()
+                self._bytes = 0
+            else:
+                self._compiled.pop(filename, None)
+                if filename in self._entries:
+                    self._pop(filename)
+
+    def warm_up(self, filenames):
+        """Load filenames into the cache; progress is kept in self.warmup for readiness checks."""
+        start = time.perf_counter()
+        self.warmup = {'state': 'running', 'loaded': [], 'failed': [], 'seconds': None}
+        for filename in filenames:
+            try:
+                self.get(filename)
+                self.warmup['loaded'].append(filename)
+                logger.info(f"Warmed up model {filename}")
+            except Exception as e:
+                self.warmup['failed'].append(filename)
+                logger.error(f"Could not warm up model {filename}: {e}")
+        self.warmup.update(state='done', seconds=time.perf_counter() - start)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+model_cache = ModelCache(MODEL_CACHE_MAX_BYTES)
+
+@timed('predict', rows=len)
 def predict(model_filename, data):
-    model = load_model(model_filename)
+    model = model_cache.get(model_filename)
     if isinstance(data, dict):
         data = pd.DataFrame([data])
+    # JSON nulls arrive as None, which the fitted imputers only recognise as NaN
+    obj_cols = data.select_dtypes(include=['object']).columns
+    if len(obj_cols) > 0:
+        data[obj_cols] = data[obj_cols].fillna(np.nan)
     predictions = model.predict(data)
     logger.info(f"Predictions made: {len(predictions)}")
-    return predictions.tolist()
\ No newline at end of file
+    return predictions.tolist()
+
+def predict_compiled(model_filename, data):
+    """Predictions from the model's raw-input linear kernel, or None when it has none.
+
+    data is a list of row dicts or a DataFrame. Rows go straight into a float matrix and one
+    matmul, without building a DataFrame or running the sklearn pipeline; this is what keeps
+    single-row latency of linear models well under a millisecond.
+    """
+    compiled = model_cache.get_compiled(model_filename)
+    if compiled is None:
+        return None
+    with span('predict.compiled', rows=len(data)):
+        X = compiled.frame_to_array(data) if isinstance(data, pd.DataFrame) else compiled.records_to_array(data)
+        return compiled.predict(X).tolist()
@@ -1,13 +1,19 @@
 import pandas as pd
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.linear_model import LogisticRegression, LinearRegression
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.svm import SVC, SVR
-from sklearn.metrics import accuracy_score, r2_score, mean_squared_error
+import numpy as np
+from modules.instrumentation import record_stage, span
 from modules.utils import get_logger
+from modules.result_cache import make_key
+from modules.estimator_registry import registered_estimators
 import joblib
-from config import MODEL_PATH
+from config import MODEL_PATH, TRAINING_N_JOBS, TRAINING_MEMORY_BUDGET, MODEL_COMPRESSION, MODEL_MMAP
+from modules.model_artifacts import parse_compression, write_artifact, read_artifact, read_manifest, LinearCoefficients
 import os
+import shutil
+import tempfile
+import time
+
+# scikit-learn is imported inside the functions that fit or score models, so that importing this module
+# (e.g. for save_model/load_model in the API) does not load it
 
 logger = get_logger(__name__)
 
@@ -18,21 +24,12 @@ def detect_problem_type(y):
         return 'classification'
 
 def get_models(problem_type):
-    if problem_type == 'classification':
-        models = {
-            'LogisticRegression': (LogisticRegression(), {'C': [0.1, 1, 10]}),
-            'RandomForest': (RandomForestClassifier(), {'n_estimators': [10, 50, 100]}),
-            'SVM': (SVC(), {'C': [0.1, 1, 10], 'kernel': ['linear', 'rbf']})
-        }
-    else:
-        models = {
-            'LinearRegression': (LinearRegression(), {}),
-            'RandomForest': (RandomForestRegressor(), {'n_estimators': [10, 50, 100]}),
-            'SVM': (SVR(), {'C': [0.1, 1, 10], 'kernel': ['linear', 'rbf']})
-        }
-    return models
+    """{name: (unfitted estimator, parameter grid)} for every registered batch family of the problem type."""
+    problem_type = 'classification' if problem_type == 'classification' else 'regression'
+    return {spec.name: (spec.make(), spec.grid) for spec in registered_estimators(problem_type)}
 
 def evaluate_model(model, X_test, y_test, problem_type):
+    from sklearn.metrics import accuracy_score, r2_score, mean_squared_error
     y_pred = model.predict(X_test)
     if problem_type == 'classification':
         acc = accuracy_score(y_test, y_pred)
@@ -42,46 +39,416 @@ def evaluate_model(model, X_test, y_test, problem_type):
         mse = mean_squared_error(y_test, y_pred)
         return {'r2': r2, 'mse': mse}
 
-def train_and_select_best(X, y, test_size=0.2):
+CV_FOLDS = 3
+HALVING_FACTOR = 3  # successive halving keeps 1/factor of the candidates and grows the sample by factor per round
+HALVING_MIN_ROWS = 60
+SEARCH_MODES = ('grid', 'halving')
+
+def _fit_and_score(estimator, params, X, y, train_idx, test_idx, scoring):
+    """Fit one candidate on one CV fold; runs inside a worker process."""
+    from sklearn.base import clone
+    from sklearn.metrics import get_scorer
+    start = time.perf_counter()
+    try:
+        model = clone(estimator).set_params(**params)
+        model.fit(X[train_idx], y[train_idx])
+        score = get_scorer(scoring)(model, X[test_idx], y[test_idx])
+    except Exception:
+        # e.g. a small subsample fold missing a class; the candidate simply scores nothing
+        score = float('nan')
+    return score, time.perf_counter() - start
+
+def _refit(estimator, params, X, y):
+    from sklearn.base import clone
+    start = time.perf_counter()
+    model = clone(estimator).set_params(**params)
+    model.fit(X, y)
+    return model, time.perf_counter() - start
+
+def _share_array(values, temp_dir):
+    """Dump to disk and reopen read-only memory-mapped, so worker processes share the pages instead of
+    receiving a pickled copy per task."""
+    path = os.path.join(temp_dir, 'X_train.joblib')
+    joblib.dump(values, path)
+    return joblib.load(path, mmap_mode='r')
+
+def _cv_key(data_key, rows, estimator, params, scoring):
+    return make_key('cv', data_key, joblib.hash(rows), CV_FOLDS, scoring, type(estimator).__name__,
+                    estimator.get_params(), params)
+
+def _evaluate(parallel, candidates, X, y, rows, scoring, problem_type, cache=None, data_key=None):
+    """Cross-validate candidates on the given rows; every (candidate, fold) pair is one pool task.
+
+    Yields (position, cv_score, fit_time) as soon as all folds of a candidate are done. With a cache,
+    candidates already scored on the same data and rows are yielded first without being refitted.
+    """
+    keys = [None] * len(candidates)
+    pending = list(range(len(candidates)))
+    if cache is not None:
+        pending = []
+        for position, (_, estimator, params) in enumerate(candidates):
+            keys[position] = _cv_key(data_key, rows, estimator, params, scoring)
+            hit = cache.get(keys[position])
+            if hit is None:
+                pending.append(position)
+            else:
+                yield position, hit['cv_score'], 0.0
+    if not pending:
+        return
+    from sklearn.model_selection import check_cv
+    y_rows = y[rows]
+    cv = check_cv(CV_FOLDS, y_rows, classifier=problem_type == 'classification')
+    folds = [(rows[train], rows[test]) for train, test in cv.split(np.zeros((len(rows), 1)), y_rows)]
+    results = parallel(
+        joblib.delayed(_fit_and_score)(candidates[position][1], candidates[position][2], X, y, train_idx,
+                                       test_idx, scoring)
+        for position in pending
+        for train_idx, test_idx in folds
+    )
+    fold_results = []
+    for result in results:
+        fold_results.append(result)
+        if len(fold_results) % len(folds) == 0:
+            current = fold_results[-len(folds):]
+            fold_scores = np.array([score for score, _ in current], dtype=float)
+            cv_score = float(np.nanmean(fold_scores)) if not np.isnan(fold_scores).all() else None
+            fit_time = float(sum(t for _, t in current))
+            position = pending[len(fold_results) // len(folds) - 1]
+            if cache is not None:
+                cache.put(keys[position], {'cv_score': cv_score, 'fit_time': fit_time})
+            yield position, cv_score, fit_time
+
+def _halving_rounds(n_candidates, factor=HALVING_FACTOR):
+    return int(np.floor(np.log(n_candidates) / np.log(factor))) + 1
+
+def _planned_evaluations(n_candidates, search, factor=HALVING_FACTOR):
+    if search != 'halving':
+        return n_candidates
+    sizes = [n_candidates]
+    for _ in range(_halving_rounds(n_candidates, factor) - 1):
+        sizes.append(int(np.ceil(sizes[-1] / factor)))
+    return sum(sizes)
+
+def _out_of_time(deadline, estimate=0.0):
+    return deadline is not None and time.perf_counter() + estimate >= deadline
+
+def _grid_search(parallel, candidates, X, y, scoring, problem_type, deadline, records, record, cache=None,
+                 data_key=None, estimates=None):
+    """Exhaustive search. Without a budget all candidates run as one batch; with a budget each model family
+    is a batch, cheapest estimate first, and families that no longer fit in the remaining time are skipped."""
+    start = time.perf_counter()
+    rows = np.arange(len(y))
+    estimates = estimates or {}
+    if deadline is None:
+        batches = [list(range(len(candidates)))]
+    else:
+        families = {}
+        for i, (name, _, _) in enumerate(candidates):
+            families.setdefault(name, []).append(i)
+        batches = sorted(families.values(), key=lambda batch: estimates.get(candidates[batch[0]][0], 0.0))
+    for n, batch in enumerate(batches):
+        estimate = estimates.get(candidates[batch[0]][0], 0.0)
+        if n > 0 and _out_of_time(deadline, estimate):
+            reason = ('time budget exhausted' if _out_of_time(deadline)
+                      else f'estimated {estimate:.1f}s exceeds the remaining time budget')
+            for i in batch:
+                records[i].update(status='skipped', reason=reason)
+            continue
+        for position, cv_score, fit_time in _evaluate(parallel, [candidates[i] for i in batch], X, y, rows,
+                                                      scoring, problem_type, cache, data_key):
+            record(batch[position], cv_score, fit_time, len(rows))
+    rounds = [{'n_resources': len(rows), 'n_candidates': sum(r['status'] == 'evaluated' for r in records),
+               'time': time.perf_counter() - start}]
+    return [i for i, r in enumerate(records) if r['status'] == 'evaluated'], rounds
+
+def _halving_search(parallel, candidates, X, y, scoring, problem_type, deadline, records, record, cache=None,
+                    data_key=None, factor=HALVING_FACTOR):
+    """Successive halving: score every candidate on a small subsample, keep the best 1/factor and grow the
+    subsample by factor each round until the last round uses every training row."""
+    n_samples = len(y)
+    n_rounds = _halving_rounds(len(candidates), factor)
+    min_resources = min(n_samples, max(n_samples // factor ** (n_rounds - 1), HALVING_MIN_ROWS))
+    order = np.random.default_rng(42).permutation(n_samples)
+    alive = list(range(len(candidates)))
+    rounds = []
+    for r in range(n_rounds):
+        n_resources = n_samples if r == n_rounds - 1 else min(n_samples, min_resources * factor ** r)
+        if rounds:
+            # assume cost grows linearly with rows x candidates from the previous round
+            last = rounds[-1]
+            estimate = last['time'] * (n_resources * len(alive)) / (last['n_resources'] * last['n_candidates'])
+            if _out_of_time(deadline, estimate):
+                for i in alive:
+                    records[i].update(status='skipped', reason=f'time budget exhausted before {n_resources}-row round')
+                logger.info(f"Halving stopped before round {r}: estimated {estimate:.1f}s exceeds the time budget")
+                break
+        start = time.perf_counter()
+        rows = np.sort(order[:n_resources])
+        for position, cv_score, fit_time in _evaluate(parallel, [candidates[i] for i in alive], X, y, rows,
+                                                      scoring, problem_type, cache, data_key):
+            record(alive[position], cv_score, fit_time, n_resources)
+        rounds.append({'n_resources': int(n_resources), 'n_candidates': len(alive), 'time': time.perf_counter() - start})
+        if r < n_rounds - 1:
+            ranked = sorted(alive, key=lambda i: -float('inf') if records[i]['cv_score'] is None else records[i]['cv_score'],
+                            reverse=True)
+            alive = ranked[:int(np.ceil(len(alive) / factor))]
+            for i in ranked[len(alive):]:
+                records[i]['status'] = 'eliminated'
+    # candidates scored in the latest round are the finalists, whether or not the budget stopped the search
+    latest = rounds[-1]['n_resources']
+    return [i for i in alive if records[i]['n_resources'] == latest], rounds
+
+def _nbytes(X):
+    import scipy.sparse as sp
+    if sp.issparse(X):
+        return int(X.data.nbytes + X.indices.nbytes + X.indptr.nbytes)
+    if isinstance(X, pd.DataFrame):
+        return int(X.memory_usage(index=False, deep=True).sum())
+    return int(np.asarray(X).nbytes)
+
+def _search_rows(X, n_rows, memory_budget, seed=42):
+    """Row positions for the model search: None for all of them, or a random sample sized to memory_budget."""
+    nbytes = _nbytes(X)
+    if not memory_budget or nbytes <= memory_budget:
+        return None
+    size = max(int(n_rows * memory_budget / nbytes), min(n_rows, HALVING_MIN_ROWS))
+    return np.sort(np.random.default_rng(seed).choice(n_rows, size, replace=False))
+
+def _plan_families(specs, n_rows, train_rows, n_features, sparse, search, time_budget, n_jobs, fit_history=None):
+    """Registered families to search, each with its estimated search time, and {name: reason} for the others.
+
+    Estimates are for cross-validating on n_rows search rows. A family is left out when it cannot
+    take the data (sparse input, more than its row limit in the train_rows the refit uses) or when
+    its estimated search time alone exceeds time_budget; when the budget rules out every family
+    the cheapest one is kept, so a model is still returned.
+    """
+    from sklearn.model_selection import ParameterGrid
+    fit_rows = n_rows * (CV_FOLDS - 1) // CV_FOLDS
+    planned, excluded = [], {}
+    for spec in specs:
+        reason = spec.unsupported_reason(train_rows, sparse)
+        if reason is not None:
+            excluded[spec.name] = reason
+            continue
+        # halving fits every candidate on small subsamples and few on all rows: about one full-size candidate
+        fits = CV_FOLDS * (len(ParameterGrid(spec.grid)) if search == 'grid' else 1)
+        cost = fit_history.cost(spec) if fit_history is not None else None
+        seconds = spec.estimate(fit_rows, n_features, cost) * fits / min(joblib.effective_n_jobs(n_jobs), fits)
+        planned.append((spec, seconds))
+    if time_budget and planned:
+        within = ([item for item in planned if item[1] <= time_budget]
+                  or [min(planned, key=lambda item: item[1])])
+        kept = {spec.name for spec, _ in within}
+        for spec, seconds in planned:
+            if spec.name not in kept:
+                excluded[spec.name] = f'estimated {seconds:.1f}s exceeds the time budget'
+        planned = within
+    return planned, excluded
+
+def train_and_select_best(X, y, test_size=0.2, n_jobs=None, search='grid', time_budget=None, progress_callback=None,
+                          memory_budget=None, cache=None, feature_selection=None, fit_history=None):
+    """Search the registered model families and return the best fitted model with its metrics.
+
+    search is 'grid' (exhaustive) or 'halving' (successive halving on growing subsamples).
+    time_budget is a wall-clock limit in seconds; work that would not fit in it is skipped
+    and listed in the returned candidates instead of delaying the result. Families whose
+    estimated search time (from the registry's cost model) exceeds it are not started, and
+    families that cannot take the data (e.g. a kernel SVM on too many rows) are always skipped.
+    memory_budget (bytes, default TRAINING_MEMORY_BUDGET, 0 for none) caps the training split the
+    search works on; a larger split is downsampled for the search and only the refit uses all of it.
+    cache (a ResultCache) reuses cross-validation scores of candidates already evaluated on the same
+    search data, e.g. when an identical job is resubmitted.
+    feature_selection (FeatureSelector options) fits a FeatureSelector on the training split and runs
+    the search on the columns it keeps; the returned model is then a Pipeline of the selector and
+    the estimator, so it still predicts from every preprocessed column.
+    fit_history (a FitHistory) calibrates the cost estimates with earlier fit times and records this
+    search's fit times.
+    progress_callback(completed, total, candidate) is called after each candidate evaluation;
+    an exception raised from it aborts the search.
+    """
+    if search not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{search}', expected one of {SEARCH_MODES}")
+    import scipy.sparse as sp
+    from sklearn.model_selection import train_test_split, ParameterGrid
+    from sklearn.pipeline import Pipeline
+    from modules.feature_selection import FeatureSelector
+    start = time.perf_counter()
+    deadline = start + time_budget if time_budget else None
     problem_type = detect_problem_type(y)
     logger.info(f"Detected problem type: {problem_type}")
+    n_jobs = n_jobs if n_jobs is not None else TRAINING_N_JOBS
+    scoring = 'accuracy' if problem_type == 'classification' else 'r2'
+    if isinstance(X, pd.DataFrame) and len(X.columns) and all(isinstance(d, pd.SparseDtype) for d in X.dtypes):
+        # sparse one-hot output is never densified; families that need dense input are skipped
+        X = X.sparse.to_coo().tocsr()
     
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    selector = None
+    if feature_selection is not None:
+        # fitted on the training split only, so the test score is not biased by the selection
+        with span('train.select_features', rows=len(y_train)) as timing:
+            selector = FeatureSelector(**feature_selection).fit(X_train, y_train)
+            X_train, X_test = selector.transform(X_train), selector.transform(X_test)
+    memory_budget = TRAINING_MEMORY_BUDGET if memory_budget is None else memory_budget
+    sample = _search_rows(X_train, len(y_train), memory_budget)
+    if sample is None:
+        X_search, y_values = X_train, np.asarray(y_train)
+    else:
+        logger.info(f"Training split of {_nbytes(X_train)} bytes exceeds the memory budget of {memory_budget}, "
+                    f"searching on {len(sample)} of {len(y_train)} rows")
+        X_search = X_train.iloc[sample] if isinstance(X_train, pd.DataFrame) else X_train[sample]
+        y_values = np.asarray(y_train)[sample]
+    
+    n_features = X_search.shape[1]
+    families, excluded = _plan_families(registered_estimators(problem_type), len(y_values), len(y_train), n_features,
+                                        sp.issparse(X_search), search, time_budget, n_jobs, fit_history)
+    if not families:
+        raise ValueError(f"No model family can be trained on this data: {excluded}")
+    for name, reason in excluded.items():
+        logger.info(f"Skipping {name}: {reason}")
+    estimates = {spec.name: seconds for spec, seconds in families}
+    candidates = [(spec.name, spec.make(), params) for spec, _ in families for params in ParameterGrid(spec.grid)]
+    records = [{'model_name': name, 'params': params, 'cv_score': None, 'fit_time': 0.0, 'status': 'pending'}
+               for name, _, params in candidates]
+    total = _planned_evaluations(len(candidates), search)
+    completed = 0
+    
+    data_key = joblib.hash((X_search, y_values)) if cache is not None else None
+    cache_hits = cache.hits if cache is not None else 0
+    observed = []  # (family, rows, features, seconds) per fit, for the fit history
+    
+    def record(index, cv_score, fit_time, n_resources):
+        nonlocal completed
+        records[index].update(cv_score=cv_score, status='evaluated', n_resources=n_resources)
+        records[index]['fit_time'] += fit_time
+        if fit_time > 0:
+            # summed over the CV folds fitted in the pool workers; cached scores cost nothing
+            record_stage('train.candidate', fit_time, rows=n_resources)
+            observed.append((candidates[index][0], n_resources * (CV_FOLDS - 1) // CV_FOLDS, n_features,
+                             fit_time / CV_FOLDS))
+        completed += 1
+        if progress_callback is not None:
+            progress_callback(completed, total, records[index])
+    
+    temp_dir = tempfile.mkdtemp(prefix='auto_ml_train_')
+    try:
+        X_shared = _share_array(X_search if sp.issparse(X_search) else np.asarray(X_search), temp_dir)
+        with joblib.Parallel(n_jobs=n_jobs, backend='loky', return_as='generator') as parallel:
+            if search == 'halving':
+                finalists, rounds = _halving_search(parallel, candidates, X_shared, y_values, scoring, problem_type,
+                                                    deadline, records, record, cache, data_key)
+            else:
+                finalists, rounds = _grid_search(parallel, candidates, X_shared, y_values, scoring, problem_type,
+                                                 deadline, records, record, cache, data_key, estimates)
+            search_time = time.perf_counter() - start
+            record_stage('train.search', search_time, rows=len(y_values))
+            
+            best_per_family = {}
+            for i in finalists:
+                name, cv_score = candidates[i][0], records[i]['cv_score']
+                if cv_score is not None and (name not in best_per_family or cv_score > records[best_per_family[name]]['cv_score']):
+                    best_per_family[name] = i
+            if not best_per_family:
+                raise ValueError("No model candidate could be fitted on this data")
+            to_refit = sorted(best_per_family.values(), key=lambda i: records[i]['cv_score'], reverse=True)
+            if _out_of_time(deadline):
+                # out of time: only the best cross-validated family is refit
+                for i in to_refit[1:]:
+                    records[i].update(status='skipped', reason='time budget exhausted before refit')
+                to_refit = to_refit[:1]
+            
+            # refit each family's best parameters on the full training split
+            refits = list(parallel(
+                joblib.delayed(_refit)(candidates[i][1], candidates[i][2], X_train, y_train)
+                for i in to_refit
+            ))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
     
-    models = get_models(problem_type)
     best_model = None
     best_score = -float('inf')
     best_metrics = {}
-    
-    for name, (model, params) in models.items():
-        if params:
-            grid = GridSearchCV(model, params, cv=3, scoring='accuracy' if problem_type == 'classification' else 'r2')
-            grid.fit(X_train, y_train)
-            model = grid.best_estimator_
-        else:
-            model.fit(X_train, y_train)
-        
-        metrics = evaluate_model(model, X_test, y_test, problem_type)
-        score = metrics['accuracy'] if problem_type == 'classification' else metrics['r2']
-        
+    for i, (model, refit_time) in zip(to_refit, refits):
+        name, params = candidates[i][0], candidates[i][2]
+        record_stage('train.refit', refit_time, rows=len(y_train))
+        observed.append((name, len(y_train), n_features, refit_time))
+        with span('train.evaluate', rows=len(y_test)):
+            metrics = evaluate_model(model, X_test, y_test, problem_type)
+        score = metrics[scoring]
+        logger.info(f"{name}: params={params}, cv {scoring}={records[i]['cv_score']:.4f}, "
+                    f"test {scoring}={score:.4f}, refit {refit_time:.2f}s")
         if score > best_score:
             best_score = score
             best_model = model
             best_metrics = metrics
             best_metrics['model_name'] = name
+            best_metrics['params'] = params
     
-    logger.info(f"Best model: {best_metrics['model_name']}, score: {best_score}")
+    if fit_history is not None:
+        fit_history.record(problem_type, observed)
+    # families left out before the search are listed like candidates skipped during it
+    for spec in registered_estimators(problem_type):
+        if spec.name in excluded:
+            records.extend({'model_name': spec.name, 'params': params, 'cv_score': None, 'fit_time': 0.0,
+                            'status': 'skipped', 'reason': excluded[spec.name]} for params in ParameterGrid(spec.grid))
+    
+    if selector is not None:
+        best_model = Pipeline([('selector', selector), ('model', best_model)])
+        best_metrics['feature_selection'] = {**selector.summary(), 'fit_time': timing.seconds}
+    best_metrics['search'] = search
+    best_metrics['search_time'] = search_time
+    best_metrics['training_time'] = time.perf_counter() - start
+    best_metrics['rounds'] = rounds
+    best_metrics['search_rows'] = len(y_values)
+    best_metrics['train_rows'] = len(y_train)
+    best_metrics['candidates'] = records
+    best_metrics['estimated_search_times'] = estimates
+    best_metrics['cv_cache_hits'] = cache.hits - cache_hits if cache is not None else 0
+    best_metrics['skipped'] = sum(r['status'] == 'skipped' for r in records)
+    logger.info(f"Best model: {best_metrics['model_name']}, score: {best_score}, {search} search over "
+                f"{len(records)} candidates in {best_metrics['training_time']:.2f}s (n_jobs={n_jobs}, "
+                f"{best_metrics['skipped']} skipped)")
     return best_model, best_metrics
 
-def save_model(model, filename):
+def attach_preprocessor(preprocessor, model):
+    """Bundle a fitted preprocessor and a fitted estimator (or selector + estimator Pipeline) so the saved
+    artifact predicts on raw rows."""
+    from sklearn.pipeline import Pipeline
+    steps = model.steps if isinstance(model, Pipeline) else [('model', model)]
+    return Pipeline([('preprocessor', preprocessor), *steps])
+
+def get_model_path(filename):
+    if not filename or os.path.basename(filename) != filename:
+        raise ValueError(f"Invalid model filename: {filename!r}")
+    return os.path.join(MODEL_PATH, filename)
+
+def save_model(model, filename, compression=None, metrics=None):
+    """Save model with its manifest (model type, feature schema, preprocessing, metrics) next to it.
+
+    compression is 'none' or 'method[:level]' (default MODEL_COMPRESSION); linear models also get
+    their coefficients exported to a .coef.npz file.
+    """
+    compress = parse_compression(MODEL_COMPRESSION if compression is None else compression)
     os.makedirs(MODEL_PATH, exist_ok=True)
-    path = os.path.join(MODEL_PATH, filename)
-    joblib.dump(model, path)
+    path = get_model_path(filename)
+    write_artifact(model, path, compress=compress, metrics=metrics)
     logger.info(f"Model saved to {path}")
     return path
 
-def load_model(filename):
-    path = os.path.join(MODEL_PATH, filename)
-    model = joblib.load(path)
+def load_model(filename, mmap=None):
+    """Load a saved model; uncompressed artifacts are memory-mapped when mmap (default MODEL_MMAP) is true."""
+    path = get_model_path(filename)
+    model = read_artifact(path, mmap=MODEL_MMAP if mmap is None else mmap)
     logger.info(f"Model loaded from {path}")
-    return model
\ No newline at end of file
+    return model
+
+def load_manifest(filename):
+    """Manifest of a saved model, or None for models saved without one."""
+    return read_manifest(get_model_path(filename))
+
+def load_coefficients(filename):
+    """LinearCoefficients exported with a linear model, or None when the model has none."""
+    manifest = load_manifest(filename)
+    if not manifest or not manifest.get('coefficients_file'):
+        return None
+    return LinearCoefficients.load(get_model_path(manifest['coefficients_file']))
\ No newline at end of file
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import threading
+import joblib
+from config import RESULT_CACHE_PATH, RESULT_CACHE_MAX_BYTES
+from modules.utils import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_SUFFIX = ".joblib"
+
+def make_key(namespace, *parts):
+    """Cache key from a namespace and JSON-serialisable parts (dataset content hashes, options)."""
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=repr).encode()).hexdigest()[:32]
+    return f"{namespace}-{digest}"
+
+class ResultCache:
+    """Disk-backed cache of computed results (fitted transformers, CV scores) keyed by content hash.
+
+    Entries are joblib files; arrays inside them are memory-mapped on load. The directory is
+    bounded by max_bytes with least recently used eviction (access time kept in the file mtime),
+    so it can be shared by the API process and the training workers.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key + CACHE_SUFFIX)
+
+    def get(self, key, default=None):
+        path = self._entry_path(key)
+        try:
+            value = joblib.load(path, mmap_mode='r')
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return default
+        except Exception as e:
+            # a truncated or incompatible entry is just recomputed
+            logger.warning(f"Discarding unreadable cache entry {key}: {e}")
+            with self._lock:
+                self.misses += 1
+            return default
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        os.makedirs(self.path, exist_ok=True)
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.path):
+            return entries
+        for name in os.listdir(self.path):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict(self, keep=None):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        entries = self._entries()
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes,
+            }
+
+result_cache = ResultCache(RESULT_CACHE_PATH, RESULT_CACHE_MAX_BYTES)
@@ -0,0 +1,444 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import wait
+from config import (JOB_DB_PATH, MAX_CONCURRENT_TRAININGS, JOB_POLL_SECONDS, JOB_HEARTBEAT_TIMEOUT,
+                    INGESTION_CHUNK_SIZE)
+from modules.data_ingestion import iter_mongo_chunks, iter_postgres_chunks
+from modules.dataset_store import load_dataset, iter_dataset_chunks
+from modules.estimator_registry import fit_history
+from modules.model_training import train_and_select_best, save_model, load_model, attach_preprocessor, get_model_path
+from modules.result_cache import result_cache
+from modules.utils import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+TRAINING_MODES = ('batch', 'incremental')  # incremental streams the data through partial_fit estimators
+
+_runner = None  # JobRunner running in a thread of this process, if any
+
+class JobCancelled(Exception):
+    pass
+
+def _connect():
+    os.makedirs(os.path.dirname(JOB_DB_PATH) or '.', exist_ok=True)
+    conn = sqlite3.connect(JOB_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def init_job_db():
+    with _connect() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS training_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                last_candidate TEXT,
+                model_filename TEXT,
+                metrics TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT,
+                heartbeat_at REAL
+            )
+        """)
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(training_jobs)")}
+        for column, kind in (('owner', 'TEXT'), ('heartbeat_at', 'REAL')):
+            if column not in columns:
+                # job databases created before jobs recorded the runner running them
+                conn.execute(f"ALTER TABLE training_jobs ADD COLUMN {column} {kind}")
+        # lease of the one runner allowed to run jobs (see JobRunner)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_runner (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                owner TEXT NOT NULL,
+                heartbeat_at REAL NOT NULL
+            )
+        """)
+
+def _json_default(value):
+    # numpy scalars in metrics
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _update_job(job_id, **fields):
+    fields['updated_at'] = time.time()
+    for key in ('metrics', 'last_candidate'):
+        if key in fields and fields[key] is not None:
+            fields[key] = json.dumps(fields[key], default=_json_default)
+    assignments = ', '.join(f"{key} = ?" for key in fields)
+    with _connect() as conn:
+        conn.execute(f"UPDATE training_jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+def _set_status(job_id, status, expected):
+    """Compare-and-set the status; returns False when the job is no longer in an expected state."""
+    placeholders = ', '.join('?' for _ in expected)
+    with _connect() as conn:
+        cursor = conn.execute(
+            f"UPDATE training_jobs SET status = ?, updated_at = ? WHERE job_id = ? AND status IN ({placeholders})",
+            (status, time.time(), job_id, *expected))
+        return cursor.rowcount == 1
+
+def get_job(job_id):
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM training_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if row is None:
+        raise KeyError(f"Training job '{job_id}' not found")
+    job = dict(row)
+    for key in ('params', 'metrics', 'last_candidate'):
+        if job[key] is not None:
+            job[key] = json.loads(job[key])
+    return job
+
+def _worker_n_jobs(max_workers=MAX_CONCURRENT_TRAININGS):
+    # split the cores between concurrent trainings so they don't oversubscribe the machine
+    return max(1, (os.cpu_count() or 1) // max_workers)
+
+def create_training_job(params):
+    job_id = str(uuid.uuid4())
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO training_jobs (job_id, status, params, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, json.dumps(params), now, now))
+    return job_id
+
+def find_matching_job(params):
+    """Most recent job with identical params that is queued, running, or completed with its model still
+    on disk; None when there is none. Jobs streaming from a database source never match, since the
+    query result can change between submissions."""
+    if params.get('source') is not None:
+        return None
+    stale = time.time() - JOB_HEARTBEAT_TIMEOUT
+    with _connect() as conn:
+        rows = conn.execute("SELECT job_id, status, params, model_filename, heartbeat_at FROM training_jobs "
+                            "WHERE status IN ('queued', 'running', 'completed') ORDER BY created_at DESC").fetchall()
+    for row in rows:
+        if json.loads(row['params']) != params:
+            continue
+        if row['status'] == 'running' and (row['heartbeat_at'] or 0) < stale:
+            # its runner is gone: the job will be requeued, not finished
+            continue
+        if row['status'] != 'completed' or os.path.exists(get_model_path(row['model_filename'])):
+            return row['job_id']
+    return None
+
+def submit_training_job(params):
+    """Record a training job as queued for the job runner; returns the job id immediately.
+
+    Datasets are content addressed, so a resubmission of identical params returns the id of the
+    matching job instead of training the same model again.
+    """
+    requeue_stale_jobs()
+    job_id = find_matching_job(params)
+    if job_id is not None:
+        logger.info(f"Training job {job_id} already covers these parameters")
+        return job_id
+    job_id = create_training_job(params)
+    if _runner is not None:
+        _runner.wake()
+    logger.info(f"Queued training job {job_id}")
+    return job_id
+
+def cancel_training_job(job_id):
+    job = get_job(job_id)
+    if job['status'] in FINISHED_STATUSES:
+        return job
+    if not _set_status(job_id, 'cancelled', ('queued',)):
+        # claimed by the runner: the training process checks for this between candidates and stops
+        _set_status(job_id, 'cancelling', ('running',))
+    logger.info(f"Cancellation requested for training job {job_id}")
+    return get_job(job_id)
+
+def _iter_chunks(params):
+    """Chunks of a job's training data: its stored dataset, or the database query it streams from."""
+    source = params.get('source')
+    if source is None:
+        return iter_dataset_chunks(params['dataset_id'], INGESTION_CHUNK_SIZE)
+    if source['source'] == 'mongo':
+        return iter_mongo_chunks(source['collection_or_query'], projection=source.get('projection'),
+                                 db_name=source.get('db_name') or 'auto_ml_db', limit=source.get('limit'))
+    return iter_postgres_chunks(source['collection_or_query'], limit=source.get('limit'))
+
+def run_training_job(job_id, n_jobs=None):
+    """Run one training job to completion; executed in a process of the job runner's pool, which has
+    already claimed the job (status 'running')."""
+    if not _set_status(job_id, 'running', ('queued', 'running')):
+        _set_status(job_id, 'cancelled', ('cancelling',))
+        return
+    params = get_job(job_id)['params']
+    logger.info(f"Training job {job_id} started")
+
+    def progress(completed, total, candidate):
+        _update_job(job_id, completed=completed, total=total, last_candidate=candidate)
+        if get_job(job_id)['status'] == 'cancelling':
+            raise JobCancelled(job_id)
+
+    try:
+        if params.get('mode') == 'incremental':
+            from modules.incremental_training import train_incremental
+            model, metrics = train_incremental(lambda: _iter_chunks(params), params['target'],
+                                               progress_callback=progress)
+        else:
+            X = load_dataset(params['dataset_id'])
+            y = X.pop(params['target'])
+            model, metrics = train_and_select_best(X, y, n_jobs=n_jobs, search=params.get('search', 'grid'),
+                                                   time_budget=params.get('time_budget'), progress_callback=progress,
+                                                   cache=result_cache, feature_selection=params.get('feature_selection'),
+                                                   fit_history=fit_history)
+        if params.get('preprocessor_filename'):
+            model = attach_preprocessor(load_model(params['preprocessor_filename']), model)
+        model_filename = f"{job_id}.pkl"
+        save_model(model, model_filename, metrics=metrics)
+        _update_job(job_id, status='completed', model_filename=model_filename, metrics=metrics)
+        logger.info(f"Training job {job_id} completed: {metrics['model_name']}")
+    except JobCancelled:
+        _update_job(job_id, status='cancelled')
+        logger.info(f"Training job {job_id} cancelled")
+    except Exception as e:
+        _update_job(job_id, status='failed', error=f"{type(e).__name__}: {e}")
+        logger.error(f"Training job {job_id} failed: {e}")
+
+def requeue_stale_jobs(timeout=None):
+    """Requeue the running jobs of runners that stopped heartbeating for timeout seconds (default
+    JOB_HEARTBEAT_TIMEOUT), e.g. killed; jobs they were cancelling are cancelled. Returns the number
+    of requeued jobs."""
+    stale = time.time() - (JOB_HEARTBEAT_TIMEOUT if timeout is None else timeout)
+    with _connect() as conn:
+        conn.execute("UPDATE training_jobs SET status = 'cancelled', owner = NULL "
+                     "WHERE status = 'cancelling' AND COALESCE(heartbeat_at, 0) <= ?", (stale,))
+        requeued = conn.execute("UPDATE training_jobs SET status = 'queued', completed = 0, owner = NULL "
+                                "WHERE status = 'running' AND COALESCE(heartbeat_at, 0) <= ?", (stale,)).rowcount
+    if requeued:
+        logger.warning(f"Requeued {requeued} training jobs whose runner stopped")
+    return requeued
+
+def requeue_interrupted_jobs():
+    """Mark jobs left running or cancelling by a stopped server as queued or cancelled again; only
+    safe before any job runner has started."""
+    init_job_db()
+    requeue_stale_jobs(timeout=0)
+
+def _init_training_process(runner_pid):
+    setup_logging()
+
+    def exit_with_runner():
+        while os.getppid() == runner_pid:
+            time.sleep(1)
+        # the runner was killed: its jobs are requeued by the next one, so this training is moot
+        os._exit(1)
+
+    threading.Thread(target=exit_with_runner, name='runner-watch', daemon=True).start()
+
+class JobRunner:
+    """The one place training jobs run: claims queued jobs oldest first and runs up to max_workers
+    of them in a pool of spawned processes, each with its share of the cores.
+
+    Server workers only insert queued rows. A lease row in the job database lets a single runner
+    run jobs at a time, so starting one per process (uvicorn --workers) is safe: the others poll
+    until the holder's heartbeat is JOB_HEARTBEAT_TIMEOUT old, then take over. The holder
+    heartbeats the jobs it runs on every poll and requeues those of runners that died.
+    """
+
+    def __init__(self, max_workers=MAX_CONCURRENT_TRAININGS, poll_seconds=JOB_POLL_SECONDS):
+        self.max_workers = max_workers
+        self.poll_seconds = poll_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.holds_lease = False
+        self._executor = None
+        self._futures = {}  # job_id -> Future of the jobs this runner runs
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Run in a daemon thread of this process."""
+        self._thread = threading.Thread(target=self.run, name='job-runner', daemon=True)
+        self._thread.start()
+        return self
+
+    def wake(self):
+        """Poll now rather than after poll_seconds, e.g. because a job was queued."""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def run(self):
+        """Poll until stop(), then stop the running trainings and requeue them."""
+        init_job_db()
+        logger.info(f"Job runner {self.owner} started")
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.poll()
+                except sqlite3.Error as e:
+                    logger.error(f"Job runner poll failed: {e}")
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+        finally:
+            self._shutdown()
+
+    def poll(self):
+        """Reap finished jobs, heartbeat the running ones and, while holding the lease, requeue stale
+        jobs and start queued ones up to max_workers."""
+        for job_id, future in list(self._futures.items()):
+            if future.done():
+                del self._futures[job_id]
+                self._finished(job_id, future)
+        if self._futures:
+            placeholders = ', '.join('?' for _ in self._futures)
+            with _connect() as conn:
+                conn.execute(f"UPDATE training_jobs SET heartbeat_at = ? WHERE job_id IN ({placeholders})",
+                             (time.time(), *self._futures))
+        if not self._hold_lease():
+            return
+        requeue_stale_jobs()
+        while len(self._futures) < self.max_workers:
+            job_id = self._claim()
+            if job_id is None:
+                break
+            if self._executor is None:
+                # spawn: forking a process that runs the event loop and thread pools is unsafe
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_init_training_process, initargs=(os.getpid(),))
+            future = self._executor.submit(run_training_job, job_id, _worker_n_jobs(self.max_workers))
+            future.add_done_callback(lambda _: self._wake.set())
+            self._futures[job_id] = future
+            logger.info(f"Training job {job_id} started by runner {self.owner}")
+
+    def _hold_lease(self):
+        now = time.time()
+        with _connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO job_runner (id, owner, heartbeat_at) VALUES (1, ?, 0)", (self.owner,))
+            held = conn.execute("UPDATE job_runner SET owner = ?, heartbeat_at = ? "
+                                "WHERE id = 1 AND (owner = ? OR heartbeat_at <= ?)",
+                                (self.owner, now, self.owner, now - JOB_HEARTBEAT_TIMEOUT)).rowcount == 1
+        if held != self.holds_lease:
+            logger.info(f"Job runner {self.owner} {'now runs' if held else 'no longer runs'} training jobs")
+        self.holds_lease = held
+        return held
+
+    def _claim(self):
+        """Oldest queued job, marked running by this runner; None when nothing is queued."""
+        while True:
+            with _connect() as conn:
+                row = conn.execute("SELECT job_id FROM training_jobs WHERE status = 'queued' "
+                                   "ORDER BY created_at LIMIT 1").fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                claimed = conn.execute("UPDATE training_jobs SET status = 'running', owner = ?, heartbeat_at = ?, "
+                                       "updated_at = ? WHERE job_id = ? AND status = 'queued'",
+                                       (self.owner, now, now, row['job_id'])).rowcount == 1
+            if claimed:
+                return row['job_id']
+
+    def _finished(self, job_id, future):
+        # run_training_job records its own outcome; an exception here means its process died
+        error = None if future.cancelled() else future.exception()
+        if error is None:
+            return
+        logger.error(f"Training job {job_id} lost its process: {error!r}")
+        with _connect() as conn:
+            conn.execute("UPDATE training_jobs SET status = 'failed', error = ?, updated_at = ? "
+                         "WHERE job_id = ? AND status IN ('running', 'cancelling')",
+                         (f"{type(error).__name__}: {error}", time.time(), job_id))
+        if isinstance(error, BrokenProcessPool) and self._executor is not None:
+            # e.g. killed for memory: the next job gets a fresh pool
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _shutdown(self):
+        if self._executor is not None:
+            # a stopping runner does not wait for its trainings: they restart from the queue
+            for process in list(self._executor._processes.values()):
+                process.terminate()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        try:
+            with _connect() as conn:
+                if self._futures:
+                    placeholders = ', '.join('?' for _ in self._futures)
+                    conn.execute(f"UPDATE training_jobs SET status = 'cancelled', owner = NULL "
+                                 f"WHERE status = 'cancelling' AND job_id IN ({placeholders})", tuple(self._futures))
+                    conn.execute(f"UPDATE training_jobs SET status = 'queued', completed = 0, owner = NULL "
+                                 f"WHERE status = 'running' AND job_id IN ({placeholders})", tuple(self._futures))
+                # hand the lease over without waiting for it to expire
+                conn.execute("UPDATE job_runner SET heartbeat_at = 0 WHERE id = 1 AND owner = ?", (self.owner,))
+        except sqlite3.Error as e:
+            logger.error(f"Job runner {self.owner} could not requeue its jobs: {e}")
+        self._futures = {}
+        self.holds_lease = False
+        logger.info(f"Job runner {self.owner} stopped")
+
+def start_job_runner():
+    """Run training jobs in a JobRunner thread of this process; for servers without a dedicated
+    runner process (uvicorn, tests)."""
+    global _runner
+    if _runner is None:
+        _runner = JobRunner().start()
+    return _runner
+
+def stop_job_runner():
+    global _runner
+    if _runner is not None:
+        _runner.stop()
+        _runner = None
+
+def _run_runner_process():
+    setup_logging()
+    runner = JobRunner()
+    signal.signal(signal.SIGTERM, lambda signum, frame: runner.stop())
+    runner.run()
+
+def start_runner_process():
+    """Run training jobs in a dedicated JobRunner process, restarted if it dies; for a pre-fork
+    server master (backend/gunicorn_conf.py), whose workers then only queue jobs. Returns a
+    function that stops it."""
+    context = multiprocessing.get_context('spawn')
+    stopping = threading.Event()
+    lock = threading.Lock()
+    current = []
+
+    def supervise():
+        while True:
+            with lock:
+                if stopping.is_set():
+                    return
+                process = context.Process(target=_run_runner_process, name='job-runner')
+                process.start()
+                current[:] = [process]
+            # the sentinel rather than join(): the gunicorn master reaps all its children itself
+            wait([process.sentinel])
+            if not stopping.is_set():
+                logger.error(f"Job runner process {process.pid} exited, restarting it")
+                stopping.wait(JOB_POLL_SECONDS)
+
+    def stop(timeout=None):
+        with lock:
+            stopping.set()
+        for process in current:
+            process.terminate()  # SIGTERM: the runner requeues its jobs and exits
+            wait([process.sentinel], timeout)
+
+    threading.Thread(target=supervise, name='job-runner-supervisor', daemon=True).start()
+    return stop
@@ -0,0 +1,83 @@
+"""Parsing of uploaded files in a bounded pool of worker processes, off the API's event loop.
+
+The API streams an upload to a file under UPLOAD_TMP_PATH and hands the path to one of
+UPLOAD_WORKERS processes, which parses, optimizes, stores and profiles the dataset and sends back
+only the small response fields, never the frame. Parsing holds the GIL for most of its time, so in
+a thread it would still stall /predict; the workers also run at a lower CPU priority, so request
+handling wins when they compete for cores.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import UPLOAD_WORKERS, UPLOAD_WORKER_NICE
+from modules.data_ingestion import read_file, optimize_dtypes
+from modules.data_profiling import dataset_profile
+from modules.dataset_store import save_dataset
+from modules.instrumentation import registry
+from modules.utils import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+class UploadError(ValueError):
+    """An uploaded file that parsed but holds no usable data; the message is meant for the client."""
+
+def ingest_upload(path, filename):
+    """Parse an uploaded file, store it and profile it; returns the /upload response fields and, under
+    'metrics', a snapshot of the stage metrics recorded while doing so."""
+    # one task at a time per worker process: the registry holds this upload's stages only
+    registry.reset()
+    df = read_file(path, filename)
+    if df is None or df.empty or len(df.columns) == 0:
+        raise UploadError("The uploaded file contains no data rows or columns.")
+    logger.info(f"Parsed {filename} into {len(df.columns)} columns and {len(df)} rows")
+    df, memory_report = optimize_dtypes(df)
+    dataset_id = save_dataset(df)
+    return {
+        'dataset_id': dataset_id,
+        'columns': [str(c) for c in df.columns],
+        'shape': df.shape,
+        'preview': df.head(5).to_dict('records'),
+        'memory_report': memory_report,
+        'profile': dataset_profile(dataset_id, df),
+        'metrics': registry.snapshot(),
+    }
+
+def _init_worker(nice):
+    setup_logging()
+    if nice and hasattr(os, 'nice'):
+        os.nice(nice)
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn, as for training jobs: the parent runs an event loop and thread pools
+            _executor = ProcessPoolExecutor(max_workers=max(1, UPLOAD_WORKERS),
+                                            mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_worker, initargs=(UPLOAD_WORKER_NICE,))
+        return _executor
+
+async def process_upload(path, filename):
+    """ingest_upload in the worker pool; uploads beyond UPLOAD_WORKERS wait for a free worker, on disk."""
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(_get_executor(), ingest_upload, path, filename)
+    except BrokenProcessPool:
+        # a worker died, e.g. killed for memory: the next upload gets a fresh pool
+        logger.error(f"Upload worker died while parsing {filename}")
+        shutdown_executor()
+        raise
+    registry.merge(result.pop('metrics'))
+    return result
+
+def shutdown_executor(wait=False):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+            _executor = None
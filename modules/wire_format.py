@@ -0,0 +1,88 @@
+import io
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+JSON = "application/json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+NPY = "application/x-npy"
+BINARY_FORMATS = (ARROW_STREAM, NPY)
+
+def media_type(content_type):
+    """The bare media type of a Content-Type header, without parameters."""
+    return (content_type or JSON).split(';')[0].strip().lower()
+
+def negotiate(accept, default=JSON):
+    """Pick the response format from an Accept header; the first supported entry wins, JSON otherwise."""
+    for entry in (accept or '').split(','):
+        entry = media_type(entry)
+        if entry in BINARY_FORMATS or entry == JSON:
+            return entry
+    return default
+
+def _read_npy(body):
+    """Decode a .npy buffer without copying numeric data."""
+    stream = io.BytesIO(body)
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    if dtype.hasobject:
+        raise ValueError("Object arrays are not accepted in .npy payloads")
+    array = np.frombuffer(body, dtype=dtype, count=int(np.prod(shape)), offset=stream.tell())
+    return array.reshape(shape, order='F' if fortran_order else 'C')
+
+def decode_frame(body, content_type, columns=None):
+    """Build a DataFrame from an Arrow IPC stream or a .npy buffer.
+
+    Arrow columns without nulls are wrapped without copying. A 2-D .npy array takes its column
+    names from `columns` (positional names otherwise); a structured array uses its field names.
+    """
+    content_type = media_type(content_type)
+    if content_type == ARROW_STREAM:
+        try:
+            table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+        except pa.ArrowInvalid as e:
+            raise ValueError(f"Invalid Arrow IPC stream: {e}")
+        return table.to_pandas(split_blocks=True)
+    if content_type == NPY:
+        try:
+            array = _read_npy(body)
+        except (ValueError, EOFError) as e:
+            raise ValueError(f"Invalid .npy payload: {e}")
+        if array.dtype.names:
+            return pd.DataFrame(array)
+        if array.ndim == 1:
+            array = array.reshape(-1, 1)
+        if array.ndim != 2:
+            raise ValueError(f".npy payload must be a 1-D or 2-D array, got {array.ndim} dimensions")
+        if columns is None:
+            columns = [str(i) for i in range(array.shape[1])]
+        if len(columns) != array.shape[1]:
+            raise ValueError(f"{len(columns)} column names given for an array with {array.shape[1]} columns")
+        return pd.DataFrame(array, columns=columns, copy=False)
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+def encode_frame(df, content_type):
+    """Serialize a DataFrame as an Arrow IPC stream or, for numeric frames, a 2-D .npy array."""
+    content_type = media_type(content_type)
+    sparse = {col: dtype.subtype for col, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)}
+    if sparse:
+        df = df.astype(sparse)
+    if content_type == ARROW_STREAM:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    if content_type == NPY:
+        return encode_array(df.to_numpy())
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+def encode_array(array):
+    if np.asarray(array).dtype.hasobject:
+        raise ValueError("Non-numeric data cannot be returned as .npy, request Arrow or JSON instead")
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(array), allow_pickle=False)
+    return buffer.getvalue()
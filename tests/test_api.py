@@ -0,0 +1,354 @@
+import gc
+import io
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+from fastapi.testclient import TestClient
+from backend import uploads
+from backend.main import app
+from modules import dataset_store, model_training, training_jobs
+from modules.result_cache import result_cache
+from modules.estimator_registry import fit_history
+from modules.instrumentation import registry
+from modules.model_training import save_model
+from modules.model_deployment import model_cache
+
+CSV = b"a,b,c\n1,x,2\n2,y,3\n3,,4\n4,x,5\n5,y,6\n6,x,7\n7,y,8\n8,x,9\n9,y,10\n10,x,11\n"
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, 'DATASET_PATH', str(tmp_path / 'datasets'))
+    monkeypatch.setattr(model_training, 'MODEL_PATH', str(tmp_path / 'models'))
+    monkeypatch.setattr(training_jobs, 'JOB_DB_PATH', str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(result_cache, 'path', str(tmp_path / 'cache'))
+    monkeypatch.setattr(result_cache, 'hits', 0)
+    monkeypatch.setattr(result_cache, 'misses', 0)
+    monkeypatch.setattr(fit_history, 'path', str(tmp_path / 'fit_history.db'))
+    monkeypatch.setattr(uploads, 'UPLOAD_TMP_PATH', str(tmp_path / 'uploads'))
+    # training runs in spawned worker processes, which read their paths from the environment
+    monkeypatch.setenv('DATASET_PATH', str(tmp_path / 'datasets'))
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path / 'models'))
+    monkeypatch.setenv('JOB_DB_PATH', str(tmp_path / 'jobs.db'))
+    monkeypatch.setenv('RESULT_CACHE_PATH', str(tmp_path / 'cache'))
+    monkeypatch.setenv('FIT_HISTORY_PATH', str(tmp_path / 'fit_history.db'))
+    with TestClient(app) as client:
+        yield client
+
+def upload(client, contents=CSV, name='data.csv'):
+    response = client.post('/api/data/upload', files={'file': (name, contents, 'text/csv')})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def wait_for_job(client, job_id, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f'/api/model/jobs/{job_id}').json()
+        if job['status'] in ('completed', 'failed', 'cancelled'):
+            return job
+        time.sleep(0.2)
+    raise TimeoutError(job_id)
+
+def test_upload_returns_dataset_id_without_rows(client):
+    body = upload(client)
+    assert 'data' not in body
+    assert body['columns'] == ['a', 'b', 'c']
+    info = client.get(f"/api/data/datasets/{body['dataset_id']}").json()
+    assert info['shape'] == [10, 3]
+    assert len(info['preview']) == 5
+
+def test_upload_returns_cached_profile(client):
+    body = upload(client)
+    columns = {column['name']: column for column in body['profile']['columns']}
+    assert body['profile']['rows'] == 10
+    assert columns['b']['null_count'] == 1
+    assert columns['a']['flags'] == []
+    response = client.get(f"/api/data/datasets/{body['dataset_id']}/profile")
+    assert response.status_code == 200
+    assert response.json() == body['profile']
+    assert result_cache.hits == 1
+    assert client.get(f"/api/data/datasets/{'0' * 32}/profile").status_code == 404
+
+def test_upload_rejects_oversized_and_unsupported_files_early(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, 'MAX_FILE_SIZE', 1000)
+    big = b"a,b\n" + b"1,2\n" * 1000
+    response = client.post('/api/data/upload', files={'file': ('big.csv', big, 'text/csv')})
+    assert response.status_code == 413
+    # without a Content-Length the limit is enforced while the body streams in
+    head = b'--xyz\r\nContent-Disposition: form-data; name="file"; filename="big.csv"\r\n\r\n'
+    body = iter([head] + [b"1,2\n" * 100] * 50 + [b'\r\n--xyz--\r\n'])
+    response = client.post('/api/data/upload', content=body,
+                           headers={'content-type': 'multipart/form-data; boundary=xyz'})
+    assert response.status_code == 413
+    response = client.post('/api/data/upload', files={'file': ('data.json', b'{}', 'application/json')})
+    assert response.status_code == 400
+    assert client.post('/api/data/upload', files={'file': ('empty.csv', b'', 'text/csv')}).status_code == 400
+    # nothing is left behind in the upload directory
+    assert not os.listdir(tmp_path / 'uploads')
+
+def test_upload_preprocess_train_round_trip(client):
+    dataset_id = upload(client)['dataset_id']
+    response = client.post('/api/data/preprocess', json={'dataset_id': dataset_id, 'features': ['a', 'b'], 'target': 'c'})
+    assert response.status_code == 200, response.text
+    processed = response.json()
+    assert processed['X'] is None
+    assert processed['shape'][0] == 10
+
+    response = client.post('/api/model/train', json={'dataset_id': processed['dataset_id'], 'target': 'c',
+                                                     'preprocessor_filename': processed['preprocessor_filename']})
+    assert response.status_code == 202, response.text
+    job = wait_for_job(client, response.json()['job_id'])
+    assert job['status'] == 'completed', job
+    assert job['completed'] == job['total'] > 0
+    model_filename = job['model_filename']
+    manifest = client.get(f'/api/model/models/{model_filename}/manifest').json()
+    assert [f['name'] for f in manifest['features']] == ['a', 'b']
+    assert manifest['metrics']['model_name'] == job['metrics']['model_name']
+    assert client.get('/api/model/models/missing.pkl/manifest').status_code == 404
+
+    # the saved model carries the fitted preprocessing, so raw rows can be scored directly
+    response = client.post('/api/model/predict', json={'model_filename': model_filename,
+                                                       'data': [{'a': 4, 'b': 'x'}, {'a': None, 'b': None}]})
+    assert response.status_code == 200, response.text
+    assert len(response.json()['predictions']) == 2
+
+def test_repeated_preprocess_and_train_reuse_results(client):
+    dataset_id = upload(client)['dataset_id']
+    payload = {'dataset_id': dataset_id, 'features': ['a', 'b'], 'target': 'c'}
+    first = client.post('/api/data/preprocess', json=payload).json()
+    second = client.post('/api/data/preprocess', json=payload).json()
+    assert (second['dataset_id'], second['preprocessor_filename']) == (first['dataset_id'], first['preprocessor_filename'])
+    assert client.get('/api/model/result_cache/stats').json()['hits'] == 1
+    other = client.post('/api/data/preprocess', json={**payload, 'scaling': 'minmax'}).json()
+    assert other['preprocessor_filename'] != first['preprocessor_filename']
+
+    train = {'dataset_id': first['dataset_id'], 'target': 'c', 'preprocessor_filename': first['preprocessor_filename']}
+    job_id = client.post('/api/model/train', json=train).json()['job_id']
+    wait_for_job(client, job_id)
+    response = client.post('/api/model/train', json=train)
+    assert response.status_code == 202
+    assert response.json() == {'job_id': job_id, 'status': 'completed'}
+
+def test_bad_dataset_requests_are_client_errors(client):
+    dataset_id = upload(client)['dataset_id']
+    assert client.get('/api/data/datasets/not-an-id').status_code == 400
+    assert client.get(f"/api/data/datasets/{'0' * 32}").status_code == 404
+    response = client.post('/api/data/preprocess', json={'dataset_id': dataset_id, 'features': ['zz'], 'target': 'c'})
+    assert response.status_code == 400
+    assert 'zz' in response.json()['detail']
+    response = client.post('/api/data/preprocess', json={'dataset_id': 'bad', 'features': ['a'], 'target': 'c'})
+    assert response.status_code == 400
+    assert client.post('/api/model/train', json={'dataset_id': 'bad', 'target': 'c'}).status_code == 400
+
+def test_dataset_json_download_pages_rows_and_returns_nulls(client):
+    dataset_id = upload(client, b"a,b,c\n1,x,2.5\n2,,\n3,y,1.0\n")['dataset_id']
+    assert client.get(f"/api/data/datasets/{dataset_id}").status_code == 200
+    response = client.get(f"/api/data/datasets/{dataset_id}/data")
+    assert response.status_code == 200, response.text
+    assert response.json()[1] == {'a': 2, 'b': None, 'c': None}
+    assert response.headers['X-Total-Rows'] == '3'
+    response = client.get(f"/api/data/datasets/{dataset_id}/data", params={'offset': 1, 'limit': 1})
+    assert [row['a'] for row in response.json()] == [2]
+    assert client.get(f"/api/data/datasets/{dataset_id}/data", params={'limit': 10 ** 9}).status_code == 422
+
+def test_load_db_rejects_bad_limit_and_sample(client):
+    payload = {'source': 'postgres', 'collection_or_query': 'SELECT 1'}
+    assert client.post('/api/data/load_db', json={**payload, 'limit': 0}).status_code == 400
+    assert client.post('/api/data/load_db', json={**payload, 'sample': 1.5}).status_code == 400
+
+def test_metrics_endpoint_reports_stages_and_routes(client):
+    registry.reset()
+    upload(client)
+    client.get(f"/api/data/datasets/{'0' * 32}")
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    text = response.text
+    assert 'automl_stage_rows_total{stage="ingest.csv"} 10.0' in text
+    assert 'automl_http_request_seconds_count{method="POST",route="/api/data/upload",status="200"}' in text
+    assert 'route="/api/data/datasets/{dataset_id}",status="404"' in text
+
+def test_ready_after_background_warm_up(client):
+    deadline = time.time() + 10
+    response = client.get('/ready')
+    while response.status_code == 503 and time.time() < deadline:
+        time.sleep(0.05)
+        response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.json()['state'] == 'done'
+
+def test_preload_warms_models_before_fork(client, monkeypatch):
+    from backend import main
+    save_model(LinearRegression().fit([[0.0], [1.0]], [0.0, 1.0]), 'warm.pkl')
+    monkeypatch.setattr(main, 'MODEL_CACHE_WARMUP', ['warm.pkl', 'missing.pkl'])
+    monkeypatch.setattr(main, 'preloaded', False)
+    model_cache.invalidate()
+    try:
+        main.preload()
+    finally:
+        gc.unfreeze()
+    assert main.preloaded
+    assert model_cache.warmup['loaded'] == ['warm.pkl'] and model_cache.warmup['failed'] == ['missing.pkl']
+    # workers forked after preload skip their own warm-up and requeue
+    with TestClient(main.app) as worker:
+        assert worker.get('/ready').json()['preloaded'] is True
+        assert model_cache.stats()['entries'] == 1
+
+def test_cache_stats_endpoint(client):
+    stats = client.get('/api/model/cache/stats').json()
+    assert {'hits', 'misses', 'evictions', 'entries', 'bytes'} <= set(stats)
+    assert client.post('/api/model/predict', json={'model_filename': 'missing.pkl', 'data': [{}]}).status_code == 404
+    batcher_stats = client.get('/api/model/batcher/stats').json()
+    assert {'queue_depth', 'batch_size_histogram', 'latency_ms'} <= set(batcher_stats)
+
+def test_train_rejects_unknown_search_mode(client):
+    payload = {'X': [{'a': 1}, {'a': 2}], 'y': [1, 2], 'search': 'random'}
+    assert client.post('/api/model/train', json=payload).status_code == 400
+    assert client.post('/api/model/train', json={**payload, 'search': 'grid', 'time_budget': -1}).status_code == 400
+    selection = {'method': 'mutual_info'}  # mutual information needs k
+    assert client.post('/api/model/train', json={**payload, 'feature_selection': selection}).status_code == 400
+    response = client.post('/api/model/train', json={**payload, 'mode': 'incremental',
+                                                     'feature_selection': {'variance_threshold': 0.01}})
+    assert response.status_code == 400
+
+def test_train_validates_incremental_mode(client):
+    payload = {'X': [{'a': 1}, {'a': 2}], 'y': [1, 2]}
+    assert client.post('/api/model/train', json={**payload, 'mode': 'online'}).status_code == 400
+    response = client.post('/api/model/train', json={**payload, 'mode': 'incremental',
+                                                     'preprocessor_filename': 'preprocessor.pkl'})
+    assert response.status_code == 400
+    source = {'source': 'postgres', 'collection_or_query': 'SELECT * FROM t ORDER BY id'}
+    assert client.post('/api/model/train', json={'source': source, 'target': 'y'}).status_code == 400
+    response = client.post('/api/model/train', json={'source': source, 'mode': 'incremental'})
+    assert response.status_code == 400
+
+def test_unknown_training_job(client):
+    assert client.get('/api/model/jobs/missing').status_code == 404
+    assert client.delete('/api/model/jobs/missing').status_code == 404
+
+def test_binary_request_and_response_formats(client):
+    from modules.wire_format import ARROW_STREAM, NPY, encode_frame, decode_frame
+    raw = pd.DataFrame({'a': np.arange(30, dtype=float), 'b': ['x', 'y', 'z'] * 10, 'c': np.arange(30) * 2.0})
+    response = client.post('/api/data/preprocess', params={'features': ['a', 'b'], 'target': 'c'},
+                           content=encode_frame(raw, ARROW_STREAM),
+                           headers={'Content-Type': ARROW_STREAM, 'Accept': ARROW_STREAM})
+    assert response.status_code == 200, response.text
+    assert response.headers['content-type'] == ARROW_STREAM
+    processed = decode_frame(response.content, ARROW_STREAM)
+    assert list(processed.columns) == ['a', 'b_y', 'b_z', 'c']
+    assert response.headers['X-Target'] == 'c'
+    response = client.get(f"/api/data/datasets/{response.headers['X-Dataset-Id']}/data", headers={'Accept': NPY})
+    assert np.load(io.BytesIO(response.content)).shape == (30, 4)
+
+    save_model(LinearRegression().fit(raw[['a']], raw['c']), 'linear.pkl')
+    X = np.arange(5, dtype=float).reshape(-1, 1)
+    buffer = io.BytesIO()
+    np.save(buffer, X)
+    response = client.post('/api/model/predict', params={'model_filename': 'linear.pkl', 'columns': 'a'},
+                           content=buffer.getvalue(), headers={'Content-Type': NPY, 'Accept': NPY})
+    assert response.status_code == 200, response.text
+    np.testing.assert_allclose(np.load(io.BytesIO(response.content)), X[:, 0] * 2, atol=1e-9)
+    response = client.post('/api/model/predict', params={'model_filename': 'linear.pkl'},
+                           content=b'not arrow', headers={'Content-Type': ARROW_STREAM})
+    assert response.status_code == 400
+
+@pytest.mark.filterwarnings("ignore:Found unknown categories")
+def test_sparse_preprocess_train_predict(client):
+    rng = np.random.default_rng(0)
+    ids = rng.integers(0, 80, 300)
+    csv = pd.DataFrame({'user': [f"u{i}" for i in ids], 'x': rng.normal(size=300),
+                        'label': np.where(ids % 2 == 0, 'even', 'odd')}).to_csv(index=False).encode()
+    dataset_id = upload(client, csv)['dataset_id']
+    response = client.post('/api/data/preprocess', json={'dataset_id': dataset_id, 'features': ['user', 'x'],
+                                                         'target': 'label', 'sparse': True, 'min_frequency': 2})
+    assert response.status_code == 200, response.text
+    processed = response.json()
+    assert processed['shape'][1] > 50
+    assert processed['dataset_id'] != dataset_id
+
+    response = client.post('/api/model/train', json={'dataset_id': processed['dataset_id'], 'target': 'label',
+                                                     'preprocessor_filename': processed['preprocessor_filename']})
+    job = wait_for_job(client, response.json()['job_id'])
+    assert job['status'] == 'completed', job
+    response = client.post('/api/model/predict', json={'model_filename': job['model_filename'],
+                                                       'data': [{'user': 'u2', 'x': 0.0}, {'user': 'new', 'x': 1.0}]})
+    assert response.status_code == 200, response.text
+    assert len(response.json()['predictions']) == 2
+
+def test_linear_model_predicts_through_compiled_kernel(client):
+    from modules.data_preprocessing import fit_preprocessor
+    X = pd.DataFrame({'a': [1.0, 2.0, np.nan, 4.0, 5.0, 6.0], 'b': [0.5, 0.1, 0.3, 0.9, 0.7, 0.2]})
+    y = [3.0, 5.0, 6.0, 9.0, 11.0, 13.0]
+    preprocessor, X_out = fit_preprocessor(X)
+    pipeline = model_training.attach_preprocessor(preprocessor, LinearRegression().fit(X_out, y))
+    save_model(pipeline, 'folded.pkl')
+    rows = [{'a': 3.0, 'b': 0.4}, {'a': None, 'b': 0.8}]
+    response = client.post('/api/model/predict', json={'model_filename': 'folded.pkl', 'data': rows})
+    assert response.status_code == 200, response.text
+    np.testing.assert_allclose(response.json()['predictions'], pipeline.predict(pd.DataFrame(rows)), atol=1e-9)
+    assert registry.get('automl_stage_rows_total', stage='predict.compiled') >= 2
+    # loaded off the event loop by the first request, answered from memory afterwards
+    assert model_cache.has_compiled('folded.pkl')
+    # a row lacking a column fails as it does in the pipeline, instead of having it imputed
+    response = client.post('/api/model/predict', json={'model_filename': 'folded.pkl', 'data': [{'a': 3.0}]})
+    assert response.status_code == 500
+    # a string the kernel cannot convert goes through the full pipeline, which reports the error
+    response = client.post('/api/model/predict', json={'model_filename': 'folded.pkl', 'data': [{'a': 'x', 'b': 1}]})
+    assert response.status_code == 500
+
+def test_batch_scoring_streams_or_writes_predictions(client, tmp_path, monkeypatch):
+    from modules import batch_scoring
+    monkeypatch.setattr(batch_scoring, 'BATCH_SCORING_PATH', str(tmp_path / 'scoring'))
+    (tmp_path / 'scoring').mkdir()
+    df = pd.DataFrame({'row': range(50), 'a': np.arange(50, dtype=float)})
+    df.to_csv(tmp_path / 'scoring' / 'in.csv', index=False)
+    save_model(LinearRegression().fit(df[['a']], df['a'] * 2), 'linear.pkl')
+    payload = {'model_filename': 'linear.pkl', 'input_path': 'in.csv', 'chunk_size': 20, 'id_columns': ['row']}
+    response = client.post('/api/model/score', json=payload)
+    assert response.status_code == 200, response.text
+    streamed = pd.read_csv(io.BytesIO(response.content))
+    assert streamed['row'].tolist() == list(range(50))
+    np.testing.assert_allclose(streamed['prediction'], df['a'] * 2, atol=1e-9)
+
+    response = client.post('/api/model/score', json={**payload, 'output_path': 'out.parquet'})
+    assert response.status_code == 200, response.text
+    assert (response.json()['rows'], response.json()['chunks'], response.json()['format']) == (50, 3, 'parquet')
+    assert len(pd.read_parquet(tmp_path / 'scoring' / 'out.parquet')) == 50
+
+    assert client.post('/api/model/score', json={**payload, 'input_path': '../jobs.db'}).status_code == 400
+    assert client.post('/api/model/score', json={**payload, 'input_path': 'missing.csv'}).status_code == 404
+    assert client.post('/api/model/score', json={**payload, 'model_filename': 'missing.pkl'}).status_code == 404
+    assert client.post('/api/model/score', json={**payload, 'id_columns': ['nope']}).status_code == 400
+
+def test_predict_latency_stays_flat_during_large_uploads(client):
+    from benchmarks.synthetic import DatasetSpec, make_csv_bytes
+    save_model(LinearRegression().fit(pd.DataFrame({'a': [1.0, 2.0, 3.0]}), [2.0, 4.0, 6.0]), 'linear.pkl')
+    payload = {'model_filename': 'linear.pkl', 'data': [{'a': 1.0}]}
+
+    def predict_latency():
+        start = time.perf_counter()
+        assert client.post('/api/model/predict', json=payload).status_code == 200
+        return time.perf_counter() - start
+
+    upload(client)  # starts the upload workers
+    baseline = [predict_latency() for _ in range(20)]
+    contents = make_csv_bytes(DatasetSpec(rows=100_000))  # about 20MB
+    uploads_done = []
+    threads = [threading.Thread(target=lambda i=i: uploads_done.append(upload(client, contents, f'large{i}.csv')))
+               for i in range(3)]
+    for thread in threads:
+        thread.start()
+    during = []
+    while any(thread.is_alive() for thread in threads):
+        during.append(predict_latency())
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    assert len(uploads_done) == 3
+    # parsing on the event loop held every request for about a second per upload
+    assert len(during) >= 10
+    assert np.median(during) < max(5 * np.median(baseline), 0.05)
+    assert np.percentile(during, 90) < 0.25
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from modules import model_training, model_deployment
+from modules.batch_scoring import (open_chunks, score_to_file, iter_scored_chunks, iter_csv_bytes,
+                                   resolve_scoring_path, main)
+from modules.data_preprocessing import fit_preprocessor
+from modules.model_training import attach_preprocessor, save_model
+from modules.model_deployment import ModelCache
+
+@pytest.fixture
+def scoring_setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_training, 'MODEL_PATH', str(tmp_path))
+    # parallel scoring runs in spawned processes, which read the model path from the environment
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path))
+    monkeypatch.setattr(model_deployment, 'model_cache', ModelCache(max_bytes=10 ** 9))
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'id': np.arange(1000), 'x': rng.normal(size=1000), 'color': rng.choice(['r', 'g', 'b'], 1000)})
+    df.loc[::9, 'x'] = np.nan
+    y = np.where(df['x'].fillna(0) > 0, 'up', 'down')
+    features = df[['x', 'color']]
+    preprocessor, X = fit_preprocessor(features)
+    pipeline = attach_preprocessor(preprocessor, RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y))
+    save_model(pipeline, 'forest.pkl')
+    df.to_csv(tmp_path / 'input.csv', index=False)
+    df.to_parquet(tmp_path / 'input.parquet')
+    return tmp_path, df, pipeline.predict(features)
+
+@pytest.mark.parametrize('input_name, output_name', [('input.csv', 'out.csv'), ('input.parquet', 'out.parquet')])
+def test_file_is_scored_chunk_by_chunk(scoring_setup, input_name, output_name):
+    tmp_path, df, expected = scoring_setup
+    chunks = open_chunks(str(tmp_path / input_name), chunk_size=300)
+    stats = score_to_file('forest.pkl', chunks, str(tmp_path / output_name), id_columns=['id'])
+    assert (stats['rows'], stats['chunks']) == (1000, 4)
+    assert stats['rows_per_second'] > 0
+    out = pd.read_parquet(tmp_path / output_name) if output_name.endswith('.parquet') else pd.read_csv(tmp_path / output_name)
+    assert out['id'].tolist() == df['id'].tolist()
+    assert out['prediction'].tolist() == expected.tolist()
+    assert not list(tmp_path.glob('*.tmp'))
+
+def test_parallel_scoring_keeps_input_order(scoring_setup):
+    tmp_path, df, expected = scoring_setup
+    scored = iter_scored_chunks('forest.pkl', open_chunks(str(tmp_path / 'input.csv'), chunk_size=100), ['id'], workers=2)
+    out = pd.concat(list(scored), ignore_index=True)
+    assert out['id'].tolist() == df['id'].tolist()
+    assert out['prediction'].tolist() == expected.tolist()
+
+def test_streamed_csv_has_one_header(scoring_setup):
+    tmp_path, _, expected = scoring_setup
+    pieces = list(iter_csv_bytes(iter_scored_chunks('forest.pkl', open_chunks(str(tmp_path / 'input.csv'),
+                                                                              chunk_size=400))))
+    lines = b''.join(pieces).decode().splitlines()
+    assert lines[0] == 'prediction' and len(lines) == 1001
+    assert lines[1:] == expected.tolist()
+
+def test_failed_scoring_leaves_no_output(scoring_setup):
+    tmp_path, df, _ = scoring_setup
+    df.drop(columns=['color']).to_csv(tmp_path / 'bad.csv', index=False)
+    with pytest.raises(KeyError):
+        score_to_file('forest.pkl', open_chunks(str(tmp_path / 'bad.csv')), str(tmp_path / 'out.csv'))
+    assert not list(tmp_path.glob('out.csv*'))
+
+def test_scoring_paths_stay_in_the_scoring_directory(tmp_path):
+    assert resolve_scoring_path('a/b.csv', str(tmp_path)) == str(tmp_path / 'a' / 'b.csv')
+    for path in ('../secret.csv', '/etc/passwd'):
+        with pytest.raises(ValueError):
+            resolve_scoring_path(path, str(tmp_path))
+
+def test_command_line(scoring_setup, capsys):
+    tmp_path, _, expected = scoring_setup
+    assert main(['forest.pkl', '--input', str(tmp_path / 'input.csv'), '--output', str(tmp_path / 'out.parquet'),
+                 '--chunk-size', '250']) == 0
+    assert pd.read_parquet(tmp_path / 'out.parquet')['prediction'].tolist() == expected.tolist()
+    assert 'Scored 1000 rows in 4 chunks' in capsys.readouterr().err
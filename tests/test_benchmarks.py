@@ -0,0 +1,27 @@
+from benchmarks.bench_import_time import FORBIDDEN_MODULES, import_profile
+from benchmarks.suite import compare
+from benchmarks.synthetic import DatasetSpec, make_dataset
+
+def test_synthetic_dataset_follows_its_spec():
+    spec = DatasetSpec(rows=500, numeric=4, categorical=2, cardinality=30, missing_rate=0.2)
+    df = make_dataset(spec)
+    assert df.shape == (500, 4 + 2 + 1)
+    assert df['c0'].nunique() <= 30
+    assert 0.15 < df.drop(columns=['target']).isna().mean().mean() < 0.25
+    assert df['target'].notna().all()
+    assert set(df['target']) == {'pos', 'neg'}
+    assert make_dataset(spec).equals(df)
+
+def test_compare_flags_only_slowdowns_beyond_tolerance_and_noise():
+    baseline = {'results': [{'name': 'a', 'seconds': 1.0}, {'name': 'b', 'seconds': 1.0},
+                            {'name': 'c', 'seconds': 0.001}, {'name': 'gone', 'seconds': 1.0}]}
+    results = {'results': [{'name': 'a', 'seconds': 1.5}, {'name': 'b', 'seconds': 1.1},
+                           {'name': 'c', 'seconds': 0.003}, {'name': 'added', 'seconds': 1.0}]}
+    status = {row[0]: row[-1] for row in compare(results, baseline, tolerance=0.25, min_delta=0.005)}
+    assert status == {'a': 'regression', 'b': 'ok', 'c': 'ok', 'added': 'new', 'gone': 'missing'}
+
+def test_api_import_loads_no_heavy_dependencies():
+    seconds, modules = import_profile('backend.main')
+    assert not [name for name in FORBIDDEN_MODULES if name in modules]
+    # generous, so a slow CI machine passes; about 0.9s here against 1.7s with eager imports
+    assert seconds < 5
@@ -1,6 +1,9 @@
 import pytest
 import pandas as pd
-from modules.data_ingestion import load_csv
+from modules import data_ingestion
+from modules.data_ingestion import (load_csv, read_csv_bytes, sniff_encoding, iter_mongo_chunks,
+                                    load_from_mongo, load_from_postgres)
+import codecs
 import tempfile
 import os
 
@@ -16,4 +19,165 @@ def test_load_csv():
         loaded_df = load_csv(temp_path)
         pd.testing.assert_frame_equal(df, loaded_df)
     finally:
-        os.unlink(temp_path)
\ No newline at end of file
+        os.unlink(temp_path)
+
+def test_read_csv_bytes_sniffs_delimiter_and_encoding():
+    contents = "name;city\nJosé;Málaga\nZoë;Köln\n".encode('latin-1')
+    df = read_csv_bytes(contents)
+    assert list(df.columns) == ['name', 'city']
+    assert df['city'].tolist() == ['Málaga', 'Köln']
+
+def test_read_csv_bytes_handles_bom_and_bad_lines():
+    contents = codecs.BOM_UTF8 + "a,b\n1, x\n2,y,extra\n3,z\n".encode('utf-8')
+    df = read_csv_bytes(contents)
+    assert list(df.columns) == ['a', 'b']
+    assert df['b'].tolist() == ['x', 'z']
+
+def test_read_csv_bytes_falls_back_when_prefix_is_utf8():
+    contents = ("a,b\n" + "1,x\n" * 50 + "2,ü\n").encode('latin-1')
+    df = read_csv_bytes(contents, sniff_bytes=32)
+    assert df['b'].iloc[-1] == 'ü'
+
+def test_sniff_encoding():
+    assert sniff_encoding("a,b\n1,é".encode('utf-8')) == 'utf-8'
+    assert sniff_encoding("a,b\n1,é\n".encode('latin-1')) == 'latin-1'
+    assert sniff_encoding("a,b\n".encode('utf-16')) == 'utf-16'
+    assert sniff_encoding("a,b\n".encode('utf-16-le')) == 'utf-16-le'
+
+
+class FakeMongoCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.closed = False
+
+    def batch_size(self, size):
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.docs:
+            raise StopIteration
+        return self.docs.pop(0)
+
+    def close(self):
+        self.closed = True
+
+class FakeMongoClient:
+    """Stand-in for MongoClient()[db][collection] that honours inclusion/exclusion projections."""
+    def __init__(self, docs):
+        self.docs = docs
+        self.cursor = None
+
+    def __getitem__(self, name):
+        return self
+
+    def find(self, query, projection):
+        included = [k for k, v in projection.items() if v]
+        excluded = [k for k, v in projection.items() if not v]
+        docs = []
+        for doc in self.docs:
+            if included:
+                doc = {k: doc[k] for k in included if k in doc}
+            docs.append({k: v for k, v in doc.items() if k not in excluded})
+        self.cursor = FakeMongoCursor(docs)
+        return self.cursor
+
+class FakePostgresCursor:
+    """In-process stand-in for a psycopg2 named (server-side) cursor."""
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.position = 0
+        self.description = None
+        self.fetch_sizes = []
+
+    def execute(self, query):
+        self.description = [(c,) for c in self.columns]
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        batch = self.rows[self.position:self.position + size]
+        self.position += len(batch)
+        return batch
+
+    def close(self):
+        pass
+
+class FakePostgresConnection:
+    def __init__(self, rows, columns):
+        self.cursor_obj = FakePostgresCursor(rows, columns)
+        self.cursor_name = None
+
+    def cursor(self, name=None):
+        self.cursor_name = name
+        return self.cursor_obj
+
+def test_load_from_mongo_in_chunks_with_projection():
+    docs = [{'_id': i, 'a': i, 'b': str(i), 'c': i * 2} for i in range(25)]
+    client = FakeMongoClient(docs)
+    chunks = list(iter_mongo_chunks('items', projection=['a', 'c'], chunk_size=10, client=client))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert list(chunks[0].columns) == ['a', 'c']
+    assert client.cursor.closed
+
+    df = load_from_mongo('items', limit=12, chunk_size=5, client=client)
+    assert df.shape == (12, 3)
+    assert '_id' not in df.columns
+
+def test_load_from_postgres_uses_server_side_cursor():
+    rows = [(i, f"name{i}", i * 0.5) for i in range(23)]
+    conn = FakePostgresConnection(rows, ['id', 'name', 'score'])
+    df = load_from_postgres("SELECT * FROM items", chunk_size=10, limit=15, conn=conn)
+    assert conn.cursor_name is not None
+    assert conn.cursor_obj.fetch_sizes == [10, 5]
+    assert df['id'].tolist() == list(range(15))
+    assert list(df.columns) == ['id', 'name', 'score']
+
+def test_load_from_postgres_sample():
+    rows = [(i,) for i in range(1000)]
+    df = load_from_postgres("SELECT id FROM items", sample=0.1, chunk_size=100,
+                            conn=FakePostgresConnection(rows, ['id']))
+    assert 50 < len(df) < 150
+    assert df['id'].is_monotonic_increasing
+
+def test_empty_postgres_result_keeps_columns():
+    df = load_from_postgres("SELECT * FROM items", conn=FakePostgresConnection([], ['id', 'name']))
+    assert list(df.columns) == ['id', 'name']
+    df = load_from_postgres("SELECT * FROM items", sample=1e-9,
+                            conn=FakePostgresConnection([(1, 'a'), (2, 'b')], ['id', 'name']))
+    assert df.shape == (0, 2)
+
+def test_postgres_chunks_keep_duplicate_column_names():
+    df = load_from_postgres("SELECT a.id, b.id FROM a JOIN b", conn=FakePostgresConnection([(1, 2), (3, 4)], ['id', 'id']))
+    assert list(df.columns) == ['id', 'id']
+    assert df.iloc[:, 1].tolist() == [2, 4]
+
+def test_pooled_connection_is_returned_when_cursor_fails(monkeypatch):
+    class BrokenConnection:
+        def cursor(self, name=None):
+            raise RuntimeError("cursor failed")
+
+        def rollback(self):
+            pass
+
+    class FakePool:
+        def __init__(self):
+            self.returned = []
+
+        def getconn(self):
+            return BrokenConnection()
+
+        def putconn(self, conn):
+            self.returned.append(conn)
+
+    pool = FakePool()
+    monkeypatch.setattr(data_ingestion, 'get_postgres_pool', lambda: pool)
+    with pytest.raises(RuntimeError):
+        load_from_postgres("SELECT 1")
+    assert len(pool.returned) == 1
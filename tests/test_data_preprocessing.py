@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import pandas as pd
+import scipy.sparse as sp
+from modules.data_preprocessing import fit_preprocessor, to_frame, optimize_dtypes, handle_missing, HASHING_N_FEATURES
+
+def make_frame():
+    return pd.DataFrame({
+        'num': [1.0, 2.0, np.nan, 4.0],
+        'cat': ['a', 'b', np.nan, 'b'],
+    })
+
+def test_fit_preprocessor_imputes_encodes_and_scales():
+    preprocessor, X = fit_preprocessor(make_frame())
+    assert list(X.columns) == ['num', 'cat_b']
+    assert not X.isna().any().any()
+    assert abs(X['num'].mean()) < 1e-12
+
+def test_fitted_preprocessor_reuses_training_statistics():
+    preprocessor, X = fit_preprocessor(make_frame())
+    new_rows = pd.DataFrame({'num': [np.nan, 1.0], 'cat': ['b', 'unseen']})
+    with pytest.warns(UserWarning, match='unknown categories'):
+        out = preprocessor.transform(new_rows)
+    # the missing value is imputed with the training mean, i.e. scaled to 0
+    assert abs(out['num'].iloc[0]) < 1e-12
+    assert out['num'].iloc[1] == X['num'].iloc[0]
+    assert list(out.columns) == ['num', 'cat_b']
+
+def test_label_encoding_handles_unknown_categories():
+    preprocessor, X = fit_preprocessor(make_frame(), encoding='label', scaler='minmax')
+    out = preprocessor.transform(pd.DataFrame({'num': [1.0], 'cat': ['unseen']}))
+    assert list(out.columns) == ['num', 'cat']
+    assert out['num'].iloc[0] == 0.0
+
+def make_high_cardinality_frame(rows=200, ids=100):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'num': rng.normal(size=rows),
+        'color': rng.choice(['red', 'green', 'blue'], rows),
+        'user_id': [f"u{i}" for i in rng.integers(0, ids, rows)],
+    })
+
+def test_sparse_output_stays_csr():
+    df = make_high_cardinality_frame()
+    preprocessor, X = fit_preprocessor(df, sparse=True)
+    assert sp.issparse(X)
+    assert X.shape[1] == 1 + 2 + df['user_id'].nunique() - 1
+    # one-hot columns are scaled without centring, so zeros stay zeros
+    assert X.nnz < X.shape[0] * 4
+    out = to_frame(preprocessor, preprocessor.transform(make_high_cardinality_frame(rows=5)))
+    assert all(isinstance(dtype, pd.SparseDtype) for dtype in out.dtypes)
+
+@pytest.mark.filterwarnings("ignore:Found unknown categories")
+def test_min_frequency_groups_rare_categories():
+    df = make_high_cardinality_frame()
+    preprocessor, X = fit_preprocessor(df, sparse=True, min_frequency=5)
+    names = list(preprocessor.get_feature_names_out())
+    assert 'user_id_infrequent_sklearn' in names
+    assert X.shape[1] < 1 + 2 + df['user_id'].nunique() - 1
+    # unseen ids land in the infrequent column
+    out = preprocessor.transform(make_high_cardinality_frame(rows=5).assign(user_id='never-seen'))
+    assert (out[:, names.index('user_id_infrequent_sklearn')].toarray() != 0).all()
+
+def test_high_cardinality_columns_use_hashing_or_target_encoding():
+    df = make_high_cardinality_frame()
+    preprocessor, X = fit_preprocessor(df, sparse=True, high_cardinality_encoding='hashing', cardinality_threshold=10)
+    assert X.shape[1] == 1 + 2 + HASHING_N_FEATURES
+    y = df['num'] * 2
+    preprocessor, X = fit_preprocessor(df, y=y, high_cardinality_encoding='target', cardinality_threshold=10)
+    assert list(X.columns) == ['num', 'color_green', 'color_red', 'user_id']
+    with pytest.raises(ValueError):
+        fit_preprocessor(df, high_cardinality_encoding='bogus')
+
+def test_optimize_dtypes_downcasts_and_reports_savings():
+    df = pd.DataFrame({
+        'small': np.arange(1000),
+        'signed': np.arange(1000) - 500,
+        'halves': np.arange(1000) / 2,
+        'precise': np.arange(1000) / 3,
+        'city': ['berlin', 'paris', np.nan, 'rome'] * 250,
+        'ids': [f"id{i}" for i in range(1000)],
+    })
+    out, report = optimize_dtypes(df)
+    assert out.dtypes.astype(str).to_dict() == {'small': 'uint16', 'signed': 'int16', 'halves': 'float32',
+                                                'precise': 'float64', 'city': 'category', 'ids': 'object'}
+    pd.testing.assert_frame_equal(out.astype(df.dtypes.to_dict()), df)
+    assert {r['column'] for r in report} == {'small', 'signed', 'halves', 'city'}
+    assert all(r['bytes_saved'] > 0 for r in report)
+
+def test_handle_missing_keeps_column_dtypes():
+    df = pd.DataFrame({'f': np.array([1.0, np.nan, 3.0], dtype=np.float32), 'i': [1, 2, 3],
+                       'c': pd.Series(['a', None, 'a'], dtype='category')})
+    out = handle_missing(df)
+    assert out.dtypes.to_dict() == df.dtypes.to_dict()
+    assert out['f'].tolist() == [1.0, 2.0, 3.0]
+    assert out['c'].tolist() == ['a', 'a', 'a']
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules.data_profiling import HyperLogLog, approximate_distinct, profile_dataset
+
+def columns_by_name(profile):
+    return {column['name']: column for column in profile['columns']}
+
+@pytest.mark.parametrize('n', [10, 1000, 200_000])
+def test_hyperloglog_estimates_distinct_counts(n):
+    values = pd.Series(np.arange(n)).repeat(3)
+    assert approximate_distinct(values) == pytest.approx(n, rel=0.05)
+    assert HyperLogLog().count() == 0
+
+def test_profile_reports_statistics_and_flags():
+    rng = np.random.default_rng(0)
+    n = 1000
+    df = pd.DataFrame({
+        'id': np.arange(n),
+        'x': rng.normal(size=n),
+        'mostly_null': np.where(np.arange(n) < 900, np.nan, 1.0),
+        'constant': 'same',
+        'city': pd.Categorical(rng.choice(['a', 'b', 'c'], n, p=[0.6, 0.3, 0.1])),
+        'code': rng.choice(['u', 'v'], n),
+    })
+    profile = profile_dataset(df)
+    assert profile['rows'] == n and profile['sampled_rows'] is None
+    columns = columns_by_name(profile)
+    assert columns['id']['flags'] == ['id_like']
+    assert columns['id']['top_values'] == []
+    assert columns['id']['min'] == 0 and columns['id']['max'] == n - 1
+    assert columns['mostly_null']['null_rate'] == pytest.approx(0.9)
+    assert 'mostly_null' in columns['mostly_null']['flags']
+    assert columns['constant']['flags'] == ['constant']
+    assert columns['x']['flags'] == []
+    assert columns['x']['quantiles']['p50'] == pytest.approx(np.median(df['x']))
+    city = columns['city']
+    assert city['distinct'] == 3 and not city['distinct_approximate']
+    assert city['top_values'][0]['value'] == 'a'
+    assert sum(v['count'] for v in city['top_values']) == n
+    assert [v['value'] for v in columns['code']['top_values']] == sorted(['u', 'v'], key=lambda v: -(df['code'] == v).sum())
+
+def test_large_frames_are_sampled_and_counts_scaled():
+    n = 50_000
+    df = pd.DataFrame({'k': np.arange(n) % 4, 'x': np.arange(n, dtype=float)})
+    profile = profile_dataset(df, sample_rows=5000)
+    assert profile['sampled_rows'] == 5000
+    k = columns_by_name(profile)['k']
+    # the exact passes still cover every row
+    assert k['min'] == 0 and k['max'] == 3 and k['distinct'] == 4
+    assert sum(v['count'] for v in k['top_values']) == pytest.approx(n, rel=0.01)
+    assert columns_by_name(profile)['x']['quantiles']['p50'] == pytest.approx(n / 2, rel=0.05)
+
+def test_unhashable_values_are_profiled_as_text():
+    df = pd.DataFrame({'doc': [{'a': 1}, {'b': 2}, None] * 10, 'tags': [[1], [2], [3]] * 10})
+    columns = columns_by_name(profile_dataset(df))
+    assert columns['doc']['distinct'] == 2 and columns['doc']['null_count'] == 10
+    assert columns['tags']['top_values'][0]['count'] == 10
@@ -0,0 +1,68 @@
+import os
+import pytest
+import pandas as pd
+import scipy.sparse as sp
+from modules import dataset_store
+from modules.dataset_store import save_dataset, load_dataset, dataset_info
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, 'DATASET_PATH', str(tmp_path))
+    return tmp_path
+
+def test_save_and_load_roundtrip():
+    df = pd.DataFrame({'col1': [1, 2, 3], 'col2': ['a', 'b', float('nan')]})
+    dataset_id = save_dataset(df)
+    pd.testing.assert_frame_equal(load_dataset(dataset_id), df)
+    pd.testing.assert_frame_equal(load_dataset(dataset_id, columns=['col2']), df[['col2']])
+    assert dataset_info(dataset_id)['shape'] == (3, 2)
+
+def test_identical_content_is_deduplicated(store_dir):
+    df = pd.DataFrame({'col1': [1, 2], 'col2': ['a', 'b']})
+    assert save_dataset(df) == save_dataset(df.copy())
+    assert save_dataset(df) != save_dataset(df.assign(col1=[1, 3]))
+    assert len(os.listdir(store_dir)) == 2
+
+def test_mixed_type_columns_are_stored_as_strings():
+    df = pd.DataFrame({'mixed': [1, 'a', None]})
+    loaded = load_dataset(save_dataset(df))
+    assert loaded['mixed'].tolist()[:2] == ['1', 'a']
+    assert pd.isna(loaded['mixed'].iloc[2])
+
+def test_missing_strings_load_as_nan():
+    loaded = load_dataset(save_dataset(pd.DataFrame({'b': ['x', float('nan'), 'y']})))
+    assert loaded['b'].iloc[1] is not None
+    assert loaded['b'].isna().tolist() == [False, True, False]
+
+def test_lru_eviction(store_dir, monkeypatch):
+    first = save_dataset(pd.DataFrame({'a': range(1000)}))
+    size = os.path.getsize(store_dir / f"{first}.parquet")
+    monkeypatch.setattr(dataset_store, 'DATASET_STORE_MAX_BYTES', size * 2 + size // 2)
+    second = save_dataset(pd.DataFrame({'a': range(1000, 2000)}))
+    os.utime(store_dir / f"{first}.parquet", (0, 0))
+    os.utime(store_dir / f"{second}.parquet", (1, 1))
+    load_dataset(first)  # touching makes `second` the least recently used
+    third = save_dataset(pd.DataFrame({'a': range(2000, 3000)}))
+    assert os.path.exists(store_dir / f"{first}.parquet")
+    assert not os.path.exists(store_dir / f"{second}.parquet")
+    assert os.path.exists(store_dir / f"{third}.parquet")
+
+def test_unknown_and_invalid_ids():
+    with pytest.raises(FileNotFoundError):
+        load_dataset('0' * 32)
+    with pytest.raises(ValueError):
+        load_dataset('../config')
+
+def test_sparse_columns_are_stored_without_densifying(store_dir):
+    df = pd.DataFrame.sparse.from_spmatrix(sp.random(50, 200, density=0.01, format='csr', random_state=0),
+                                           columns=[f"f{i}" for i in range(200)])
+    df['target'] = ['a', 'b'] * 25
+    dataset_id = save_dataset(df)
+    assert os.listdir(store_dir) == [f"{dataset_id}.npz"]
+    loaded = load_dataset(dataset_id)
+    assert isinstance(loaded['f0'].dtype, pd.SparseDtype)
+    pd.testing.assert_frame_equal(loaded, df, check_dtype=False)
+    pd.testing.assert_frame_equal(load_dataset(dataset_id, columns=['target', 'f3']), df[['target', 'f3']],
+                                  check_dtype=False)
+    assert dataset_info(dataset_id)['shape'] == (50, 201)
+    assert save_dataset(df.copy()) == dataset_id
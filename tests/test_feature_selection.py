@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+from sklearn.linear_model import LinearRegression
+from modules.feature_selection import FeatureSelector, check_selection_options
+from modules.model_training import train_and_select_best
+
+def make_wide_frame(rows=400, seed=0):
+    """Two informative columns, a duplicate, a constant, a rare dummy and noise."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, 8)), columns=[f"noise{i}" for i in range(8)])
+    X.insert(0, 'signal', rng.normal(size=rows))
+    X.insert(1, 'weak', rng.normal(size=rows))
+    X['copy'] = X['signal'] * -3 + 2
+    X['constant'] = 1.5
+    X['rare'] = np.where(np.arange(rows) == 0, 10.0, -0.05)  # a standard-scaled dummy set in one row
+    y = pd.Series(np.where(X['signal'] + 0.5 * X['weak'] > 0, 'pos', 'neg'))
+    return X, y
+
+def test_variance_threshold_is_independent_of_scaling():
+    X, y = make_wide_frame()
+    selector = FeatureSelector().fit(X, y)
+    assert 'constant' not in selector.get_feature_names_out()
+    assert 'rare' in selector.get_feature_names_out()
+    selector = FeatureSelector(variance_threshold=0.01).fit(X, y)
+    assert selector.dropped_['variance'] == 2
+    assert 'rare' not in selector.get_feature_names_out()
+
+def test_correlation_and_relevance_keep_the_informative_columns():
+    X, y = make_wide_frame()
+    selector = FeatureSelector(correlation_threshold=0.9).fit(X, y)
+    assert 'copy' not in selector.get_feature_names_out() and 'signal' in selector.get_feature_names_out()
+    for method in ('mutual_info', 'l1'):
+        selector = FeatureSelector(correlation_threshold=0.9, method=method, k=2).fit(X, y)
+        assert sorted(selector.get_feature_names_out()) == ['signal', 'weak']
+        out = selector.transform(X)
+        assert list(out.columns) == list(selector.get_feature_names_out())
+        assert selector.summary()['selected_columns'] == 2
+
+def test_sparse_input_with_svd_projection():
+    rng = np.random.default_rng(3)
+    X = sp.csr_matrix(np.eye(60)[rng.integers(0, 60, 500)])
+    y = rng.normal(size=500)
+    selector = FeatureSelector(variance_threshold=0.005, svd_components=8).fit(X, y)
+    out = selector.transform(X)
+    assert out.shape == (500, 8)
+    assert selector.summary()['svd_components'] == 8
+    # coefficients learned on the projection map back onto the input columns
+    model = LinearRegression().fit(out, y)
+    expanded = selector.expand_coef(model.coef_)
+    assert expanded.shape == (1, 60)
+    assert (X @ expanded.ravel() + model.intercept_) == pytest.approx(model.predict(out))
+
+@pytest.mark.parametrize('options', [{'method': 'pca'}, {'method': 'mutual_info'}, {'k': 3},
+                                     {'correlation_threshold': 1.5}, {'svd_components': 0}, {'typo': 1}])
+def test_invalid_options_are_rejected(options):
+    with pytest.raises(ValueError):
+        check_selection_options(options)
+
+def test_selection_runs_before_the_search_and_is_kept_with_the_model():
+    X, y = make_wide_frame()
+    model, metrics = train_and_select_best(X, y, n_jobs=1, feature_selection={'correlation_threshold': 0.9,
+                                                                              'method': 'l1', 'k': 2})
+    assert metrics['feature_selection']['input_columns'] == 13
+    assert metrics['feature_selection']['selected_columns'] == 2
+    assert metrics['accuracy'] > 0.8
+    assert [name for name, _ in model.steps] == ['selector', 'model']
+    assert model.steps[-1][1].n_features_in_ == 2
+    assert len(model.predict(X.head(5))) == 5
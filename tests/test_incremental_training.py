@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules.incremental_training import StreamingPreprocessor, reservoir_sample, train_incremental
+
+def make_frame(rows=6000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'a': rng.normal(loc=5, scale=2, size=rows), 'b': rng.choice(['x', 'y', 'z'], rows),
+                       'c': rng.normal(size=rows)})
+    df.loc[::13, 'a'] = np.nan
+    df.loc[::17, 'b'] = None
+    df['label'] = np.where(df['a'].fillna(5) - 5 + (df['b'] == 'x') * 2 > 0.5, 'pos', 'neg')
+    return df
+
+def chunked(df, size=1000):
+    return lambda: (df.iloc[i:i + size] for i in range(0, len(df), size))
+
+def test_streaming_statistics_match_a_full_pass():
+    df = make_frame()
+    pre = StreamingPreprocessor()
+    for chunk in chunked(df[['a', 'b', 'c']], 700)():
+        pre.partial_fit(chunk)
+    np.testing.assert_allclose(pre.mean_, df[['a', 'c']].mean().to_numpy())
+    np.testing.assert_allclose(np.sqrt(pre.m2_ / pre.count_), df[['a', 'c']].std(ddof=0).to_numpy())
+    assert pre.categories_['b'][0] == df['b'].mode()[0]
+    out = pre.transform(df[['a', 'b', 'c']])
+    assert out.shape == (len(df), 2 + 3)
+    assert not np.isnan(out).any()
+    minmax = StreamingPreprocessor(scaling='minmax').fit(df[['a', 'c']]).transform(df[['a', 'c']])
+    assert minmax.min() >= 0
+
+def test_reservoir_is_bounded_and_uniform():
+    counts = np.zeros(100)
+    for seed in range(1000):
+        rng = np.random.default_rng(seed)
+        reservoir = np.empty(0, dtype=np.int64)
+        for start in range(0, 100, 7):
+            reservoir = reservoir_sample(start, min(7, 100 - start), 10, rng, reservoir)
+        assert len(reservoir) == len(set(reservoir)) == 10
+        counts[reservoir] += 1
+    # every row is kept with probability k/n = 0.1
+    assert np.abs(counts / 1000 - 0.1).max() < 0.04
+
+def test_train_incremental_classification_holds_out_rows():
+    df = make_frame()
+    progress = []
+    model, metrics = train_incremental(chunked(df), 'label', epochs=2, holdout_rows=500,
+                                       progress_callback=lambda done, total, _: progress.append((done, total)))
+    assert metrics['accuracy'] > 0.9
+    assert metrics['holdout_rows'] == 500 and metrics['rows'] == len(df)
+    assert progress[-1] == (12, 12)
+    assert {c['model_name'] for c in metrics['candidates']} == {'SGDClassifier', 'PassiveAggressive', 'MultinomialNB'}
+    # the saved pipeline scores raw rows
+    assert set(model.predict(df.drop(columns=['label']).head(20))) <= {'pos', 'neg'}
+
+def test_train_incremental_regression_skips_missing_targets():
+    df = make_frame().drop(columns=['label'])
+    df['y'] = df['c'] * 3 + 1
+    df.loc[::50, 'y'] = np.nan
+    model, metrics = train_incremental(chunked(df), 'y', holdout_rows=300)
+    assert metrics['r2'] > 0.95
+    with pytest.raises(ValueError, match='not found'):
+        train_incremental(chunked(df), 'missing')
@@ -0,0 +1,99 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from modules.inference_batcher import MicroBatcher
+
+class RecordingPredict:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, model_filename, data):
+        self.calls.append(len(data))
+        if 'bad' in data.columns and data['bad'].notna().any():
+            raise ValueError("bad input")
+        return (data['x'] * 2).tolist()
+
+def make_batcher(predict_func, **kwargs):
+    # every model name resolves; the model files themselves are never loaded
+    return MicroBatcher(predict_func, resolve_func=lambda model_filename: None, **kwargs)
+
+def run_concurrently(batcher, frames, model='m.pkl'):
+    async def main():
+        return await asyncio.gather(*(batcher.predict(model, frame) for frame in frames), return_exceptions=True)
+    return asyncio.run(main())
+
+def test_concurrent_requests_share_one_predict_call():
+    fake = RecordingPredict()
+    batcher = make_batcher(fake, max_batch_size=100, max_wait_ms=50)
+    results = run_concurrently(batcher, [pd.DataFrame({'x': [i, i + 100]}) for i in range(10)])
+    assert results == [[2 * i, 2 * (i + 100)] for i in range(10)]
+    assert fake.calls == [20]
+    stats = batcher.stats()
+    assert (stats['requests'], stats['batches']) == (10, 1)
+    assert stats['batch_size_histogram'] == {'32': 1}
+    assert set(stats['latency_ms']) == {'p50', 'p90', 'p99'}
+
+def test_batches_are_capped_at_max_batch_size():
+    fake = RecordingPredict()
+    batcher = make_batcher(fake, max_batch_size=4, max_wait_ms=50)
+    results = run_concurrently(batcher, [pd.DataFrame({'x': [i]}) for i in range(10)])
+    assert results == [[2 * i] for i in range(10)]
+    assert fake.calls == [4, 4, 2]
+
+def test_failing_request_does_not_fail_its_batch():
+    fake = RecordingPredict()
+    batcher = make_batcher(fake, max_batch_size=100, max_wait_ms=50)
+    frames = [pd.DataFrame({'x': [1], 'bad': [np.nan]}), pd.DataFrame({'x': [2], 'bad': [1.0]}),
+              pd.DataFrame({'x': [3], 'bad': [np.nan]})]
+    results = run_concurrently(batcher, frames)
+    assert results[0] == [2] and results[2] == [6]
+    assert isinstance(results[1], ValueError)
+    assert batcher.stats()['fallbacks'] == 1
+
+def test_models_are_batched_separately():
+    fake = RecordingPredict()
+    batcher = make_batcher(fake, max_batch_size=100, max_wait_ms=50)
+
+    async def main():
+        return await asyncio.gather(batcher.predict('a.pkl', pd.DataFrame({'x': [1]})),
+                                    batcher.predict('b.pkl', pd.DataFrame({'x': [2]})))
+    assert asyncio.run(main()) == [[2], [4]]
+    assert sorted(fake.calls) == [1, 1]
+
+def test_requests_with_other_columns_are_not_batched_together():
+    calls = []
+
+    def predict_func(model_filename, data):
+        calls.append(list(data.columns))
+        # a request lacking a column fails, as it does alone, instead of getting the column imputed
+        return (data['x'] * 2 + data['y']).tolist()
+
+    batcher = make_batcher(predict_func, max_batch_size=100, max_wait_ms=50)
+    frames = [pd.DataFrame({'x': [1], 'y': [1]}), pd.DataFrame({'x': [2]}), pd.DataFrame({'x': [3], 'y': [1]})]
+    results = run_concurrently(batcher, frames)
+    assert results[0] == [3] and results[2] == [7]
+    assert isinstance(results[1], KeyError)
+    assert calls == [['x', 'y'], ['x']]
+
+def test_unknown_models_get_no_queue():
+    def resolve_func(model_filename):
+        raise FileNotFoundError(model_filename)
+
+    batcher = MicroBatcher(RecordingPredict(), resolve_func=resolve_func)
+    results = run_concurrently(batcher, [pd.DataFrame({'x': [1]})], model='missing.pkl')
+    assert isinstance(results[0], FileNotFoundError)
+    assert batcher.stats()['queue_depth'] == {}
+
+def test_idle_workers_are_dropped():
+    fake = RecordingPredict()
+    batcher = make_batcher(fake, max_batch_size=100, max_wait_ms=1, idle_seconds=0.05)
+
+    async def main():
+        assert await batcher.predict('m.pkl', pd.DataFrame({'x': [1]})) == [2]
+        assert list(batcher._workers) == ['m.pkl']
+        await asyncio.sleep(0.2)
+        assert batcher._workers == {} and batcher._queues == {}
+        # the next request starts a new worker
+        assert await batcher.predict('m.pkl', pd.DataFrame({'x': [2]})) == [4]
+    asyncio.run(main())
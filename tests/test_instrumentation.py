@@ -0,0 +1,83 @@
+import os
+import pstats
+import time
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from backend.instrumentation import InstrumentedRoute, MetricsMiddleware
+from modules.instrumentation import MetricsRegistry, registry, span, timed
+
+def test_registry_renders_prometheus_text():
+    metrics = MetricsRegistry(buckets=(0.1, 1.0))
+    metrics.observe('automl_stage_seconds', 0.5, stage='fit')
+    metrics.observe('automl_stage_seconds', 2.0, stage='fit')
+    metrics.inc('automl_stage_rows_total', 10, stage='fit')
+    text = metrics.render()
+    assert '# TYPE automl_stage_seconds histogram' in text
+    assert 'automl_stage_seconds_bucket{stage="fit",le="0.1"} 0' in text
+    assert 'automl_stage_seconds_bucket{stage="fit",le="1.0"} 1' in text
+    assert 'automl_stage_seconds_bucket{stage="fit",le="+Inf"} 2' in text
+    assert 'automl_stage_seconds_sum{stage="fit"} 2.5' in text
+    assert 'automl_stage_rows_total{stage="fit"} 10.0' in text
+    assert 'automl_process_peak_rss_bytes' in text
+
+def test_registry_merges_snapshots_of_other_processes():
+    metrics, worker = MetricsRegistry(buckets=(0.1, 1.0)), MetricsRegistry(buckets=(0.1, 1.0))
+    metrics.inc('automl_stage_rows_total', 10, stage='parse')
+    metrics.observe('automl_stage_seconds', 0.05, stage='parse')
+    worker.inc('automl_stage_rows_total', 5, stage='parse')
+    worker.observe('automl_stage_seconds', 0.5, stage='parse')
+    worker.set('automl_stage_rows_per_second', 10.0, stage='parse')
+    metrics.merge(worker.snapshot())
+    assert metrics.get('automl_stage_rows_total', stage='parse') == 15
+    assert metrics.get('automl_stage_seconds', stage='parse') == (0.55, 2)
+    assert metrics.get('automl_stage_rows_per_second', stage='parse') == 10.0
+    assert 'automl_stage_seconds_bucket{stage="parse",le="1.0"} 2' in metrics.render()
+
+def test_spans_record_time_rows_and_errors():
+    registry.reset()
+
+    @timed('test.double', rows=len)
+    def double(values):
+        time.sleep(0.01)
+        return values * 2
+
+    double([1, 2])
+    seconds, count = registry.get('automl_stage_seconds', stage='test.double')
+    assert count == 1 and seconds >= 0.01
+    assert registry.get('automl_stage_rows_total', stage='test.double') == 4
+    assert registry.get('automl_stage_rows_per_second', stage='test.double') > 0
+    assert registry.get('automl_stage_peak_rss_bytes', stage='test.double') > 0
+    try:
+        with span('test.fail'):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert registry.get('automl_stage_seconds', stage='test.fail.error')[1] == 1
+
+def make_app(tmp_path):
+    app = FastAPI()
+    router = APIRouter(route_class=InstrumentedRoute)
+
+    @router.get('/items/{item_id}')
+    def read_item(item_id: int):
+        return sum(range(10000)) + item_id
+
+    app.include_router(router)
+    app.add_middleware(MetricsMiddleware, profiling=True, profile_path=str(tmp_path))
+    return app
+
+def test_middleware_records_route_latency_and_profiles_on_request(tmp_path):
+    registry.reset()
+    client = TestClient(make_app(tmp_path))
+    assert client.get('/items/1').status_code == 200
+    assert client.get('/items/2').status_code == 200
+    assert client.get('/missing').status_code == 404
+    assert registry.get('automl_http_request_seconds', method='GET', route='/items/{item_id}', status='200')[1] == 2
+    assert registry.get('automl_http_request_seconds', method='GET', route='unmatched', status='404')[1] == 1
+    assert os.listdir(tmp_path) == []
+
+    response = client.get('/items/3', headers={'X-Profile': '1'})
+    filename = response.headers['x-profile-file']
+    stats = pstats.Stats(str(tmp_path / filename))
+    # the sync endpoint ran in a threadpool thread and is still in the profile
+    assert any(func[2] == 'read_item' for func in stats.stats)
@@ -0,0 +1,119 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from modules import model_training
+from modules.data_preprocessing import fit_preprocessor
+from modules.feature_selection import FeatureSelector
+from modules.model_training import (save_model, load_model, load_manifest, load_coefficients, attach_preprocessor,
+                                    get_model_path)
+
+@pytest.fixture(autouse=True)
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_training, 'MODEL_PATH', str(tmp_path))
+    return tmp_path
+
+def make_frame(rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({'x': rng.normal(size=rows), 'k': rng.choice(['a', 'b', 'c'], rows)})
+    return X, X['x'] * 2 + (X['k'] == 'a')
+
+def test_manifest_records_schema_preprocessing_and_metrics():
+    X, y = make_frame()
+    preprocessor, X_out = fit_preprocessor(X)
+    pipeline = attach_preprocessor(preprocessor, LinearRegression().fit(X_out, y))
+    save_model(pipeline, 'm.pkl', metrics={'r2': 0.9, 'candidates': [{'cv_score': 0.8}]})
+    manifest = load_manifest('m.pkl')
+    assert manifest['format_version'] == 1
+    assert manifest['model_type'] == 'sklearn.linear_model._base.LinearRegression'
+    assert manifest['features'] == [{'name': 'x', 'kind': 'numeric', 'dtype': 'float64'},
+                                    {'name': 'k', 'kind': 'categorical', 'dtype': 'object'}]
+    assert manifest['coefficients_input'] == 'preprocessed'
+    assert [t['name'] for t in manifest['preprocessing']] == ['num', 'cat']
+    assert manifest['metrics'] == {'r2': 0.9}
+    assert manifest['compression'] == 'none' and manifest['memory_mappable']
+    assert load_model('m.pkl').predict(X.head(3)) == pytest.approx(pipeline.predict(X.head(3)))
+
+def test_uncompressed_artifacts_are_memory_mapped():
+    X, y = make_frame()
+    save_model(RandomForestRegressor(n_estimators=5, random_state=0).fit(X[['x']], y), 'rf.pkl')
+    save_model(LinearRegression().fit(np.random.default_rng(0).normal(size=(50, 300)), np.arange(50)), 'lr.pkl')
+    assert isinstance(load_model('lr.pkl').coef_, np.memmap)
+    assert not isinstance(load_model('lr.pkl', mmap=False).coef_, np.memmap)
+    assert load_model('rf.pkl').predict(X[['x']].head(2)).shape == (2,)
+
+def test_compressed_artifacts_load_without_mmap():
+    X, y = make_frame()
+    model = LinearRegression().fit(X[['x']], y)
+    save_model(model, 'z.pkl', compression='zlib:3')
+    manifest = load_manifest('z.pkl')
+    assert manifest['compression'] == 'zlib:3' and not manifest['memory_mappable']
+    assert load_model('z.pkl').coef_ == pytest.approx(model.coef_)
+    with pytest.raises(ValueError, match='zstd'):
+        save_model(model, 'z.pkl', compression='zstd:3')
+    with pytest.raises(ValueError):
+        save_model(model, 'z.pkl', compression='snappy')
+
+def test_models_saved_without_manifest_still_load():
+    X, y = make_frame()
+    joblib.dump(LinearRegression().fit(X[['x']], y), get_model_path('old.pkl'))
+    assert load_manifest('old.pkl') is None
+    assert load_model('old.pkl').coef_[0] == pytest.approx(2.0, abs=0.5)
+
+@pytest.mark.parametrize('n_classes', [2, 3])
+def test_exported_coefficients_predict_like_the_estimator(n_classes):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = np.array(['a', 'b', 'c'][:n_classes])[np.argmax(X[:, :n_classes], axis=1)]
+    model = LogisticRegression().fit(X, y)
+    save_model(model, 'clf.pkl')
+    coefficients = load_coefficients('clf.pkl')
+    assert (coefficients.predict(X) == model.predict(X)).all()
+    regressor = LinearRegression().fit(X, X @ np.arange(4.0))
+    save_model(regressor, 'reg.pkl')
+    assert load_coefficients('reg.pkl').predict(X) == pytest.approx(regressor.predict(X))
+    # non-linear models export nothing, and overwriting drops a stale coefficient file
+    save_model(RandomForestRegressor(n_estimators=2).fit(X, X[:, 0]), 'reg.pkl')
+    assert load_coefficients('reg.pkl') is None
+
+@pytest.mark.parametrize('scaler', ['standard', 'minmax'])
+def test_numeric_preprocessing_is_folded_into_raw_input_coefficients(scaler):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'a': rng.normal(5, 2, 200), 'b': rng.uniform(0, 100, 200)})
+    X.loc[::7, 'a'] = np.nan
+    y = np.where(X['a'].fillna(5) + X['b'] / 20 > 7.5, 'yes', 'no')
+    preprocessor, X_out = fit_preprocessor(X, scaler=scaler)
+    pipeline = attach_preprocessor(preprocessor, LogisticRegression().fit(X_out, y))
+    save_model(pipeline, 'p.pkl')
+    assert load_manifest('p.pkl')['coefficients_input'] == 'raw'
+    coefficients = load_coefficients('p.pkl')
+    rows = [{'a': 4.0, 'b': 80.0}, {'a': None, 'b': 10.0}, {'a': 6.5, 'b': 55.0}]
+    expected = pipeline.predict(pd.DataFrame(rows, columns=['a', 'b']).astype(float))
+    assert (coefficients.predict(coefficients.records_to_array(rows)) == expected).all()
+    assert coefficients.decision_function(coefficients.frame_to_array(X)) == pytest.approx(
+        pipeline.decision_function(X))
+    with pytest.raises(ValueError):
+        coefficients.records_to_array([{'a': 'text', 'b': 1.0}])
+    # a missing key is an error, as a missing column is for the pipeline, not a value to impute
+    with pytest.raises(KeyError):
+        coefficients.records_to_array([{'b': 1.0}])
+
+def test_feature_selection_is_folded_and_unused_inputs_are_not_read():
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame(rng.normal(size=(300, 6)), columns=[f"x{i}" for i in range(6)])
+    X['dup'] = X['x0'] * 2 + 1
+    y = X['x0'] * 3 - X['x1'] + rng.normal(scale=0.1, size=300)
+    preprocessor, X_out = fit_preprocessor(X)
+    selector = FeatureSelector(correlation_threshold=0.95, method='l1', k=2).fit(X_out, y)
+    model = LinearRegression().fit(selector.transform(X_out), y)
+    pipeline = attach_preprocessor(preprocessor, Pipeline([('selector', selector), ('model', model)]))
+    save_model(pipeline, 'selected.pkl')
+    manifest = load_manifest('selected.pkl')
+    assert manifest['coefficients_input'] == 'raw'
+    assert manifest['feature_selection']['selected_columns'] == 2
+    coefficients = load_coefficients('selected.pkl')
+    assert coefficients.feature_names.tolist() == ['x0', 'x1']
+    assert coefficients.decision_function(coefficients.frame_to_array(X)) == pytest.approx(pipeline.predict(X))
@@ -0,0 +1,63 @@
+import os
+import pytest
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from modules import model_training
+from modules.model_deployment import ModelCache, predict, model_cache
+from modules.model_training import save_model
+
+@pytest.fixture(autouse=True)
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_training, 'MODEL_PATH', str(tmp_path))
+    model_cache.invalidate()
+    # other tests' predictions count towards the shared cache's hits
+    monkeypatch.setattr(model_cache, 'hits', 0)
+    return tmp_path
+
+def fitted_model(slope=2.0):
+    X = pd.DataFrame({'x': [0.0, 1.0, 2.0]})
+    return LinearRegression().fit(X, X['x'] * slope)
+
+def test_cache_hits_after_first_load():
+    save_model(fitted_model(), 'm.pkl')
+    cache = ModelCache(max_bytes=10 ** 9)
+    assert cache.get('m.pkl') is cache.get('m.pkl')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+def test_cache_reloads_when_file_changes(model_dir):
+    save_model(fitted_model(2.0), 'm.pkl')
+    cache = ModelCache(max_bytes=10 ** 9)
+    first = cache.get('m.pkl')
+    save_model(fitted_model(3.0), 'm.pkl')
+    os.utime(model_dir / 'm.pkl', ns=(0, os.stat(model_dir / 'm.pkl').st_mtime_ns + 10 ** 9))
+    second = cache.get('m.pkl')
+    assert second is not first
+    assert second.coef_[0] == pytest.approx(3.0)
+    assert cache.stats()['invalidations'] == 1
+
+def test_cache_evicts_least_recently_used(model_dir):
+    for name in ('a.pkl', 'b.pkl', 'c.pkl'):
+        save_model(fitted_model(), name)
+    size = os.path.getsize(model_dir / 'a.pkl')
+    cache = ModelCache(max_bytes=size * 2)
+    cache.warm_up(['a.pkl', 'b.pkl'])
+    cache.get('a.pkl')
+    cache.get('c.pkl')
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['bytes'] <= size * 2
+    cache.get('a.pkl')
+    assert cache.stats()['hits'] == 2  # 'b.pkl' was evicted, not 'a.pkl'
+
+def test_predict_uses_shared_cache():
+    save_model(fitted_model(), 'm.pkl')
+    assert predict('m.pkl', {'x': 1.0}) == pytest.approx([2.0])
+    predict('m.pkl', pd.DataFrame({'x': [2.0]}))
+    assert model_cache.stats()['hits'] == 1
+
+def test_missing_and_invalid_model_names():
+    with pytest.raises(FileNotFoundError):
+        predict('missing.pkl', {'x': 1.0})
+    with pytest.raises(ValueError):
+        predict('../config.py', {'x': 1.0})
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+import pandas as pd
+import scipy.sparse as sp
+from modules import estimator_registry
+from modules.estimator_registry import EstimatorSpec, FitHistory, register_estimator
+from modules.model_training import train_and_select_best
+from modules.result_cache import ResultCache
+
+def make_classification_frame(rows=120, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({'x1': rng.normal(size=rows), 'x2': rng.normal(size=rows)})
+    y = pd.Series(np.where(X['x1'] + X['x2'] > 0, 'pos', 'neg'))
+    return X, y
+
+def test_parallel_search_reports_every_candidate():
+    X, y = make_classification_frame()
+    model, metrics = train_and_select_best(X, y, n_jobs=2)
+    assert metrics['model_name'] in ('LogisticRegression', 'RandomForest', 'SVM', 'HistGradientBoosting')
+    assert metrics['accuracy'] > 0.8
+    # 3 LogisticRegression + 3 RandomForest + 6 SVM + 2 HistGradientBoosting parameter combinations
+    assert len(metrics['candidates']) == 14
+    assert all(c['fit_time'] > 0 for c in metrics['candidates'])
+    assert metrics['training_time'] >= metrics['search_time'] > 0
+    assert list(model.feature_names_in_) == ['x1', 'x2']
+
+def test_parallel_search_regression():
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame({'x': rng.normal(size=80)})
+    y = X['x'] * 3 + rng.normal(scale=0.1, size=80)
+    model, metrics = train_and_select_best(X, y, n_jobs=1)
+    assert metrics['r2'] > 0.9
+    assert ({'LinearRegression', 'RandomForest', 'SVM', 'HistGradientBoosting'}
+            == {c['model_name'] for c in metrics['candidates']})
+
+def test_halving_search_drops_candidates_on_subsamples():
+    X, y = make_classification_frame(rows=600)
+    model, metrics = train_and_select_best(X, y, n_jobs=2, search='halving')
+    assert metrics['search'] == 'halving'
+    assert metrics['accuracy'] > 0.8
+    sizes = [r['n_resources'] for r in metrics['rounds']]
+    assert sizes == sorted(sizes) and sizes[-1] == 480  # last round uses the full training split
+    assert [r['n_candidates'] for r in metrics['rounds']] == [14, 5, 2]
+    statuses = [c['status'] for c in metrics['candidates']]
+    assert statuses.count('eliminated') == 12
+
+def test_time_budget_skips_and_reports_unfinished_work():
+    X, y = make_classification_frame(rows=200)
+    model, metrics = train_and_select_best(X, y, n_jobs=1, time_budget=1e-6)
+    # no family fits in the budget: the cheapest estimated one still runs so a model is returned
+    cheapest = min(metrics['estimated_search_times'], key=metrics['estimated_search_times'].get)
+    assert list(metrics['estimated_search_times']) == [cheapest] == [metrics['model_name']]
+    evaluated = [c for c in metrics['candidates'] if c['status'] == 'evaluated']
+    assert {c['model_name'] for c in evaluated} == {cheapest}
+    assert metrics['skipped'] == 14 - len(evaluated)
+    skipped = [c for c in metrics['candidates'] if c['status'] == 'skipped']
+    assert all(c['reason'].startswith('estimated') and c['reason'].endswith('exceeds the time budget')
+               for c in skipped)
+
+def test_sparse_frame_is_trained_as_csr():
+    rng = np.random.default_rng(2)
+    ids = rng.integers(0, 50, 300)
+    X = pd.DataFrame.sparse.from_spmatrix(sp.csr_matrix(np.eye(50)[ids]), columns=[f"id_{i}" for i in range(50)])
+    y = pd.Series(np.where(ids % 2 == 0, 'even', 'odd'))
+    model, metrics = train_and_select_best(X, y, n_jobs=1)
+    assert metrics['accuracy'] > 0.9
+    assert model.predict(sp.csr_matrix(np.eye(50)[[2, 3]])).tolist() == ['even', 'odd']
+
+def test_memory_budget_downsamples_the_search_only():
+    X, y = make_classification_frame(rows=500)
+    model, metrics = train_and_select_best(X, y, n_jobs=1, memory_budget=X.memory_usage(index=False).sum() // 4)
+    assert metrics['train_rows'] == 400
+    assert 60 <= metrics['search_rows'] < 400
+    assert all(c['n_resources'] == metrics['search_rows'] for c in metrics['candidates'])
+    assert metrics['accuracy'] > 0.8
+    _, unlimited = train_and_select_best(X, y, n_jobs=1, memory_budget=0)
+    assert unlimited['search_rows'] == 400
+
+def test_cached_cv_scores_are_not_recomputed(tmp_path):
+    X, y = make_classification_frame()
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    _, first = train_and_select_best(X, y, n_jobs=1, cache=cache)
+    assert first['cv_cache_hits'] == 0
+    _, second = train_and_select_best(X, y, n_jobs=1, cache=cache)
+    assert second['cv_cache_hits'] == len(second['candidates']) == 14
+    assert [c['cv_score'] for c in second['candidates']] == [c['cv_score'] for c in first['candidates']]
+    assert all(c['fit_time'] == 0.0 for c in second['candidates'])
+
+def test_families_that_cannot_take_the_data_are_skipped(monkeypatch):
+    X, y = make_classification_frame(rows=200)
+    monkeypatch.setitem(estimator_registry._registry, ('classification', 'batch', 'SVM'),
+                        EstimatorSpec('SVM', 'classification', 'sklearn.svm.SVC', {'C': [1]}, max_rows=100))
+    _, metrics = train_and_select_best(X, y, n_jobs=1)
+    svm = [c for c in metrics['candidates'] if c['model_name'] == 'SVM']
+    assert svm == [{'model_name': 'SVM', 'params': {'C': 1}, 'cv_score': None, 'fit_time': 0.0, 'status': 'skipped',
+                    'reason': 'more than 100 rows'}]
+    assert 'SVM' not in metrics['estimated_search_times']
+    # histogram gradient boosting needs dense input, so it sits out sparse searches
+    ids = np.random.default_rng(3).integers(0, 20, 200)
+    X_sparse = pd.DataFrame.sparse.from_spmatrix(sp.csr_matrix(np.eye(20)[ids]), columns=[f"id_{i}" for i in range(20)])
+    _, metrics = train_and_select_best(X_sparse, pd.Series(np.where(ids % 2 == 0, 'even', 'odd')), n_jobs=1)
+    assert {c['reason'] for c in metrics['candidates'] if c['model_name'] == 'HistGradientBoosting'} == {
+        'does not accept sparse input'}
+
+def test_registered_family_joins_the_search(monkeypatch):
+    X, y = make_classification_frame()
+    monkeypatch.setattr(estimator_registry, '_registry', dict(estimator_registry._registry))
+    register_estimator(EstimatorSpec('ExtraTrees', 'classification', 'sklearn.ensemble.ExtraTreesClassifier',
+                                     {'n_estimators': [20]}, params={'random_state': 0}))
+    with pytest.raises(ValueError, match='already registered'):
+        register_estimator(EstimatorSpec('ExtraTrees', 'classification', 'sklearn.ensemble.ExtraTreesClassifier'))
+    _, metrics = train_and_select_best(X, y, n_jobs=1)
+    assert [c['status'] for c in metrics['candidates'] if c['model_name'] == 'ExtraTrees'] == ['evaluated']
+
+def test_fit_history_records_fit_times_and_calibrates_the_estimate(tmp_path):
+    X, y = make_classification_frame()
+    history = FitHistory(str(tmp_path / 'fit_history.db'))
+    spec = estimator_registry.registered_estimators('classification')[0]
+    assert history.cost(spec) is None
+    _, first = train_and_select_best(X, y, n_jobs=1, fit_history=history)
+    # every candidate's CV fit time and the refit time were recorded
+    observed = history.cost(spec)
+    assert observed is not None and observed > 0
+    assert spec.estimate(1000, 10, observed) == pytest.approx(observed)
+    _, second = train_and_select_best(X, y, n_jobs=1, fit_history=history)
+    assert second['estimated_search_times'] != first['estimated_search_times']
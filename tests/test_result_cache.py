@@ -0,0 +1,34 @@
+import os
+import time
+import numpy as np
+from modules.result_cache import ResultCache, make_key
+
+def test_make_key_depends_on_every_part():
+    assert make_key('cv', 'abc', {'C': 1}) == make_key('cv', 'abc', {'C': 1})
+    assert make_key('cv', 'abc', {'C': 1}) != make_key('cv', 'abc', {'C': 10})
+    assert make_key('cv', 'abc') != make_key('preprocess', 'abc')
+
+def test_get_put_and_memory_mapped_arrays(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    assert cache.get('missing') is None
+    cache.put('k', {'array': np.arange(100000), 'score': 0.5})
+    value = cache.get('k')
+    assert value['score'] == 0.5
+    assert isinstance(value['array'], np.memmap)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1)
+    cache.max_bytes = 10 ** 9
+    for key in ('a', 'b', 'c'):
+        cache.put(key, np.zeros(1000))
+    old = time.time() - 100
+    for key in ('a', 'b', 'c'):
+        os.utime(os.path.join(str(tmp_path), key + '.joblib'), (old, old))
+    cache.get('a')  # refreshes 'a'
+    entry_size = os.path.getsize(os.path.join(str(tmp_path), 'a.joblib'))
+    cache.max_bytes = 2 * entry_size
+    cache.put('d', np.zeros(1000))
+    assert cache.get('b') is None and cache.get('c') is None
+    assert cache.get('a') is not None and cache.get('d') is not None
+    assert cache.stats()['evictions'] == 2
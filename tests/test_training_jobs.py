@@ -0,0 +1,161 @@
+import os
+import time
+from concurrent.futures import Future
+import numpy as np
+import pandas as pd
+import pytest
+from modules import dataset_store, model_training, training_jobs
+from modules.dataset_store import save_dataset
+from modules.result_cache import result_cache
+from modules.estimator_registry import fit_history, registered_estimators
+from modules.training_jobs import (init_job_db, create_training_job, run_training_job, cancel_training_job, get_job,
+                                   find_matching_job, requeue_interrupted_jobs, requeue_stale_jobs, JobRunner,
+                                   JobCancelled)
+
+@pytest.fixture(autouse=True)
+def job_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, 'DATASET_PATH', str(tmp_path / 'datasets'))
+    monkeypatch.setattr(model_training, 'MODEL_PATH', str(tmp_path / 'models'))
+    monkeypatch.setattr(training_jobs, 'JOB_DB_PATH', str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(result_cache, 'path', str(tmp_path / 'cache'))
+    monkeypatch.setattr(fit_history, 'path', str(tmp_path / 'fit_history.db'))
+    init_job_db()
+
+def make_job():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'x': rng.normal(size=90)})
+    df['y'] = df['x'] * 2 + rng.normal(scale=0.1, size=90)
+    return create_training_job({'dataset_id': save_dataset(df), 'target': 'y'})
+
+def test_job_runs_to_completion_with_progress():
+    job_id = make_job()
+    run_training_job(job_id, n_jobs=1)
+    job = get_job(job_id)
+    assert job['status'] == 'completed'
+    assert job['completed'] == job['total'] == 12  # 1 LinearRegression + 3 RandomForest + 6 SVM + 2 HistGB
+    assert job['model_filename'] == f"{job_id}.pkl"
+    assert job['metrics']['r2'] > 0.9
+    # the job's fit times calibrate later estimates
+    forest = next(spec for spec in registered_estimators('regression') if spec.name == 'RandomForest')
+    assert fit_history.cost(forest) > 0
+
+def test_queued_job_cancelled_before_it_starts():
+    job_id = make_job()
+    assert cancel_training_job(job_id)['status'] == 'cancelled'
+    run_training_job(job_id, n_jobs=1)
+    assert get_job(job_id)['status'] == 'cancelled'
+
+def test_running_job_stops_at_next_candidate(monkeypatch):
+    job_id = make_job()
+    real_train = model_training.train_and_select_best
+
+    def train_and_cancel(X, y, progress_callback=None, **kwargs):
+        def progress(completed, total, candidate):
+            training_jobs._set_status(job_id, 'cancelling', ('running',))
+            progress_callback(completed, total, candidate)
+        return real_train(X, y, progress_callback=progress, **kwargs)
+
+    monkeypatch.setattr(training_jobs, 'train_and_select_best', train_and_cancel)
+    run_training_job(job_id, n_jobs=1)
+    job = get_job(job_id)
+    assert job['status'] == 'cancelled'
+    assert job['completed'] == 1
+
+def test_failed_job_records_error():
+    job_id = create_training_job({'dataset_id': '0' * 32, 'target': 'y'})
+    run_training_job(job_id, n_jobs=1)
+    job = get_job(job_id)
+    assert job['status'] == 'failed'
+    assert 'FileNotFoundError' in job['error']
+
+def test_identical_params_match_an_existing_job():
+    job_id = make_job()
+    params = get_job(job_id)['params']
+    assert find_matching_job(params) == job_id
+    assert find_matching_job({**params, 'search': 'halving'}) is None
+    run_training_job(job_id, n_jobs=1)
+    assert find_matching_job(params) == job_id
+    os.remove(model_training.get_model_path(get_job(job_id)['model_filename']))
+    # the model is gone, so the job no longer counts as a result
+    assert find_matching_job(params) is None
+    cancelled = create_training_job(params)
+    cancel_training_job(cancelled)
+    assert find_matching_job(params) is None
+
+def test_interrupted_jobs_are_requeued():
+    running, cancelling = make_job(), make_job()
+    training_jobs._set_status(running, 'running', ('queued',))
+    training_jobs._update_job(running, completed=3)
+    training_jobs._set_status(cancelling, 'cancelling', ('queued',))
+    requeue_interrupted_jobs()
+    assert (get_job(running)['status'], get_job(running)['completed']) == ('queued', 0)
+    assert get_job(cancelling)['status'] == 'cancelled'
+
+def test_unknown_job():
+    with pytest.raises(KeyError):
+        get_job('missing')
+
+def test_incremental_job_streams_the_stored_dataset(monkeypatch):
+    monkeypatch.setattr(training_jobs, 'INGESTION_CHUNK_SIZE', 50)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'x': rng.normal(size=400), 'k': rng.choice(['a', 'b'], 400)})
+    df['y'] = df['x'] * 2 + (df['k'] == 'a')
+    job_id = create_training_job({'dataset_id': save_dataset(df), 'target': 'y', 'mode': 'incremental'})
+    run_training_job(job_id, n_jobs=1)
+    job = get_job(job_id)
+    assert job['status'] == 'completed', job['error']
+    assert job['metrics']['search'] == 'incremental'
+    assert job['completed'] == job['total'] == 8 * 3  # 8 chunks x 3 epochs
+    assert job['metrics']['r2'] > 0.9
+
+class FakeExecutor:
+    """Records submitted jobs instead of training; their futures finish when the test says so."""
+    submitted = []
+
+    def __init__(self, max_workers, **kwargs):
+        self.max_workers = max_workers
+
+    def submit(self, func, job_id, n_jobs):
+        future = Future()
+        self.submitted.append((job_id, n_jobs, future))
+        return future
+
+def test_one_runner_runs_at_most_max_workers_jobs(monkeypatch):
+    monkeypatch.setattr(training_jobs, 'ProcessPoolExecutor', FakeExecutor)
+    monkeypatch.setattr(FakeExecutor, 'submitted', [])
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+    jobs = [make_job() for _ in range(3)]
+    first, second = JobRunner(max_workers=2), JobRunner(max_workers=2)
+    first.poll()
+    second.poll()
+    # the second runner has no lease, so nothing runs beyond the first runner's two jobs
+    assert first.holds_lease and not second.holds_lease
+    assert [(job_id, n_jobs) for job_id, n_jobs, _ in FakeExecutor.submitted] == [(jobs[0], 4), (jobs[1], 4)]
+    assert [get_job(job_id)['status'] for job_id in jobs] == ['running', 'running', 'queued']
+    assert get_job(jobs[0])['owner'] == first.owner
+    training_jobs._update_job(jobs[0], status='completed')
+    FakeExecutor.submitted[0][2].set_result(None)
+    first.poll()
+    assert FakeExecutor.submitted[-1][0] == jobs[2]
+
+def test_jobs_of_a_dead_runner_are_requeued_and_not_matched(monkeypatch):
+    monkeypatch.setattr(training_jobs, 'ProcessPoolExecutor', FakeExecutor)
+    monkeypatch.setattr(FakeExecutor, 'submitted', [])
+    job_id = make_job()
+    params = get_job(job_id)['params']
+    dead, successor = JobRunner(max_workers=1), JobRunner(max_workers=1)
+    dead.poll()
+    assert get_job(job_id)['status'] == 'running'
+    assert find_matching_job(params) == job_id
+    assert requeue_stale_jobs() == 0  # heartbeats are fresh
+    # the runner stops heartbeating its lease and its job
+    stale = time.time() - training_jobs.JOB_HEARTBEAT_TIMEOUT - 1
+    with training_jobs._connect() as conn:
+        conn.execute("UPDATE training_jobs SET heartbeat_at = ?", (stale,))
+        conn.execute("UPDATE job_runner SET heartbeat_at = ?", (stale,))
+    assert find_matching_job(params) is None
+    successor.poll()
+    assert successor.holds_lease
+    # requeued, then claimed again by the runner that took over
+    assert get_job(job_id)['owner'] == successor.owner
+    assert [submitted[0] for submitted in FakeExecutor.submitted] == [job_id, job_id]
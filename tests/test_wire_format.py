@@ -0,0 +1,38 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from modules.wire_format import ARROW_STREAM, NPY, JSON, negotiate, decode_frame, encode_frame, encode_array
+
+def test_arrow_round_trip_keeps_dtypes_and_nulls():
+    df = pd.DataFrame({'x': [1.5, np.nan, 3.0], 'n': [1, 2, 3], 's': ['a', None, 'c']})
+    out = decode_frame(encode_frame(df, ARROW_STREAM), ARROW_STREAM)
+    pd.testing.assert_frame_equal(out, df)
+
+def test_npy_decode_is_zero_copy():
+    array = np.random.default_rng(0).normal(size=(100, 3))
+    body = encode_array(array)
+    df = decode_frame(body, NPY, columns=['a', 'b', 'c'])
+    np.testing.assert_array_equal(df.to_numpy(), array)
+    assert not df['a'].to_numpy().flags.owndata
+
+def test_npy_structured_and_fortran_arrays():
+    structured = np.array([(1, 2.0), (3, 4.0)], dtype=[('i', '<i8'), ('f', '<f8')])
+    assert list(decode_frame(encode_array(structured), NPY).columns) == ['i', 'f']
+    fortran = np.asfortranarray(np.arange(6.0).reshape(2, 3))
+    buffer = io.BytesIO()
+    np.save(buffer, fortran)
+    np.testing.assert_array_equal(decode_frame(buffer.getvalue(), NPY).to_numpy(), fortran)
+
+def test_bad_payloads_raise_value_error():
+    with pytest.raises(ValueError):
+        decode_frame(b'garbage', ARROW_STREAM)
+    with pytest.raises(ValueError):
+        decode_frame(encode_array(np.zeros((2, 2))), NPY, columns=['only_one'])
+    with pytest.raises(ValueError):
+        encode_array(np.array([{'a': 1}], dtype=object))
+
+def test_negotiate_picks_first_supported_type():
+    assert negotiate(f"text/html, {NPY};q=0.9, {ARROW_STREAM}") == NPY
+    assert negotiate("*/*") == JSON
+    assert negotiate(None) == JSON